@@ -0,0 +1,63 @@
+"""
+Import-time regression check for the CLI and GUI entry points.
+
+Runs `python -X importtime` in a fresh interpreter for each entry module and fails
+if a heavy dependency is imported at module load or the budget is exceeded.
+
+    python benchmarks/bench_import_time.py [--budget-ms 250]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_MODULES = ["src.cli", "src.ui.app"]
+HEAVY_MODULES = ["pandas", "pdfplumber", "google.genai", "pypdfium2", "openpyxl"]
+
+def import_profile(module: str):
+    """Returns ({imported module: cumulative microseconds}, error output) for a fresh import."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        timings[name] = int(cumulative)
+    return timings, (proc.stderr if proc.returncode else "")
+
+def wall_time(args, repeat: int = 3) -> float:
+    """Best-of-N wall time in milliseconds of running the interpreter with args."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time regression check")
+    parser.add_argument("--budget-ms", type=float, default=250, help="Max cumulative import time per entry module")
+    args = parser.parse_args()
+
+    failed = False
+    for module in ENTRY_MODULES:
+        timings, error = import_profile(module)
+        if module not in timings:
+            print(f"{module:12} | SKIP (import failed: {error.strip().splitlines()[-1] if error else 'unknown'})")
+            continue
+        total_ms = timings[module] / 1000
+        eager = [m for m in HEAVY_MODULES if m in timings]
+        status = "PASS" if not eager and total_ms <= args.budget_ms else "FAIL"
+        failed = failed or status == "FAIL"
+        print(f"{module:12} | import {total_ms:7.1f} ms | eager heavy imports: {', '.join(eager) or 'none'} | {status}")
+
+    help_ms = wall_time(["-m", "src.cli", "--help"])
+    print(f"{'cli --help':12} | wall   {help_ms:7.1f} ms (interpreter startup included)")
+
+    if failed:
+        print("\nImport-time regression detected.")
+        sys.exit(1)
+    print("\nImport times within budget.")
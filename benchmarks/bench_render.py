@@ -0,0 +1,98 @@
+"""
+Render throughput of the page rasterizer backends on a synthetic document.
+
+Each backend renders every page to PNG (as sent to the model) in a fresh interpreter,
+so peak RSS is measured per backend. Reports pages/sec, PNG size and peak RSS.
+
+    python benchmarks/bench_render.py [--pages 20] [--resolution 300] [--crop]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from tests.pdf_helpers import write_pdf
+
+def table_page(index: int, rows: int = 25, cols: int = 5) -> bytes:
+    """Content stream of a page with a title and a ruled table of numbers."""
+    ops = [f"BT /F1 16 Tf 72 740 Td (Synthetic report, page {index + 1}) Tj ET"]
+    left, top, width, height = 60, 700, 100, 20
+    for r in range(rows):
+        for c in range(cols):
+            text = f"Item {r + 1}" if c == 0 else f"{(index + 1) * (r + 1) * (c + 7) % 9973:,}.{c}0"
+            ops.append(f"BT /F1 9 Tf {left + c * width + 4} {top - (r + 1) * height + 6} Td ({text}) Tj ET")
+    for r in range(rows + 1):
+        y = top - r * height
+        ops.append(f"{left} {y} m {left + cols * width} {y} l S")
+    for c in range(cols + 1):
+        x = left + c * width
+        ops.append(f"{x} {top} m {x} {top - rows * height} l S")
+    return "\n".join(ops).encode()
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, or 0 where the resource module is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+def run_backend(path: str, backend: str, resolution: int, crop: bool) -> dict:
+    """Renders every page with one backend (in this process) and returns its measurements."""
+    import pdfplumber
+    from src.logic.rasterize import render_png, close_document
+    from src.logic.regions import find_table_regions, render_region
+    with pdfplumber.open(path) as pdf:
+        # Region detection is not part of the rendering cost
+        regions = [find_table_regions(page) if crop else [] for page in pdf.pages]
+        start = time.perf_counter()
+        sizes = []
+        for page, boxes in zip(pdf.pages, regions):
+            if boxes:
+                sizes.extend(len(render_region(page, box, backend)) for box in boxes)
+            else:
+                sizes.append(len(render_png(page, resolution, backend=backend)))
+            page.close()
+        elapsed = time.perf_counter() - start
+        close_document(pdf)
+    return {"backend": backend, "pages": len(regions), "seconds": elapsed,
+            "png_kb": sum(sizes) / len(sizes) / 1024, "peak_rss_mb": peak_rss_mb()}
+
+if __name__ == "__main__":
+    from src.config import PAGE_RESOLUTION
+    from src.logic.rasterize import RASTERIZERS
+
+    parser = argparse.ArgumentParser(description="Page rasterizer throughput benchmark")
+    parser.add_argument("--pages", type=int, default=20, help="Pages of the synthetic document")
+    parser.add_argument("--resolution", type=int, default=PAGE_RESOLUTION, help="Render resolution in dpi")
+    parser.add_argument("--crop", action="store_true", help="Render the detected table regions instead of whole pages")
+    parser.add_argument("--backend", choices=RASTERIZERS, action="append", help="Backend to run (default all)")
+    parser.add_argument("--worker", metavar="PDF", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.backend[0], args.resolution, args.crop)))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        write_pdf(path, streams=[table_page(i) for i in range(args.pages)])
+        print(f"{args.pages} pages at {args.resolution} dpi{' (table regions)' if args.crop else ''}\n")
+        print(f"{'backend':14} | {'pages/s':>8} | {'ms/page':>8} | {'PNG KB':>8} | {'peak RSS MB':>11}")
+        for backend in args.backend or RASTERIZERS:
+            cmd = [sys.executable, os.path.abspath(__file__), "--worker", path, "--backend", backend,
+                   "--resolution", str(args.resolution)] + (["--crop"] if args.crop else [])
+            proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+            if proc.returncode:
+                print(f"{backend:14} | FAILED: {(proc.stderr.strip().splitlines() or ['unknown'])[-1]}")
+                continue
+            r = json.loads(proc.stdout)
+            print(f"{backend:14} | {r['pages'] / r['seconds']:8.2f} | {r['seconds'] * 1000 / r['pages']:8.1f} | "
+                  f"{r['png_kb']:8.1f} | {r['peak_rss_mb'] or float('nan'):11.1f}")
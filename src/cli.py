@@ -2,15 +2,26 @@ import argparse
 import logging
 import os
 import sys
-import pdfplumber
-import pandas as pd
-from google import genai
-from dotenv import load_dotenv
+import time
+from contextlib import nullcontext
 
 # Modular imports
-# Modular imports
-from src.logic.processor import normalize_df, parse_md, extract_from_page, parse_page_query
-from src.config import DEFAULT_PROMPT
+from src.logic.cache import PageCache, MemoryCache, text_digest
+from src.logic.cassette import Cassette, RecordingClient, ReplayClient
+from src.logic.bundle import export_bundle, import_bundle
+from src.logic.planner import plan_report
+from src.logic.journal import RunJournal, PENDING, DONE, FAILED
+from src.logic.manifest import OutputManifest
+from src.logic.dedup import PageDeduplicator
+from src.logic.keys import KeyPool, load_api_keys
+from src.logic.pipeline import Pipeline, ExtractOptions, EXTRACTED, DEDUPLICATED, TRIAGED
+from src.logic.sinks import Sink, OutputFiles, StreamSink, STREAM_FORMATS
+from src.logic.sources import STDIN_NAME
+from src.logic.profiling import new_profiler
+from src.logic.scheduler import POLICIES
+from src.logic.rasterize import RASTERIZERS
+from src.config import (DEFAULT_PROMPT, DEDUP_PAGES, CROP_TABLE_REGIONS, USE_MODEL_CASCADE, USE_TEXT_LAYER, USE_JSON_OUTPUT,
+                        SCHEDULE_POLICY, MAX_CONCURRENCY, RASTERIZER, USE_TRIAGE, REEXTRACT_BELOW)
 
 # Configure logging
 logging.basicConfig(
@@ -20,75 +31,248 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def main(pdf_files, output_path, save_md=False, save_csv=False, clean=False):
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    load_dotenv(os.path.join(base_dir, "api_key.env"))
-    api_key = os.getenv("API_KEY")
-    
-    if not api_key:
-        logger.error("API_KEY not found in api_key.env")
-        sys.exit(1)
+class _ProgressLog(Sink):
+    """Logs document boundaries and failed pages."""
+    def begin_document(self, doc):
+        logger.info(f"Processing: {doc['name']}")
 
-    try:
-        client = genai.Client(api_key=api_key)
-    except Exception as e:
-        logger.error(f"Failed to initialize Gemini client: {e}")
-        sys.exit(1)
+    def end_document(self, doc):
+        if doc["failed"]:
+            logger.warning(f"  ! {doc['failed']} page(s) failed, rerun with --retry-failed to request them again")
+
+def _output_file(pdf, ext, output_path, pdf_files):
+    """
+    Markdown/CSV file of a PDF, next to it. The stdin document has no folder of its own,
+    so its file is named after the Excel output (or goes to the current folder without one).
+    """
+    if pdf == STDIN_NAME and "-" in pdf_files:
+        return f"{os.path.splitext(output_path)[0]}{ext}" if output_path else f"stdin{ext}"
+    return f"{os.path.splitext(pdf)[0]}{ext}"
 
-    out_dir = os.path.dirname(output_path) or "."
+def main(pdf_files, output_path, save_md=False, save_csv=False, clean=False, dedup=DEDUP_PAGES,
+         crop_tables=CROP_TABLE_REGIONS, resume=False, retry_failed=False, cascade=USE_MODEL_CASCADE,
+         text_layer=USE_TEXT_LAYER, json_output=USE_JSON_OUTPUT, stdout_format=None, profile=False,
+         profile_sample=False, record_path=None, replay_path=None, replay_timing=False, policy=SCHEDULE_POLICY,
+         concurrency=MAX_CONCURRENCY, rasterizer=RASTERIZER, triage=USE_TRIAGE, reextract_below=REEXTRACT_BELOW,
+         plan=False):
+    """
+    output_path may be None to skip the Excel file (e.g. when streaming to stdout).
+    pdf_files may contain "-" to read a PDF from stdin; stdout_format streams the
+    tables to stdout as csv, jsonl or arrow while logs go to stderr.
+    profile writes per-stage profiles and allocation snapshots to .cache/profile
+    (profile_sample profiles only a sample of the stage calls).
+    record_path records every model response to a cassette; replay_path serves the
+    responses of a cassette instead of calling the API (replay_timing waits for the
+    recorded latencies). Replays skip the page cache so every page is parsed again.
+    policy and concurrency control how the pages of all PDFs are scheduled.
+    rasterizer selects the page rendering backend (see rasterize.RASTERIZERS).
+    triage screens the thumbnails of scanned pages in batches and only extracts pages with tables.
+    reextract_below requests cached pages again when their table score is below it.
+    plan only reports the pages, requests, tokens, cost and time the run would take, without any model request.
+    """
+    out_dir = os.path.dirname(output_path or "") or "."
     os.makedirs(out_dir, exist_ok=True)
+    cache_dir = os.path.join(out_dir, ".cache")
+    if plan:
+        # Nothing is sent: the keys only tell the rate limits and the quota left today
+        api_keys = load_api_keys()
+    elif replay_path:
+        try:
+            client = ReplayClient(Cassette(replay_path).load(), timing=replay_timing)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not read cassette {replay_path}: {e}")
+            sys.exit(1)
+        logger.info(f"Replaying {len(client.cassette)} recorded response(s) from {replay_path}")
+    else:
+        api_keys = load_api_keys()
+        if not api_keys:
+            logger.error("API_KEY not found in api_key.env")
+            sys.exit(1)
+        # The pool stands in for the client and spreads requests over all configured keys
+        client = KeyPool(api_keys, usage_path=os.path.join(cache_dir, "key_usage.json"))
+        if len(api_keys) > 1:
+            logger.info(f"Using {len(api_keys)} API keys")
+        if record_path:
+            # Only requests sent to the model are recorded, not pages restored from the cache
+            client = RecordingClient(client, Cassette(record_path))
+            logger.info(f"Recording model responses to {record_path}")
 
-    writer = pd.ExcelWriter(output_path, engine='openpyxl')
-    
-    for pdf_path in pdf_files:
-        logger.info(f"Processing: {os.path.basename(pdf_path)}")
-        all_results = []
-        
+    # The run journal checkpoints every page; --resume / --retry-failed continue from it
+    run_id = os.path.abspath(output_path) if output_path else f"stdout:{stdout_format}"
+    if replay_path:
+        # Replays keep their own journal, the recorded run can still be resumed
+        run_id = f"replay:{run_id}"
+    journal = RunJournal(os.path.join(cache_dir, f"journal_{text_digest(run_id)}.json"))
+    if (resume or retry_failed) and journal.load():
+        if not pdf_files:
+            pdf_files = journal.files()
+        logger.info(f"Resuming run started {journal.data.get('started')}: {journal.summary()}")
+    else:
+        if resume or retry_failed:
+            logger.warning("No previous run found for this output, starting a new run")
+        if not plan:
+            journal.reset([f for f in pdf_files if f != "-"])
+
+    options = ExtractOptions(crop_tables=crop_tables, text_layer=text_layer, json_output=json_output, cascade=cascade,
+                             dedup=dedup, cache_dir=cache_dir, policy=policy, concurrency=concurrency,
+                             rasterizer=rasterizer, triage=triage, reextract_below=reextract_below,
+                             # Which journal states are sent to the model in this run
+                             request_pending=resume or not retry_failed, request_failed=retry_failed or not resume)
+    if plan:
+        for line in plan_report(pdf_files, options, api_keys, usage_path=os.path.join(cache_dir, "key_usage.json"),
+                                cache=PageCache(cache_dir), journal=journal):
+            logger.info(line)
+        return
+    outputs = OutputFiles(OutputManifest(os.path.join(cache_dir, "manifest.json")), excel_path=output_path,
+                          md_path=(lambda pdf: _output_file(pdf, ".md", output_path, pdf_files)) if save_md else None,
+                          csv_path=(lambda pdf: _output_file(pdf, ".csv", output_path, pdf_files)) if save_csv else None,
+                          clean=clean, log=logger.info)
+    sinks = [_ProgressLog(), outputs]
+    if stdout_format:
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                pages_to_process = parse_page_query(DEFAULT_PROMPT, total_pages)
-                
-                for p_idx in pages_to_process:
-                    page = pdf.pages[p_idx]
-                    res = extract_from_page(client, page, DEFAULT_PROMPT, 
-                                          lambda p: logger.info(f"  - Analyzing page {p}..."))
-                    all_results.extend(res)
-            
-            if all_results:
-                processed = []
-                for res in all_results:
-                    df = res['df']
-                    if clean: df = normalize_df(df)
-                    processed.append({"df": df, "md": res['md']})
-                
-                combined_df = pd.concat([p['df'] for p in processed], ignore_index=True)
-                short_name = os.path.splitext(os.path.basename(pdf_path))[0]
-                combined_df.to_excel(writer, sheet_name=short_name[:31], index=False, header=False)
-                
-                if save_md:
-                    md_path = f"{os.path.splitext(pdf_path)[0]}.md"
-                    with open(md_path, 'w', encoding='utf-8') as f:
-                        for p in processed: f.write(p['md'] + "\n\n")
-                    logger.info(f"  + Saved MD: {os.path.basename(md_path)}")
-                
-                if save_csv:
-                    csv_path = f"{os.path.splitext(pdf_path)[0]}.csv"
-                    combined_df.to_csv(csv_path, index=False, header=False)
-                    logger.info(f"  + Saved CSV: {os.path.basename(csv_path)}")
-        except Exception as e:
-            logger.error(f"Error processing {pdf_path}: {e}")
+            sinks.append(StreamSink(sys.stdout.buffer, stdout_format, clean=clean))
+        except RuntimeError as e:
+            logger.error(str(e))
+            sys.exit(1)
+    pipeline = Pipeline(options, client=client, cache=MemoryCache() if replay_path else PageCache(cache_dir),
+                        journal=journal,
+                        deduplicator=PageDeduplicator(None if replay_path else os.path.join(cache_dir, "dedup_index.json"))
+                        if dedup else None,
+                        sinks=sinks, log_callback=lambda p: logger.info(f"  - Analyzing page {p}..."))
+
+    profiler = new_profiler(cache_dir, sample=profile_sample) if profile or profile_sample else None
+    stop_error = None
+    try:
+        with profiler or nullcontext():
+            for result in pipeline.run(pdf_files):
+                if result["page"] is None:
+                    logger.error(f"Error processing {result['doc']}: {result['error']}")
+                elif result["status"] == FAILED:
+                    logger.warning(f"  ! Page {result['page']+1} failed: {result['error']}")
+                elif result["status"] == DEDUPLICATED:
+                    logger.info(f"  = Page {result['page']+1} duplicates an extracted page, reusing its result")
+                elif result["status"] == TRIAGED:
+                    logger.info(f"  - Page {result['page']+1} has no tables on its thumbnail, skipped")
+                elif result["status"] == EXTRACTED and result["tables"] and result["tables"][0].get("tier", 0) > 0:
+                    logger.info(f"  ^ Page {result['page']+1} escalated to {result['tables'][0]['model']}")
+    except BrokenPipeError:
+        # The reader of --stdout went away (e.g. `| head`): stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except Exception as e:
+        if not pipeline.tracker["has_error"]:
+            raise
+        stop_error = e
+    finally:
+        if profiler is not None:
+            logger.info(f"Profile written to {profiler.dump()}")
+
+    for line in pipeline.summary() + (profiler.summary() if profiler else []):
+        logger.info(line)
+    if replay_path and client.misses:
+        logger.warning(f"{client.misses} request(s) were not in the cassette")
+    counts = journal.summary()
+    logger.info(f"Pages: {counts[DONE]} done, {counts[FAILED]} failed, {counts[PENDING]} pending")
+    if stop_error is not None:
+        logger.error(f"Run stopped: {stop_error}")
+        logger.error("Completed pages are saved. Rerun with --resume to continue where it stopped.")
+        sys.exit(1)
+    logger.info(f"Done. Results saved to {output_path}" if output_path else "Done.")
 
-    writer.close()
-    logger.info(f"Done. Results saved to {output_path}")
+def cache_bundle(output_path, export_path=None, import_path=None, docs=None, prompt=None, since=None, until=None):
+    """
+    Exports the page cache of an output folder to a bundle (filtered by documents,
+    prompt text and creation dates) or merges a bundle into it, so other machines
+    start with the pages already extracted.
+    """
+    cache_dir = os.path.join(os.path.dirname(output_path or "") or ".", ".cache")
+    if export_path:
+        if not os.path.isdir(cache_dir):
+            logger.error(f"No cache found at {cache_dir}")
+            sys.exit(1)
+        stats = export_bundle(cache_dir, export_path, docs=docs, prompt=prompt, since=since, until=until)
+        logger.info(f"Exported {stats['entries']} page(s) ({stats['objects']} distinct result(s)) to {stats['path']}")
+    if import_path:
+        try:
+            counts = import_bundle(import_path, cache_dir)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not import {import_path}: {e}")
+            sys.exit(1)
+        logger.info(f"Imported {import_path}: {counts['added']} added, {counts['replaced']} replaced by a better result, "
+                    f"{counts['present']} already present")
+        if counts["corrupt"]:
+            logger.warning(f"  ! {counts['corrupt']} corrupt or tampered entries skipped")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Extract tables from PDF using Gemini AI.")
-    parser.add_argument("pdf_files", nargs="+", help="PDF files to process")
-    parser.add_argument("--output", "-o", default="output.xlsx", help="Output Excel file")
+    parser.add_argument("pdf_files", nargs="*", help="PDF files to process, - for stdin (optional with --resume)")
+    parser.add_argument("--output", "-o", help="Output Excel file (default output.xlsx, none with --stdout)")
     parser.add_argument("--md", action="store_true", help="Save as Markdown")
     parser.add_argument("--csv", action="store_true", help="Save as CSV")
     parser.add_argument("--clean", action="store_true", help="Clean/normalize data")
+    parser.add_argument("--no-dedup", action="store_true", help="Do not reuse results of duplicate pages")
+    parser.add_argument("--crop-tables", action="store_true", help="Send only detected table regions to the model")
+    parser.add_argument("--resume", action="store_true", help="Continue the previous run for this output, skipping finished pages")
+    parser.add_argument("--retry-failed", action="store_true", help="Request again only the pages that failed in the previous run")
+    parser.add_argument("--cascade", action="store_true", help="Try the cheapest model first and escalate only pages that fail validation")
+    parser.add_argument("--text-layer", action="store_true", help="Send the words of digital pages with their positions instead of an image")
+    parser.add_argument("--triage", action="store_true", help="Screen scanned pages with batched thumbnails and extract only those with tables")
+    parser.add_argument("--reextract-below", type=float, metavar="SCORE", default=REEXTRACT_BELOW,
+                        help="Request again the cached pages whose table score (0-1) is below SCORE")
+    parser.add_argument("--json-mode", action="store_true", help="Request tables as schema-constrained JSON instead of markdown")
+    parser.add_argument("--stdout", choices=STREAM_FORMATS, help="Stream the tables to stdout in this format")
+    parser.add_argument("--schedule", choices=POLICIES, default=SCHEDULE_POLICY,
+                        help=f"Order of the pages of several PDFs (default {SCHEDULE_POLICY})")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY,
+                        help=f"Model requests in flight at once (default {MAX_CONCURRENCY})")
+    parser.add_argument("--rasterizer", choices=RASTERIZERS, default=RASTERIZER,
+                        help=f"Page rendering backend (default {RASTERIZER})")
+    parser.add_argument("--profile", action="store_true", help="Write per-stage profiles and allocation snapshots to .cache/profile")
+    parser.add_argument("--profile-sample", action="store_true", help="Like --profile, but only profile a sample of the stage calls (for long runs)")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record every model response and its latency to this file")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve model responses from a recorded file instead of the API")
+    parser.add_argument("--replay-timing", action="store_true", help="With --replay, wait for the recorded latency of every response")
+    parser.add_argument("--plan", action="store_true", help="Only estimate the pages, requests, tokens, cost and time of the run (no model requests)")
+    parser.add_argument("--export-cache", metavar="BUNDLE", help="Export the page cache of the output folder to a bundle file (or folder) and exit")
+    parser.add_argument("--import-cache", metavar="BUNDLE", help="Merge a cache bundle into the page cache of the output folder and exit")
+    parser.add_argument("--only-doc", action="append", metavar="PDF", help="With --export-cache, only pages of this document (name, path or digest; repeatable)")
+    parser.add_argument("--only-prompt", metavar="TEXT", help="With --export-cache, only pages extracted with this prompt (\"default\" for the default prompt)")
+    parser.add_argument("--since", metavar="YYYY-MM-DD", help="With --export-cache, only pages cached on or after this date")
+    parser.add_argument("--until", metavar="YYYY-MM-DD", help="With --export-cache, only pages cached on or before this date")
     
     args = parser.parse_args()
-    main(args.pdf_files, args.output, args.md, args.csv, args.clean)
+    if (args.only_doc or args.only_prompt or args.since or args.until) and not args.export_cache:
+        parser.error("--only-doc, --only-prompt, --since and --until require --export-cache")
+    if args.export_cache or args.import_cache:
+        for date in (args.since, args.until):
+            try:
+                if date: time.strptime(date, "%Y-%m-%d")
+            except ValueError:
+                parser.error(f"invalid date {date}, expected YYYY-MM-DD")
+        prompt = DEFAULT_PROMPT if args.only_prompt == "default" else args.only_prompt
+        cache_bundle(args.output or "output.xlsx", args.export_cache, args.import_cache, docs=args.only_doc,
+                     prompt=prompt, since=args.since, until=args.until)
+        sys.exit(0)
+    if not args.pdf_files and not (args.resume or args.retry_failed):
+        parser.error("at least one PDF file is required unless --resume or --retry-failed is used")
+    if args.pdf_files.count("-") > 1:
+        parser.error("stdin (-) can only be given once")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.reextract_below is not None and not 0 < args.reextract_below <= 1:
+        parser.error("--reextract-below must be between 0 and 1")
+    if args.plan and (args.record or args.replay):
+        parser.error("--plan cannot be combined with --record or --replay")
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be combined")
+    if args.replay_timing and not args.replay:
+        parser.error("--replay-timing requires --replay")
+    output = args.output or (None if args.stdout else "output.xlsx")
+    main(args.pdf_files, output, args.md, args.csv, args.clean, dedup=DEDUP_PAGES and not args.no_dedup,
+         crop_tables=CROP_TABLE_REGIONS or args.crop_tables, resume=args.resume, retry_failed=args.retry_failed,
+         cascade=USE_MODEL_CASCADE or args.cascade, text_layer=USE_TEXT_LAYER or args.text_layer,
+         json_output=USE_JSON_OUTPUT or args.json_mode, stdout_format=args.stdout, profile=args.profile,
+         profile_sample=args.profile_sample, record_path=args.record, replay_path=args.replay,
+         replay_timing=args.replay_timing, policy=args.schedule, concurrency=args.concurrency,
+         rasterizer=args.rasterizer, triage=USE_TRIAGE or args.triage, reextract_below=args.reextract_below,
+         plan=args.plan)
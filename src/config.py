@@ -3,6 +3,114 @@ import os
 VERSION = "1.5.0"
 AI_MODEL = "gemini-2.5-flash-lite"
 
+# Model cascade: every page is tried with the first (cheapest) model and only
+# escalated to the next tier when its result fails the structural check.
+USE_MODEL_CASCADE = False
+MODEL_CASCADE = ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-2.5-pro"]
+# Minimum share of body cells containing digits; 0 disables the check
+# (raise it, e.g. to 0.3, for numeric documents such as financial statements)
+CASCADE_MIN_NUMERIC_DENSITY = 0.0
+
+# Every extracted table gets a quality score from 0 to 1 (column consistency, truncation,
+# empty cells, numbers in numeric columns), stored in the page cache. Cached pages whose
+# lowest score is below REEXTRACT_BELOW are requested again; None reuses every cached page.
+REEXTRACT_BELOW = None
+
+# Every model request has a deadline. A request slower than the observed p95
+# latency gets one duplicate (hedge); at most HEDGE_MAX_RATIO of requests are hedged.
+REQUEST_TIMEOUT_S = 120
+HEDGE_REQUESTS = True
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MAX_RATIO = 0.05
+
+# Limits per API key (free tier defaults); several keys can be listed comma-separated
+# in API_KEY / API_KEYS and requests are spread over them by remaining headroom.
+RATE_LIMIT_RPM = 15
+DAILY_REQUEST_LIMIT = 1000
+QUOTA_COOLDOWN_S = 60
+
+# Duplicate page detection: digital pages match on an exact text-layer hash, scanned
+# pages on an exact hash of their pixels at PAGE_RESOLUTION (only identical renders match).
+# DEDUP_NEAR_IMAGES also matches re-scans by a perceptual hash of a small render (at most
+# DEDUP_HASH_THRESHOLD differing bits); pages sharing a ruled layout with different
+# figures can collide, so it is off by default.
+DEDUP_PAGES = True
+DEDUP_NEAR_IMAGES = False
+DEDUP_HASH_SIZE = 32
+DEDUP_HASH_THRESHOLD = 2
+DEDUP_THUMB_RESOLUTION = 72
+
+# Page rendering for the model: full pages at PAGE_RESOLUTION dpi through one of the
+# rasterize.RASTERIZERS backends ("pdfplumber" RGB, "pdfium-gray" or "pdfium-bytes"
+# grayscale, see benchmarks/bench_render.py) and PNG compression level (0-9).
+PAGE_RESOLUTION = 300
+RASTERIZER = "pdfplumber"
+PNG_COMPRESS_LEVEL = 6
+
+# Table-region cropping: only the detected table areas are sent to the model,
+# rendered at CROP_RESOLUTION or higher for small crops (within CROP_MAX_PIXELS).
+# Scanned pages are analysed at REGION_ANALYSIS_RESOLUTION, each pixel the darkest of
+# REGION_OVERSAMPLE x REGION_OVERSAMPLE rendered pixels so thin ruling lines survive.
+CROP_TABLE_REGIONS = False
+CROP_RESOLUTION = 300
+CROP_MAX_PIXELS = 4_000_000
+REGION_ANALYSIS_RESOLUTION = 150
+REGION_OVERSAMPLE = 2
+REGION_PADDING = 12
+REGION_MAX_COVERAGE = 0.85
+
+# Triage of scanned pages (--triage): thumbnails of up to TRIAGE_BATCH_PAGES pages are
+# sent in one request that only tells which pages hold tables and roughly where. Pages
+# without tables are skipped; with table-region cropping, only the reported areas
+# (padded by TRIAGE_REGION_PADDING points) are rendered at full resolution.
+USE_TRIAGE = False
+TRIAGE_MODEL = AI_MODEL
+TRIAGE_RESOLUTION = 48
+TRIAGE_BATCH_PAGES = 16
+TRIAGE_REGION_PADDING = 24
+
+# Structured output: tables are requested as schema-constrained JSON (header + rows)
+# and decoded directly; markdown exports are generated locally.
+USE_JSON_OUTPUT = False
+
+# Text-layer mode: digital pages are sent as positional text (words with their
+# coordinates) instead of a 300 dpi image. Pages with fewer words fall back to images.
+USE_TEXT_LAYER = False
+TEXT_LAYER_MIN_WORDS = 10
+
+# Profiling (--profile / GUI debug option): per-stage cProfile stats and tracemalloc
+# snapshots under .cache/profile. Sampling profiles only every Nth call of each stage.
+PROFILE_SAMPLE_EVERY = 20
+PROFILE_TOP_ALLOCATIONS = 25
+
+# Scheduling of the pages of several PDFs: "sjf" (smallest documents first), "fifo"
+# (input order) or "round-robin" (one page of each in turn), with up to
+# MAX_CONCURRENCY model requests in flight (rate limits per key still apply).
+SCHEDULE_POLICY = "sjf"
+MAX_CONCURRENCY = 4
+
+# Dry-run planning (--plan / GUI estimate): pages are resolved against the cache without
+# any model request and the remaining requests are estimated. Images count IMAGE_TILE_TOKENS
+# per IMAGE_TILE_PX square tile (one tile within IMAGE_SMALL_PX), text CHARS_PER_TOKEN
+# characters per token. Output tokens are averaged over the cached pages of the run, or
+# PLAN_OUTPUT_TOKENS per page without any. Prices are USD per million input and output
+# tokens (paid tier); the free tier costs nothing but is bound by the rate limits above.
+IMAGE_TILE_PX = 768
+IMAGE_SMALL_PX = 384
+IMAGE_TILE_TOKENS = 258
+CHARS_PER_TOKEN = 4
+PLAN_OUTPUT_TOKENS = 400
+PLAN_REQUEST_SECONDS = 8
+MODEL_PRICES = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# Lines kept in the GUI status log; older lines are dropped
+LOG_MAX_LINES = 2000
+
 DEFAULT_PROMPT = """
 Analyze this page and extract ALL tables you see.
 Even if the table looks like a screenshot or an embedded image, extract it.
@@ -11,6 +119,35 @@ Do not include any introductory text, titles outside the table, or comments.
 If no tables are found, return an empty string.
 """.strip()
 
+# Sent instead of DEFAULT_PROMPT when tables are requested as JSON, as that one asks for Markdown
+DEFAULT_JSON_PROMPT = """
+Analyze this page and extract ALL tables you see.
+Even if the table looks like a screenshot or an embedded image, extract it.
+Do not include any introductory text, titles outside the table, or comments.
+""".strip()
+
+# Added to the prompt when tables are requested as JSON (the schema overrides any other format a custom prompt asks for)
+JSON_OUTPUT_PROMPT = """
+Return the tables as JSON following the response schema, whatever output format is asked for above:
+for each table, its header cells and its rows of cells, in reading order.
+Return an empty list of tables if there are none.
+""".strip()
+
+# Sent with the page thumbnails of a triage request
+TRIAGE_PROMPT = """
+You are given low-resolution thumbnails of document pages, each one preceded by its label "Page N".
+For every page, tell whether it contains at least one table (ruled or not, including tables in
+screenshots or scans). For each table give a rough bounding box as [ymin, xmin, ymax, xmax]
+scaled from 0 to 1000. Do not transcribe any content.
+""".strip()
+
+# Added to the prompt when the page is sent as text instead of an image
+TEXT_LAYER_PROMPT = """
+The page is given as text extracted from the PDF instead of an image.
+Each line is `y | x:text x:text ...`, with positions in points from the top-left corner.
+Use the x positions to align cells into columns and the y positions to tell rows apart.
+""".strip()
+
 TEXTS = {
     "EN": {
         "title": "PDF to EXCEL/CSV/MD AI Extractor",
@@ -35,7 +172,11 @@ TEXTS = {
         "opt_md": "Markdown (.md)",
         "opt_csv": "CSV (.csv)",
         "opt_normalize": "Normalize Data",
+        "opt_profile": "Profile (debug)",
         "start_btn": " START EXTRACTION ",
+        "plan_btn": "Estimate cost and time",
+        "plan_title": "Run estimate",
+        "planning": "Estimating the run (no model requests)...",
         "status_log": " STATUS LOG ",
         "edit_prompt": "Edit Prompt",
         "ilovepdf": "Other PDF tools (iLovePDF)",
@@ -49,7 +190,7 @@ TEXTS = {
         "error": "Error",
         "key_saved": "API Key saved to api_key.env",
         "no_key": "Gemini API Key is required.",
-        "key_length": "Incorrect API Key length. The key must be 39 characters long.",
+        "key_length": "Incorrect API Key length. Each key must be 39 characters long (separate several keys with commas).",
         "no_files": "Please add at least one PDF file.",
         "process_finished": "Process Finished",
         "process_success": "The extraction process has completed successfully!",
@@ -59,6 +200,7 @@ TEXTS = {
         "working_on": "Working on: {}",
         "done": "DONE: {}",
         "skip": "SKIP: No tables in {}",
+        "unchanged": "UNCHANGED: {} (outputs are up to date)",
         "saved_md": "  + Saved MD: {}",
         "saved_csv": "  + Saved CSV: {}",
         "files_added": "Added {} new files.",
@@ -93,7 +235,11 @@ TEXTS = {
         "opt_md": "Markdown (.md)",
         "opt_csv": "CSV (.csv)",
         "opt_normalize": "Normalizar Datos",
+        "opt_profile": "Perfilar (depuración)",
         "start_btn": " INICIAR EXTRACCIÓN ",
+        "plan_btn": "Estimar costo y tiempo",
+        "plan_title": "Estimación",
+        "planning": "Estimando la ejecución (sin solicitudes al modelo)...",
         "status_log": " REGISTRO DE ESTADO ",
         "edit_prompt": "Editar Prompt",
         "ilovepdf": "Otras herramientas PDF (iLovePDF)",
@@ -107,7 +253,7 @@ TEXTS = {
         "error": "Error",
         "key_saved": "Clave API guardada en api_key.env",
         "no_key": "Se requiere la clave API de Gemini.",
-        "key_length": "Longitud de API incorrecta. La clave debe tener 39 caracteres.",
+        "key_length": "Longitud de API incorrecta. Cada clave debe tener 39 caracteres (separe varias claves con comas).",
         "no_files": "Por favor, añade al menos un archivo PDF.",
         "process_finished": "Proceso Finalizado",
         "process_success": "¡El proceso de extracción ha finalizado con éxito!",
@@ -117,6 +263,7 @@ TEXTS = {
         "working_on": "Trabajando en: {}",
         "done": "LISTO: {}",
         "skip": "OMITIR: No hay tablas en {}",
+        "unchanged": "SIN CAMBIOS: {} (las salidas están actualizadas)",
         "saved_md": "  + MD Guardado: {}",
         "saved_csv": "  + CSV Guardado: {}",
         "files_added": "Añadidos {} nuevos archivos.",
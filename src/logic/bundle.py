@@ -0,0 +1,138 @@
+import os
+import re
+import json
+import time
+import zipfile
+import hashlib
+from typing import List, Dict, Any, Optional
+
+from src.logic.cache import atomic_write_json, file_digest, text_digest
+from src.logic.validation import page_score
+
+BUNDLE_FORMAT = "pdf-tables-cache-bundle"
+BUNDLE_VERSION = 1
+PAGE_ENTRY = re.compile(r"^[0-9a-f]{32}$")  # Page cache keys; other files in .cache are indexes and journals
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode('utf-8')
+
+def _object_id(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _read_entry(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and isinstance(entry.get("results"), list) else None
+
+def _matches(meta: Dict[str, Any], docs: Optional[List[str]], prompt: Optional[str],
+             since: Optional[str], until: Optional[str]) -> bool:
+    """
+    Export filters: docs are names, content digests or paths of PDFs; prompt is the prompt
+    text (entries cached before prompts were recorded never match); since and until are
+    YYYY-MM-DD dates, inclusive.
+    """
+    if docs:
+        wanted = set()
+        for doc in docs:
+            wanted.add(doc)
+            wanted.add(os.path.basename(doc))
+            if os.path.isfile(doc):
+                wanted.add(file_digest(doc))
+        if meta.get("doc") not in wanted and meta.get("doc_digest") not in wanted:
+            return False
+    if prompt is not None and meta.get("prompt") != text_digest(prompt):
+        return False
+    created = (meta.get("created") or "")[:10]
+    if since and created < since:
+        return False
+    if until and created > until:
+        return False
+    return True
+
+def export_bundle(cache_dir: str, bundle_path: str, docs: Optional[List[str]] = None, prompt: Optional[str] = None,
+                  since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Writes the page results of a cache directory (optionally filtered, see _matches) to one
+    compressed bundle. Results are stored once by content hash (objects/<sha256>.json, so
+    e.g. all pages without tables share one object) and an index maps every cache key to
+    its object and meta. If bundle_path is a directory the bundle is named after its
+    content. Returns {"path", "entries", "objects"}.
+    """
+    index = {}
+    objects = {}
+    for name in sorted(os.listdir(cache_dir)):
+        key, ext = os.path.splitext(name)
+        if ext != ".json" or not PAGE_ENTRY.match(key):
+            continue
+        entry = _read_entry(os.path.join(cache_dir, name))
+        if entry is None or not _matches(entry.get("meta") or {}, docs, prompt, since, until):
+            continue
+        data = _canonical(entry["results"])
+        object_id = _object_id(data)
+        objects[object_id] = data
+        index[key] = {"object": object_id, "meta": entry.get("meta") or {}}
+
+    header = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+              "filters": {"docs": docs, "prompt": text_digest(prompt) if prompt is not None else None,
+                          "since": since, "until": until},
+              "entries": index}
+    if os.path.isdir(bundle_path):
+        digest = _object_id(_canonical(index))[:16]
+        bundle_path = os.path.join(bundle_path, f"cache-{digest}.zip")
+    tmp_path = f"{bundle_path}.tmp"
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        bundle.writestr("index.json", json.dumps(header, indent=1))
+        for object_id in sorted(objects):
+            bundle.writestr(f"objects/{object_id}.json", objects[object_id])
+    os.replace(tmp_path, bundle_path)
+    return {"path": bundle_path, "entries": len(index), "objects": len(objects)}
+
+def import_bundle(bundle_path: str, cache_dir: str) -> Dict[str, int]:
+    """
+    Merges a bundle into a cache directory. Every object is checked against its hash
+    and must be a page result; bad objects are skipped, not imported. A page already
+    in the cache is kept unless the bundled result scores better (see validation.page_score).
+    Returns counts: added, replaced, present (identical or better locally), corrupt.
+    Raises ValueError if the file is not a bundle.
+    """
+    counts = {"added": 0, "replaced": 0, "present": 0, "corrupt": 0}
+    try:
+        bundle = zipfile.ZipFile(bundle_path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"{bundle_path} is not a cache bundle: {e}")
+    with bundle:
+        try:
+            header = json.loads(bundle.read("index.json"))
+        except (KeyError, ValueError):
+            raise ValueError(f"{bundle_path} is not a cache bundle (missing index)")
+        if header.get("format") != BUNDLE_FORMAT or header.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"{bundle_path} has an unsupported format: {header.get('format')} v{header.get('version')}")
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for key, item in sorted(header.get("entries", {}).items()):
+            try:
+                object_id = item["object"]
+                data = bundle.read(f"objects/{object_id}.json")
+                results = json.loads(data)
+            except (KeyError, TypeError, ValueError, zipfile.BadZipFile):
+                data, results = None, None
+            # Keys become file names: only well-formed cache keys with intact objects are accepted
+            if (not isinstance(results, list) or not PAGE_ENTRY.match(str(key)) or _object_id(data) != object_id
+                    or not all(isinstance(res, dict) for res in results)):
+                counts["corrupt"] += 1
+                continue
+
+            path = os.path.join(cache_dir, f"{key}.json")
+            local = _read_entry(path) if os.path.exists(path) else None
+            if local is not None:
+                if _canonical(local["results"]) == data or (page_score(local["results"]) or 0) >= (page_score(results) or 0):
+                    counts["present"] += 1
+                    continue
+                counts["replaced"] += 1
+            else:
+                counts["added"] += 1
+            atomic_write_json(path, {"meta": item.get("meta") or {}, "results": results})
+    return counts
@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import hashlib
+from typing import List, Dict, Any, Optional
+
+from src.config import AI_MODEL
+
+def file_digest(path: str) -> str:
+    """Returns a content hash of a file so renamed or replaced PDFs are detected."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:24]
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None):
+    """Writes JSON to a temp file and renames it so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, path)
+
+class PageCache:
+    """
+    Stores the extraction result of every analyzed page on disk.
+    Entries are keyed by document content, page index, prompt and model,
+    so an edited PDF or prompt never reuses a stale result.
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, doc_digest: str, page_idx: int, prompt: str, **settings) -> str:
+        settings.setdefault("model", AI_MODEL)
+        parts = [doc_digest, str(page_idx), text_digest(prompt)]
+        # Disabled options are left out so existing entries stay valid when a setting is added
+        parts += [f"{k}={settings[k]}" for k in sorted(settings) if settings[k] not in (None, False)]
+        return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()[:32]
+
+    def scope(self, prompt: str, **settings) -> str:
+        """Identifies the prompt and settings a result depends on, independent of the page."""
+        return self.key("", -1, prompt, **settings)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns the cached results of a page, or None on a miss or a corrupt entry."""
+        import pandas as pd
+        try:
+            with open(self.path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        results = []
+        for res in entry.get("results", []):
+            item = {k: v for k, v in res.items() if k != "rows"}
+            item["df"] = pd.DataFrame(res.get("rows", []))
+            results.append(item)
+        return results
+
+    def put(self, key: str, results: List[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None):
+        """Saves page results (even an empty list, to mark the page as analyzed)."""
+        entry = {
+            "meta": dict(meta or {}, created=time.strftime('%Y-%m-%dT%H:%M:%S')),
+            "results": [
+                dict({k: v for k, v in res.items() if k != "df"}, rows=res["df"].astype(str).values.tolist())
+                for res in results
+            ]
+        }
+        atomic_write_json(self.path(key), entry)
+
+class MemoryCache(PageCache):
+    """Page cache kept in memory, for library callers that do not want files on disk."""
+    def __init__(self):
+        self.cache_dir = None
+        self.entries = {}
+
+    def has(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if key not in self.entries:
+            return None
+        return [dict(res, df=res["df"].copy()) for res in self.entries[key]]
+
+    def put(self, key: str, results: List[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None):
+        self.entries[key] = [dict(res, df=res["df"].copy()) for res in results]
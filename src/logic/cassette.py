@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import types as pytypes
+from typing import List, Dict, Any, Optional, Callable
+
+from src.logic.ratelimit import reserve_request
+
+def request_fingerprint(model: str, contents: List[Any], config: Any = None) -> str:
+    """
+    Identifies a model request by model, contents (text, or image bytes) and output format.
+    Timeouts and other transport settings are left out so they do not break replays.
+    """
+    h = hashlib.sha256(model.encode('utf-8'))
+    for content in contents:
+        blob = getattr(content, "inline_data", None)
+        if blob is not None:
+            h.update(b"\0blob:" + (blob.mime_type or "").encode('utf-8') + b":" + blob.data)
+        else:
+            h.update(b"\0text:" + str(content).encode('utf-8'))
+    h.update(b"\0mime:" + str(getattr(config, "response_mime_type", None) or "").encode('utf-8'))
+    return h.hexdigest()[:24]
+
+class Cassette:
+    """
+    Model responses recorded by request fingerprint, stored as JSON lines
+    ({"fp", "model", "text", "latency", "error"}). Entries are appended and flushed
+    as they are recorded, so an interrupted run keeps everything recorded so far.
+    Repeated requests are replayed in recording order, the last one being reused.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}   # fingerprint -> recorded entries, in order
+        self.served = {}    # fingerprint -> entries replayed so far
+        self.lock = threading.Lock()
+
+    def load(self) -> "Cassette":
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    if line.endswith("\n"):
+                        raise
+                    break  # Last line cut short by an interrupted recording
+                self.entries.setdefault(entry["fp"], []).append(entry)
+        return self
+
+    def record(self, entry: Dict[str, Any]):
+        with self.lock:
+            self.entries.setdefault(entry["fp"], []).append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def next(self, fp: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entries = self.entries.get(fp)
+            if not entries:
+                return None
+            index = self.served.get(fp, 0)
+            self.served[fp] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.entries.values())
+
+def _api_error(code: int, details: Any) -> Exception:
+    from google.genai import errors as genai_errors
+    cls = genai_errors.ServerError if code >= 500 else genai_errors.ClientError
+    return cls(code, details)
+
+class _RecordingModels:
+    def __init__(self, models, cassette: Cassette):
+        self.models = models
+        self.cassette = cassette
+
+    def reserve(self, block: bool = True) -> Optional[Callable[..., Any]]:
+        send = reserve_request(self.models, block)
+        return (lambda **kwargs: self._record(send, kwargs)) if send is not None else None
+
+    def generate_content(self, **kwargs):
+        return self.reserve()(**kwargs)
+
+    def _record(self, send: Callable[..., Any], kwargs: Dict[str, Any]):
+        """Sends a reserved request, so the recorded latency leaves out rate limit waits."""
+        from google.genai import errors as genai_errors
+        model = kwargs.get("model", "")
+        entry = {"fp": request_fingerprint(model, kwargs.get("contents") or [], kwargs.get("config")), "model": model}
+        start = time.monotonic()
+        try:
+            response = send(**kwargs)
+        except genai_errors.APIError as e:
+            # API errors are part of the run (quota, rejected pages); transport errors are not recorded
+            self.cassette.record(dict(entry, text=None, latency=time.monotonic() - start,
+                                      error={"code": e.code, "details": e.details}))
+            raise
+        self.cassette.record(dict(entry, text=getattr(response, "text", None), latency=time.monotonic() - start,
+                                  error=None))
+        return response
+
+class RecordingClient:
+    """Wraps a client (or key pool) and records every model response and its latency to a cassette."""
+    def __init__(self, client, cassette: Cassette):
+        self.client = client
+        self.cassette = cassette
+        self.models = _RecordingModels(client.models, cassette)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+class ReplayClient:
+    """
+    Stands in for the client and serves responses from a cassette, without network
+    or API keys. With timing, every response waits for its recorded latency.
+    Requests missing from the cassette fail with a 404 error (the page fails).
+    """
+    def __init__(self, cassette: Cassette, timing: bool = False):
+        self.cassette = cassette
+        self.timing = timing
+        self.misses = 0
+        self.models = self
+
+    def generate_content(self, **kwargs):
+        fp = request_fingerprint(kwargs.get("model", ""), kwargs.get("contents") or [], kwargs.get("config"))
+        entry = self.cassette.next(fp)
+        if entry is None:
+            self.misses += 1
+            raise _api_error(404, {"error": {"code": 404, "status": "NOT_FOUND",
+                                             "message": f"No recorded response for request {fp} in {self.cassette.path}"}})
+        if self.timing:
+            time.sleep(entry["latency"])
+        if entry.get("error"):
+            raise _api_error(entry["error"]["code"], entry["error"]["details"])
+        return pytypes.SimpleNamespace(text=entry["text"])
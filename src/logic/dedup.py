@@ -0,0 +1,125 @@
+import os
+import json
+import hashlib
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.config import (DEDUP_HASH_SIZE, DEDUP_HASH_THRESHOLD, DEDUP_THUMB_RESOLUTION, DEDUP_NEAR_IMAGES,
+                        PAGE_RESOLUTION)
+from src.logic.cache import PageCache, atomic_write_json
+
+MIN_TEXT_CHARS = 20
+
+def _box(obj: Dict[str, Any]) -> bytes:
+    return f"{obj['x0']:.1f},{obj['top']:.1f},{obj['x1']:.1f},{obj['bottom']:.1f};".encode()
+
+def text_signature(page: Any) -> Optional[str]:
+    """
+    Hash of the page text layer with its images (data and position) and vector graphics
+    (rects, lines and curves), or None for scanned pages without usable text. The same
+    header and footer around a different table screenshot or drawn table is another page.
+    """
+    text = " ".join((page.extract_text() or "").split())
+    if len(text) < MIN_TEXT_CHARS:
+        return None
+    digest = hashlib.sha256(text.encode('utf-8'))
+    for image in page.images:
+        digest.update(b"image:" + _box(image))
+        digest.update(image["stream"].get_data())
+    for obj in page.rects + page.lines + page.curves:
+        digest.update(obj["object_type"].encode() + b":" + _box(obj))
+    return digest.hexdigest()[:32]
+
+def image_signature(page: Any, hash_size: int = DEDUP_HASH_SIZE) -> str:
+    """Difference hash (dHash) of a low resolution render of the page."""
+    from PIL import Image
+    img = page.to_image(resolution=DEDUP_THUMB_RESOLUTION).original
+    gray = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    px = gray.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = px[row * (hash_size + 1) + col]
+            right = px[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+def pixel_signature(page: Any) -> str:
+    """Exact hash of the page pixels at the resolution sent to the model."""
+    from src.logic.rasterize import pixel_digest
+    return pixel_digest(page, PAGE_RESOLUTION)
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+class PageDeduplicator:
+    """
+    Finds pages that duplicate an already-extracted page (cover sheets, repeated
+    forms, identical scans) so their cached result is reused instead of calling the model.
+    Signatures are ("text", hash) for digital pages (with their images and vector graphics)
+    and ("pixels", hash) for scanned ones; with near_images, scans are ("image", dHash)
+    and match within threshold bits.
+    The index is scoped by prompt and settings and persisted next to the page cache.
+    """
+    def __init__(self, index_path: Optional[str], threshold: int = DEDUP_HASH_THRESHOLD,
+                 near_images: bool = DEDUP_NEAR_IMAGES):
+        self.index_path = index_path  # None keeps the index in memory only
+        self.threshold = threshold
+        self.near_images = near_images
+        self.deduplicated = 0
+        self.index = {}
+        if index_path and os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+
+    def signature(self, page: Any) -> Tuple[str, str]:
+        sig = text_signature(page)
+        if sig is not None:
+            return ("text", sig)
+        if self.near_images:
+            return ("image", image_signature(page))
+        return ("pixels", pixel_signature(page))
+
+    def find(self, scope: str, kind: str, sig: str) -> Optional[str]:
+        """Returns the cache key of a matching page, if any."""
+        return self.match(self.index.get(scope, {}), kind, sig)
+
+    def match(self, entries: Dict[str, Any], kind: str, sig: str) -> Optional[str]:
+        """Value stored for a matching signature in an index scope ({"text": {}, "pixels": {}, "image": []})."""
+        if kind != "image":
+            return entries.get(kind, {}).get(sig)
+        best_key, best_dist = None, self.threshold + 1
+        for known_sig, key in entries.get("image", []):
+            if len(known_sig) != len(sig):
+                continue  # Hashed with another DEDUP_HASH_SIZE
+            dist = hamming(sig, known_sig)
+            if dist < best_dist:
+                best_key, best_dist = key, dist
+        return best_key
+
+    def lookup(self, page: Any, scope: str, cache: PageCache) -> Tuple[Optional[List[Dict[str, Any]]], Tuple[str, str]]:
+        """Returns (results of a duplicate page or None, signature of this page)."""
+        kind, sig = self.signature(page)
+        match_key = self.find(scope, kind, sig)
+        if match_key is not None:
+            results = cache.get(match_key)
+            if results is not None:
+                self.deduplicated += 1
+                return results, (kind, sig)
+        return None, (kind, sig)
+
+    def remember(self, signature: Tuple[str, str], scope: str, cache_key: str):
+        self.add(self.index.setdefault(scope, {"text": {}, "pixels": {}, "image": []}), signature, cache_key)
+
+    def add(self, entries: Dict[str, Any], signature: Tuple[str, str], value: str):
+        kind, sig = signature
+        if kind != "image":
+            entries.setdefault(kind, {}).setdefault(sig, value)
+        elif self.match(entries, kind, sig) is None:
+            entries.setdefault("image", []).append([sig, value])
+
+    def save(self):
+        if self.index_path:
+            atomic_write_json(self.index_path, self.index)
@@ -0,0 +1,52 @@
+import json
+import concurrent.futures
+from typing import Optional
+
+# Error kinds, from the SDK exception type and HTTP status code
+TRANSIENT = "transient"  # 5xx, timeouts, dropped connections: retry
+QUOTA = "quota"          # 429: retry later, fatal for the run once retries are exhausted
+AUTH = "auth"            # Invalid or leaked API key: fatal for the run
+INVALID = "invalid"      # Request rejected (e.g. unsupported image): this page fails
+UNKNOWN = "unknown"
+
+FATAL_KINDS = (QUOTA, AUTH)
+
+def error_code(exc: BaseException) -> Optional[int]:
+    """HTTP status code of an SDK error, if any."""
+    from google.genai import errors as genai_errors
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code
+    return None
+
+def _details_text(exc: BaseException) -> str:
+    details = getattr(exc, "details", None)
+    try:
+        return json.dumps(details) if details is not None else ""
+    except (TypeError, ValueError):
+        return str(details)
+
+def classify_error(exc: BaseException) -> str:
+    """Classifies an exception raised while calling the model."""
+    import httpx
+    from google.genai import errors as genai_errors
+
+    if isinstance(exc, genai_errors.APIError):
+        code = exc.code or 0
+        if code == 429:
+            return QUOTA
+        if code in (401, 403):
+            return AUTH
+        if code == 400 and "API_KEY_INVALID" in _details_text(exc):
+            return AUTH
+        if code in (408, 409) or code >= 500:
+            return TRANSIENT
+        if 400 <= code < 500:
+            return INVALID
+        return UNKNOWN
+    if isinstance(exc, (TimeoutError, concurrent.futures.TimeoutError, httpx.TimeoutException, httpx.TransportError)):
+        return TRANSIENT
+    return UNKNOWN
+
+def is_daily_quota(exc: BaseException) -> bool:
+    """True if a 429 refers to the daily quota rather than the per-minute rate limit."""
+    return classify_error(exc) == QUOTA and "PerDay" in _details_text(exc)
@@ -0,0 +1,109 @@
+import time
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Any, Optional
+
+from src.config import REQUEST_TIMEOUT_S, HEDGE_REQUESTS, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_MAX_RATIO
+
+class LatencyTracker:
+    """Rolling window of successful request latencies."""
+    def __init__(self, window: int = 200):
+        self.samples = collections.deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self.lock:
+            if len(self.samples) < min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Hedger:
+    """
+    Runs model requests with a deadline. When a request is still running after the
+    observed p95 latency, one duplicate is issued and the first answer wins.
+    Hedges are capped at max_ratio of all requests so they cannot blow the quota.
+    """
+    def __init__(self, timeout: float = REQUEST_TIMEOUT_S, enabled: bool = HEDGE_REQUESTS,
+                 percentile: float = HEDGE_PERCENTILE, max_ratio: float = HEDGE_MAX_RATIO):
+        self.timeout = timeout
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.latency = LatencyTracker()
+        self.executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-request")
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _try_reserve_hedge(self) -> bool:
+        with self.lock:
+            if self.hedges + 1 > self.requests * self.max_ratio:
+                return False
+            self.hedges += 1
+            return True
+
+    def call(self, fn: Callable[[], Any], duplicate: Optional[Callable[[], Optional[Callable[[], Any]]]] = None) -> Any:
+        """
+        Runs fn with the deadline and at most one hedge. duplicate returns the function to
+        send as the hedge, or None when it cannot be sent right away (no hedge then);
+        by default fn itself is sent again. Time spent before call() is not measured.
+        """
+        with self.lock:
+            self.requests += 1
+        start = time.monotonic()
+        deadline = start + self.timeout
+        hedge_after = self.latency.percentile(self.percentile) if self.enabled else None
+        futures = {self.executor.submit(fn): "primary"}
+        errors = []
+
+        while futures:
+            now = time.monotonic()
+            if now >= deadline:
+                raise TimeoutError(f"Model request exceeded the {self.timeout:.0f}s deadline")
+            wait_for = deadline - now
+            if hedge_after is not None:
+                wait_for = min(wait_for, max(0.0, start + hedge_after - now))
+            done, _ = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                role = futures.pop(future)
+                if future.exception() is None:
+                    self.latency.record(time.monotonic() - start)
+                    if role == "hedge":
+                        with self.lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                errors.append(future.exception())
+
+            if hedge_after is not None and futures and time.monotonic() >= start + hedge_after:
+                if self._try_reserve_hedge():
+                    hedge = duplicate() if duplicate is not None else fn
+                    if hedge is not None:
+                        futures[self.executor.submit(hedge)] = "hedge"
+                    else:
+                        with self.lock:
+                            self.hedges -= 1
+                hedge_after = None  # At most one duplicate per request
+
+        raise errors[0]
+
+    def summary(self) -> str:
+        return f"{self.hedges} hedged request(s) out of {self.requests}, {self.hedge_wins} won by the duplicate"
+
+_default_hedger = None
+_default_lock = threading.Lock()
+
+def default_hedger() -> Hedger:
+    """Process-wide hedger, so latency statistics are shared by all pages of a run."""
+    global _default_hedger
+    with _default_lock:
+        if _default_hedger is None:
+            _default_hedger = Hedger()
+        return _default_hedger
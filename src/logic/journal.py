@@ -0,0 +1,108 @@
+import os
+import json
+import time
+from typing import List, Dict, Any, Optional
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+class RunJournal:
+    """
+    Checkpoints a run: which pages of which files are done, failed or still pending.
+    Every page is appended to the file as a JSON line, after a first line holding the
+    whole state, so an interrupted run can be resumed exactly where it stopped without
+    rewriting the journal per page. save() compacts the records into a new first line.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"started": None, "inputs": [], "files": {}}
+        self._appendable = False  # The file ends with a complete line, so records can be appended
+
+    def load(self) -> bool:
+        """Loads the previous journal and replays its page records; returns False if there is none."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                line = f.readline()
+                data, records = json.loads(line), []
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        if line.endswith("\n"):
+                            raise
+                        break  # Last record cut short by an interrupted run
+        except (OSError, ValueError):
+            return False
+        self.data = data
+        for record in records:
+            self._apply(record)
+        # Journals written before the records existed, or cut short, are compacted before the next record
+        self._appendable = line.endswith("\n")
+        return True
+
+    def reset(self, inputs: List[str]):
+        self.data = {"started": time.strftime('%Y-%m-%dT%H:%M:%S'), "inputs": [os.path.abspath(f) for f in inputs], "files": {}}
+        self.save()
+
+    def files(self) -> List[str]:
+        """Input files of the journaled run, including those it never reached."""
+        return list(self.data.get("inputs") or self.data["files"])
+
+    def start_file(self, pdf_path: str, doc_digest: str, pages: List[int]):
+        """Registers the selected pages of a file; a changed PDF starts over."""
+        self._record({"file": os.path.abspath(pdf_path), "digest": doc_digest, "pages": list(pages)})
+
+    def status(self, pdf_path: str, page_idx: int) -> str:
+        return self.data["files"].get(os.path.abspath(pdf_path), {}).get("pages", {}).get(str(page_idx), PENDING)
+
+    def mark(self, pdf_path: str, page_idx: int, status: str, error: Optional[str] = None, save: bool = True):
+        """Sets the status of a page; without save it is only written by the next save()."""
+        record = {"file": os.path.abspath(pdf_path), "page": page_idx, "status": status, "error": error}
+        if save:
+            self._record(record)
+        else:
+            self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]):
+        files = self.data["files"]
+        if "page" not in record:
+            entry = files.get(record["file"])
+            if not entry or entry.get("digest") != record["digest"]:
+                entry = {"digest": record["digest"], "pages": {}, "errors": {}}
+                files[record["file"]] = entry
+            for p_idx in record["pages"]:
+                entry["pages"].setdefault(str(p_idx), PENDING)
+            return
+        entry, page = files[record["file"]], str(record["page"])
+        entry["pages"][page] = record["status"]
+        if record.get("error"):
+            entry["errors"][page] = record["error"]
+        else:
+            entry["errors"].pop(page, None)
+
+    def _record(self, record: Dict[str, Any]):
+        """Applies a record and appends it to the journal file."""
+        self._apply(record)
+        if not self._appendable:
+            self.save()
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def summary(self) -> Dict[str, int]:
+        counts = {PENDING: 0, DONE: 0, FAILED: 0}
+        for entry in self.data["files"].values():
+            for status in entry["pages"].values():
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def save(self):
+        """Writes the whole state as a single line, dropping the records it includes."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Same temp file and rename as cache.atomic_write_json, with the line end records follow
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.data, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._appendable = True
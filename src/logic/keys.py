@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import RATE_LIMIT_RPM, DAILY_REQUEST_LIMIT, QUOTA_COOLDOWN_S
+from src.logic.cache import atomic_write_json, text_digest
+from src.logic.errors import classify_error, is_daily_quota, QUOTA, AUTH
+from src.logic.ratelimit import RateLimiter
+
+def parse_api_keys(*values: Optional[str]) -> List[str]:
+    """Splits comma-separated key lists (e.g. API_KEY and API_KEYS), dropping blanks and duplicates."""
+    keys = []
+    for value in values:
+        for key in (value or "").split(","):
+            key = key.strip()
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+def load_api_keys(env_path: Optional[str] = None) -> List[str]:
+    """Keys from API_KEY / API_KEYS in src/api_key.env (or the environment)."""
+    from dotenv import load_dotenv
+    if env_path is None:
+        env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api_key.env")
+    load_dotenv(env_path)
+    return parse_api_keys(os.getenv("API_KEY"), os.getenv("API_KEYS"))
+
+def mask_key(key: str) -> str:
+    return f"...{key[-4:]}"
+
+class KeySlot:
+    """One API key with its own client, rate limiter and usage counters."""
+    def __init__(self, key: str, rpm: float, daily_limit: int):
+        self.key = key
+        self.limiter = RateLimiter(rpm)
+        self.daily_limit = daily_limit
+        self.used_today = 0
+        self.requests = 0
+        self.cooldown_until = 0.0
+        self.disabled = None  # Reason the key was taken out of rotation
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=self.key)
+        return self._client
+
+    def remaining(self) -> float:
+        return self.daily_limit - self.used_today if self.daily_limit else float("inf")
+
+    def usable(self) -> bool:
+        return self.disabled is None and self.remaining() > 0
+
+class _PoolModels:
+    def __init__(self, pool: "KeyPool"):
+        self.pool = pool
+
+    def reserve(self, block: bool = True) -> Optional[Callable[..., Any]]:
+        return self.pool.reserve(block)
+
+    def generate_content(self, **kwargs):
+        return self.pool.generate_content(**kwargs)
+
+class KeyPool:
+    """
+    Drop-in replacement for a genai client spreading requests over several API keys.
+    Each request goes to the key with the most headroom; a key hitting its daily quota
+    or rejected with 401/403 leaves the rotation, and a per-minute 429 cools it down.
+    Errors only reach the caller once no key is left to retry on.
+    """
+    def __init__(self, keys: List[str], rpm: float = RATE_LIMIT_RPM, daily_limit: int = DAILY_REQUEST_LIMIT,
+                 cooldown: float = QUOTA_COOLDOWN_S, usage_path: Optional[str] = None):
+        if not keys:
+            raise ValueError("At least one API key is required")
+        self.slots = [KeySlot(k, rpm, daily_limit) for k in keys]
+        self.cooldown = cooldown
+        self.usage_path = usage_path
+        self.lock = threading.Lock()
+        self.models = _PoolModels(self)
+        self._load_usage()
+
+    # Daily counters survive between runs; keys are stored by digest, never in clear
+    def _load_usage(self):
+        if not self.usage_path:
+            return
+        try:
+            with open(self.usage_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("date") != time.strftime('%Y-%m-%d'):
+            return
+        for slot in self.slots:
+            slot.used_today = data.get("keys", {}).get(text_digest(slot.key), 0)
+
+    def save_usage(self):
+        if not self.usage_path:
+            return
+        os.makedirs(os.path.dirname(self.usage_path) or ".", exist_ok=True)
+        with self.lock:
+            data = {"date": time.strftime('%Y-%m-%d'),
+                    "keys": {text_digest(s.key): s.used_today for s in self.slots}}
+        atomic_write_json(self.usage_path, data)
+
+    def _pick(self, block: bool = True) -> Optional[KeySlot]:
+        """
+        Usable key with the most headroom, waiting out cooldowns if every key is cooling down.
+        Without block, only a key with a rate limit token right now is taken (and its token with it).
+        """
+        while True:
+            with self.lock:
+                usable = [s for s in self.slots if s.usable()]
+                if not usable:
+                    return None
+                now = time.monotonic()
+                ready = sorted((s for s in usable if s.cooldown_until <= now),
+                               key=lambda s: (s.limiter.available(), s.remaining()), reverse=True)
+                if not block:
+                    ready = next(([s] for s in ready if s.limiter.try_acquire()), None)
+                    if ready is None:
+                        return None
+                if ready:
+                    slot = ready[0]
+                    slot.used_today += 1
+                    slot.requests += 1
+                    return slot
+                wait_for = min(s.cooldown_until for s in usable) - now
+            time.sleep(max(wait_for, 0.01))
+
+    def reserve(self, block: bool = True) -> Optional[Callable[..., Any]]:
+        """A key and its rate limit token for one request (see ratelimit.reserve_request)."""
+        slot = self._pick(block)
+        if slot is None:
+            if block:
+                raise RuntimeError("No API key left in rotation")
+            return None
+        if block:
+            slot.limiter.acquire()
+        return lambda **kwargs: self._send(slot, kwargs)
+
+    def _send(self, slot: KeySlot, kwargs: Dict[str, Any]):
+        last_error = None
+        while True:
+            try:
+                return slot.client.models.generate_content(**kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind not in (QUOTA, AUTH):
+                    raise
+                last_error = e
+                with self.lock:
+                    others = [s for s in self.slots if s is not slot and s.usable()]
+                    if kind == AUTH:
+                        slot.disabled = "rejected"
+                    elif is_daily_quota(e):
+                        slot.disabled = "daily quota"
+                    elif others:
+                        slot.cooldown_until = time.monotonic() + self.cooldown
+                    else:
+                        # A per-minute 429 on the only usable key is left to the caller's backoff
+                        raise
+            slot = self._pick()
+            if slot is None:
+                raise last_error
+            slot.limiter.acquire()
+
+    def generate_content(self, **kwargs):
+        return self.reserve()(**kwargs)
+
+    def active_keys(self) -> int:
+        return sum(1 for s in self.slots if s.usable())
+
+    def summary(self) -> List[str]:
+        lines = []
+        for slot in self.slots:
+            status = slot.disabled or ("daily limit reached" if not slot.usable() else "active")
+            remaining = "" if not slot.daily_limit else f", {max(slot.remaining(), 0):.0f} left today"
+            lines.append(f"Key {mask_key(slot.key)}: {slot.requests} request(s){remaining} ({status})")
+        return lines
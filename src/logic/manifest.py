@@ -0,0 +1,58 @@
+import os
+import json
+import hashlib
+from typing import List
+
+from src.logic.cache import atomic_write_json
+
+class OutputManifest:
+    """
+    Records which page-cache entries (and settings) produced each output
+    sheet or file, so a re-run only rewrites the outputs whose inputs changed.
+    Output ids are file paths, or "<workbook>#<sheet>" for Excel sheets.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"outputs": {}, "files": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                self.data["outputs"].update(loaded.get("outputs", {}))
+                self.data["files"].update(loaded.get("files", {}))
+            except (OSError, ValueError):
+                pass # A broken manifest only means everything gets rewritten once
+
+    @staticmethod
+    def fingerprint(inputs: List[str], **settings) -> str:
+        payload = json.dumps({"inputs": inputs, "settings": settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def _stat(file_path: str) -> List[int]:
+        st = os.stat(file_path)
+        return [st.st_size, st.st_mtime_ns]
+
+    def is_current(self, output_id: str, file_path: str, fingerprint: str) -> bool:
+        """True if the output exists, was not touched since we wrote it, and has the same inputs."""
+        entry = self.data["outputs"].get(output_id)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        if not os.path.exists(file_path):
+            return False
+        return self.data["files"].get(os.path.abspath(file_path)) == self._stat(file_path)
+
+    def record(self, output_id: str, file_path: str, fingerprint: str, inputs: List[str]):
+        self.data["outputs"][output_id] = {
+            "file": os.path.abspath(file_path),
+            "fingerprint": fingerprint,
+            "inputs": inputs
+        }
+
+    def mark_written(self, file_path: str):
+        """Stores the file stat after a write so external edits invalidate the entry."""
+        self.data["files"][os.path.abspath(file_path)] = self._stat(file_path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_write_json(self.path, self.data, indent=2)
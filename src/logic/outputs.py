@@ -0,0 +1,40 @@
+import os
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from src.logic.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def sheet_name_for(file_name: str) -> str:
+    """Excel sheet name for a PDF (sheet names are limited to 31 characters)."""
+    return os.path.splitext(os.path.basename(file_name))[0][:31].strip()
+
+@profiled("excel_write")
+def write_excel_sheets(excel_path: str, sheets: Dict[str, "pd.DataFrame"], summary_text: Optional[str] = None,
+                       order: Optional[List[str]] = None):
+    """
+    Writes only the given sheets, opening the workbook a single time.
+    Existing sheets are replaced in place and every other sheet is left untouched.
+    Sheets named in `order` are rearranged among their own positions to follow it.
+    """
+    import pandas as pd
+    if os.path.exists(excel_path):
+        writer = pd.ExcelWriter(excel_path, engine='openpyxl', mode='a', if_sheet_exists='replace')
+    else:
+        writer = pd.ExcelWriter(excel_path, engine='openpyxl')
+        if summary_text:
+            pd.DataFrame([[summary_text]]).to_excel(writer, sheet_name="Summary", index=False, header=False)
+    with writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False, header=False)
+        if order:
+            _reorder_sheets(writer.book, order)
+
+def _reorder_sheets(book, order: List[str]):
+    names = [name for name in order if name in book.sheetnames]
+    target = list(book.sheetnames)
+    for slot, name in zip(sorted(target.index(name) for name in names), names):
+        target[slot] = name
+    for position, name in enumerate(target):
+        book.move_sheet(name, position - book.sheetnames.index(name))
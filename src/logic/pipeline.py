@@ -0,0 +1,586 @@
+import os
+import threading
+import collections
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Callable
+
+from src.config import (DEFAULT_PROMPT, DEDUP_PAGES, CROP_TABLE_REGIONS, USE_MODEL_CASCADE, MODEL_CASCADE,
+                        USE_TEXT_LAYER, USE_JSON_OUTPUT, SCHEDULE_POLICY, MAX_CONCURRENCY, RASTERIZER,
+                        USE_TRIAGE, TRIAGE_BATCH_PAGES, REEXTRACT_BELOW)
+from src.logic.cache import PageCache, MemoryCache, text_digest
+from src.logic.dedup import PageDeduplicator
+from src.logic.hedging import default_hedger
+from src.logic.journal import RunJournal, PENDING, DONE, FAILED
+from src.logic.keys import KeyPool, load_api_keys
+from src.logic.profiling import stage
+from src.logic.rasterize import close_document
+from src.logic.processor import (prepare_page, request_tables, request_with_cascade, parse_page_query,
+                                 new_cascade_stats, cascade_summary)
+from src.logic.scheduler import dispatch_order
+from src.logic.ratelimit import LimitedClient
+from src.logic.validation import page_score
+from src.logic.triage import TriageIndex, needs_triage, thumbnail, thumbnail_key, request_triage, verdict_regions
+from src.logic.sinks import Sink
+from src.logic.sources import PdfSource, PdfInput
+
+# Status of a yielded page result
+CACHED = "cached"              # Restored from the page cache
+EXTRACTED = "extracted"        # Sent to the model
+DEDUPLICATED = "deduplicated"  # Reused from an identical page
+SKIPPED = "skipped"            # Left out by the journal (see request_pending / request_failed)
+TRIAGED = "triaged"            # Left out by the triage pass (no tables on the thumbnail)
+# FAILED (from the journal) marks a page or document that raised an error
+
+def select_pages(prompt: str, pdf_path: str, total_pages: int, all_names: List[str]) -> List[int]:
+    """Page indexes of a PDF requested by the prompt (all pages if it names none)."""
+    # The default prompt selects no pages; file names are only matched in custom prompts
+    # (a file named e.g. "a" would otherwise match the article in the default prompt)
+    if prompt == DEFAULT_PROMPT:
+        return parse_page_query(prompt, total_pages)
+    return parse_page_query(prompt, total_pages, os.path.basename(pdf_path), all_names)
+
+class ExtractOptions:
+    """Settings of an extraction run. Defaults come from src/config.py."""
+    def __init__(self, prompt: str = DEFAULT_PROMPT, crop_tables: bool = CROP_TABLE_REGIONS,
+                 text_layer: bool = USE_TEXT_LAYER, json_output: bool = USE_JSON_OUTPUT,
+                 cascade: bool = USE_MODEL_CASCADE, dedup: bool = DEDUP_PAGES, cache_dir: Optional[str] = None,
+                 request_pending: bool = True, request_failed: bool = True, policy: str = SCHEDULE_POLICY,
+                 concurrency: int = MAX_CONCURRENCY, rasterizer: str = RASTERIZER, triage: bool = USE_TRIAGE,
+                 reextract_below: Optional[float] = REEXTRACT_BELOW):
+        self.prompt = prompt
+        self.crop_tables = crop_tables
+        self.text_layer = text_layer
+        self.json_output = json_output
+        self.cascade = cascade
+        self.dedup = dedup
+        self.cache_dir = cache_dir  # None keeps the page cache and dedup index in memory
+        # Which journal states are sent to the model (pages without a journal are always requested)
+        self.request_pending = request_pending
+        self.request_failed = request_failed
+        # Order of the pages of several documents (see scheduler.POLICIES) and pages requested at once
+        self.policy = policy
+        self.concurrency = concurrency
+        # Page rendering backend (see rasterize.RASTERIZERS); it changes pixels, not results, so it is not in the cache key
+        self.rasterizer = rasterizer
+        # Thumbnail triage of scanned pages before extraction (see triage.py)
+        self.triage = triage
+        # Cached pages whose lowest table score is below this are requested again (None reuses every cached page)
+        self.reextract_below = reextract_below
+
+    def page_settings(self) -> Dict[str, Any]:
+        """Settings the page results depend on, part of every cache key."""
+        settings = {"crop": self.crop_tables, "text": self.text_layer, "json": self.json_output}
+        if self.cascade:
+            # Results depend on the whole cascade, not on a single model
+            settings["model"] = "+".join(MODEL_CASCADE)
+        if self.triage:
+            # Pages the triage pass leaves out are cached as having no tables
+            settings["triage"] = True
+        return settings
+
+class Pipeline:
+    """
+    The extraction flow shared by the CLI, the GUI and library callers.
+    run() yields one result per selected page as soon as it is available:
+    {"doc", "name", "page", "status", "tables", "error"}, where tables are
+    {"df", "md", ...} dicts. Pages of all documents are scheduled together
+    (options.policy, up to options.concurrency requests at once): results of a
+    document come in page order, but documents interleave and finish as soon as
+    their last page is done. Documents that cannot be read yield a single
+    FAILED result with page None. Cache, rate limiter, journal and output
+    sinks are pluggable; missing ones get in-memory defaults.
+    Quota and key errors that affect every page stop the run: sinks are closed
+    (completed documents are written) and the error is raised to the caller.
+    """
+    def __init__(self, options: Optional[ExtractOptions] = None, client: Any = None, cache: Optional[PageCache] = None,
+                 deduplicator: Optional[PageDeduplicator] = None, journal: Optional[RunJournal] = None,
+                 limiter: Any = None, sinks: Iterable[Sink] = (), log_callback: Optional[Callable[[int], None]] = None):
+        self.options = options or ExtractOptions()
+        cache_dir = self.options.cache_dir
+        if client is None:
+            client = KeyPool(load_api_keys(), usage_path=os.path.join(cache_dir, "key_usage.json") if cache_dir else None)
+        self.client = LimitedClient(client, limiter) if limiter is not None else client
+        self.cache = cache if cache is not None else PageCache(cache_dir) if cache_dir else MemoryCache()
+        if deduplicator is None and self.options.dedup:
+            deduplicator = PageDeduplicator(os.path.join(cache_dir, "dedup_index.json") if cache_dir else None)
+        self.deduplicator = deduplicator
+        self.triage_index = None
+        if self.options.triage:
+            self.triage_index = TriageIndex(os.path.join(cache_dir, "triage_index.json") if cache_dir else None)
+        self.journal = journal
+        self.sinks = list(sinks)
+        self.log_callback = log_callback  # Called with the page number before a model request
+        self.page_settings = self.options.page_settings()
+        self.scope = self.cache.scope(self.options.prompt, **self.page_settings)
+        self.cascade_stats = new_cascade_stats(MODEL_CASCADE)
+        self.tracker = {"has_error": False}
+        self.reextracted = [0, 0]  # Low-scoring pages requested again, and how many of them improved
+        self._requested = set()    # Cache keys of the low-scoring pages already requested again
+        self._lock = threading.Lock()
+
+    def run(self, pdfs: List[PdfInput]) -> Iterator[Dict[str, Any]]:
+        """pdfs are paths ("-" for stdin), bytes, file-like objects or (name, data) tuples."""
+        sources = [PdfSource(pdf, i) for i, pdf in enumerate(pdfs)]
+        all_names = [source.name for source in sources]
+        try:
+            # Every input is read up front so the scheduler knows the selected pages of each one
+            runs = []
+            for index, source in enumerate(sources):
+                run = self._inspect(index, source, all_names)
+                if isinstance(run, _DocumentRun):
+                    runs.append(run)
+                else:
+                    yield run
+            yield from self._schedule(runs)
+        finally:
+            self._finish()
+
+    def plan(self, pdfs: List[PdfInput]) -> Dict[str, Any]:
+        """
+        Dry run of run(): every selected page is resolved as run() would (cache, journal,
+        known triage verdicts, duplicates) without any model request and without writing
+        the cache, indexes or journal. Returns {"documents": [{"name", "pages", "error"}],
+        "counts": pages by status, "requests": input tokens of each extraction request,
+        "triage": thumbnail tokens of the scanned pages without a verdict, per document,
+        "outputs": output tokens of each cached page}. See planner.estimate.
+        """
+        import pdfplumber
+        from src.logic.planner import page_requests, output_tokens, image_tokens
+        from src.config import TRIAGE_RESOLUTION
+        sources = [PdfSource(pdf, i) for i, pdf in enumerate(pdfs)]
+        all_names = [source.name for source in sources]
+        opts = self.options
+        plan = {"documents": [], "counts": {status: 0 for status in (EXTRACTED, CACHED, DEDUPLICATED, TRIAGED, SKIPPED)},
+                "requests": [], "triage": [], "outputs": []}
+        seen, pending = set(), {"text": {}, "pixels": {}, "image": []}
+        for index, source in enumerate(sources):
+            run = self._inspect(index, source, all_names)
+            if not isinstance(run, _DocumentRun):
+                plan["documents"].append({"name": run["name"], "pages": 0, "error": run["error"]})
+                continue
+            doc, thumbnails = run.doc, []
+            plan["documents"].append({"name": doc["name"], "pages": len(doc["pages"]), "error": None})
+            plan["triage"].append(thumbnails)
+            with source, pdfplumber.open(source.stream) as pdf:
+                run.pdf = pdf
+                try:
+                    for pos, p_idx in enumerate(doc["pages"]):
+                        cache_key = doc["page_keys"][pos]
+                        cached = self.cache.get(cache_key) if self.cache.has(cache_key) else None
+                        if cached is not None:
+                            plan["outputs"].append(output_tokens(cached))
+                            threshold, score = opts.reextract_below, page_score(cached)
+                            if threshold is None or score is None or score >= threshold or cache_key in seen:
+                                plan["counts"][CACHED] += 1
+                                continue
+                        if self._journal_skips(run, p_idx):
+                            plan["counts"][SKIPPED] += 1
+                            continue
+                        if cache_key in seen:
+                            # The same page given twice waits for the first one
+                            plan["counts"][CACHED] += 1
+                            continue
+                        seen.add(cache_key)
+
+                        page = pdf.pages[p_idx]
+                        verdict = None
+                        if self.triage_index is not None and cached is None and needs_triage(page):
+                            verdict = self.triage_index.get(thumbnail_key(thumbnail(page, opts.rasterizer)))
+                            if verdict is None:
+                                thumbnails.append(image_tokens(page.width, page.height, TRIAGE_RESOLUTION))
+                            elif not verdict["tables"]:
+                                plan["counts"][TRIAGED] += 1
+                                continue
+                        if self.deduplicator and cached is None:
+                            tables, signature = self.deduplicator.lookup(page, self.scope, self.cache)
+                            if tables is not None or self.deduplicator.match(pending, *signature) is not None:
+                                plan["counts"][DEDUPLICATED] += 1
+                                continue
+                            self.deduplicator.add(pending, signature, cache_key)
+
+                        regions = verdict_regions(page, verdict) if verdict is not None and opts.crop_tables else None
+                        plan["requests"] += page_requests(page, opts.prompt, opts.crop_tables, opts.text_layer,
+                                                          opts.json_output, regions)
+                        plan["counts"][EXTRACTED] += 1
+                finally:
+                    close_document(pdf)
+        return plan
+
+    def _inspect(self, index: int, source: PdfSource, all_names: List[str]) -> Any:
+        """A _DocumentRun for the document, or the FAILED result of an unreadable one."""
+        import pdfplumber
+        # In-memory documents are identified by their name and are not journaled (they cannot be resumed)
+        doc_id = source.path or source.name
+        try:
+            with stage("page_open"):
+                with source:
+                    with pdfplumber.open(source.stream) as pdf:
+                        total_pages = len(pdf.pages)
+        except Exception as e:
+            return {"doc": doc_id, "name": source.name, "page": None, "status": FAILED, "tables": [], "error": str(e)}
+
+        pages = select_pages(self.options.prompt, doc_id, total_pages, all_names)
+        doc = {"path": doc_id, "name": source.name, "index": index, "digest": source.digest, "pages": pages,
+               "total_pages": total_pages, "in_memory": source.path is None,
+               "page_keys": [self.cache.key(source.digest, p_idx, self.options.prompt, **self.page_settings)
+                             for p_idx in pages],
+               "results": [], "changed": False, "complete": True, "failed": 0}
+        return _DocumentRun(source, doc, self.journal if source.path else None)
+
+    def _schedule(self, runs: List["_DocumentRun"]) -> Iterator[Dict[str, Any]]:
+        """
+        Dispatches the pages of all documents in policy order to a pool of
+        options.concurrency workers. The PDF pages are only touched on this thread;
+        workers get the prepared inputs and send the model requests. Results are
+        passed to the sinks in page order and each document is finished as soon
+        as its last page is done. At most options.concurrency documents are open
+        at once; pages of the next documents wait until one of them is finished.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        opts = self.options
+        order = dispatch_order([len(run.doc["pages"]) for run in runs], opts.policy)
+        retry = collections.deque()  # Pages whose in-flight duplicate failed, dispatched on their own
+        deferred = {}                # Run index -> pages waiting for their document to be opened
+        inflight = {}                # Future -> page job
+        followers = {}               # Cache key of an in-flight page -> jobs waiting for its result
+        pending = {"text": {}, "pixels": {}, "image": []}  # Dedup signatures of in-flight pages -> their cache key
+        fatal = None
+        workers = max(1, opts.concurrency)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for run in runs:
+                if not run.doc["pages"]:
+                    # Nothing selected in this document: it is reported as done right away
+                    error = run.start(self.sinks)
+                    if error is not None:
+                        yield error
+                    elif not run.finished:
+                        run.finish(self.sinks, complete=True)
+            while True:
+                while fatal is None and len(inflight) < workers:
+                    item = retry.popleft() if retry else self._next_page(runs, order, deferred, workers)
+                    if item is None:
+                        break
+                    run = runs[item[0]]
+                    if not run.started:
+                        error = run.start(self.sinks)
+                        if error is not None:
+                            yield error
+                        elif self.triage_index is not None:
+                            try:
+                                self._triage(run)
+                            except Exception as e:
+                                if self.tracker["has_error"]:
+                                    fatal = e
+                                    continue
+                                # Without verdicts the pages are extracted as usual
+                    if run.failed:
+                        continue
+                    job = {"item": item, "run": run, "pos": item[1], "p_idx": run.doc["pages"][item[1]],
+                           "cache_key": run.doc["page_keys"][item[1]], "signature": None}
+                    result = self._lookup(job, followers, pending)
+                    if result is None:
+                        # Waits for an identical page already in flight
+                        continue
+                    if result.get("status") is not None:
+                        run.ready[job["pos"]] = result
+                        yield from self._emit(run)
+                        continue
+                    future = executor.submit(self._request, result["inputs"])
+                    inflight[future] = job
+                    followers[job["cache_key"]] = []
+                    if job["signature"] is not None:
+                        self.deduplicator.add(pending, job["signature"], job["cache_key"])
+
+                if not inflight:
+                    break
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = inflight.pop(future)
+                    waiting = followers.pop(job["cache_key"])
+                    _forget(pending, job["cache_key"])
+                    try:
+                        tables = future.result()
+                    except Exception as e:
+                        if self.tracker["has_error"]:
+                            # Quota or key errors affect every remaining page: stop, the pages stay pending
+                            fatal = fatal or e
+                            continue
+                        job["run"].ready[job["pos"]] = self._failed(job, e)
+                        retry.extend(w["item"] for w in waiting)
+                    else:
+                        status = EXTRACTED
+                        if "previous" in job:
+                            self.reextracted[0] += 1
+                            if (page_score(tables) or 0) >= page_score(job["previous"]):
+                                self.reextracted[1] += 1
+                            else:
+                                tables, status = job["previous"], CACHED
+                        job["run"].ready[job["pos"]] = self._store(job, tables, status)
+                        for w in waiting:
+                            same_page = w["cache_key"] == job["cache_key"]
+                            if not same_page and self.deduplicator: self.deduplicator.deduplicated += 1
+                            w["run"].ready[w["pos"]] = self._store(w, tables, CACHED if same_page else DEDUPLICATED)
+                    for run in {job["run"]} | {w["run"] for w in waiting}:
+                        yield from self._emit(run)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Documents left mid-way (fatal error, or the caller stopped iterating) are incomplete
+            for run in runs:
+                if run.started and not run.finished:
+                    run.finish(self.sinks, complete=False)
+        if fatal is not None:
+            raise fatal
+
+    @staticmethod
+    def _next_page(runs: List["_DocumentRun"], order: Iterator[tuple], deferred: Dict[int, collections.deque],
+                   limit: int) -> Optional[tuple]:
+        """
+        Next page to dispatch in policy order, keeping at most `limit` documents open:
+        pages of a document that cannot be opened yet are set aside in `deferred` and
+        come first once their document is open or another document has finished.
+        """
+        def can_open():
+            return sum(run.started and not run.finished for run in runs) < limit
+        for index in deferred:
+            if runs[index].started or can_open():
+                item = deferred[index].popleft()
+                if not deferred[index]:
+                    del deferred[index]
+                return item
+        for item in order:
+            if runs[item[0]].started or (not deferred and can_open()):
+                return item
+            deferred.setdefault(item[0], collections.deque()).append(item)
+        return None
+
+    def _lookup(self, job: Dict[str, Any], followers: Dict[str, list], pending: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Resolves a page without a model request when possible: a page result (cached,
+        skipped by the journal, duplicate or failed to render), None when the page waits
+        for an identical in-flight page, or {"inputs"} to send to the model.
+        """
+        run, p_idx, cache_key = job["run"], job["p_idx"], job["cache_key"]
+        doc, journal = run.doc, run.journal
+        result = {"doc": doc["path"], "name": doc["name"], "page": p_idx, "tables": [], "error": None}
+        cached = self.cache.get(cache_key) if self.cache.has(cache_key) else None
+        if cached is not None:
+            threshold, score = self.options.reextract_below, page_score(cached)
+            if threshold is None or score is None or score >= threshold or cache_key in self._requested:
+                if journal: journal.mark(doc["path"], p_idx, DONE, save=False)
+                return dict(result, status=CACHED, tables=cached)
+            # A low-scoring page is requested again (once per run); the better of both results is kept
+            job["previous"] = cached
+            self._requested.add(cache_key)
+
+        status = self._journal_skips(run, p_idx)
+        if status is not None:
+            doc["failed"] += status == FAILED
+            doc["complete"] = doc["complete"] and status == FAILED
+            return dict(result, status=SKIPPED, error=status)
+
+        if cache_key in followers:
+            # The same page is already being extracted (e.g. a file given twice)
+            followers[cache_key].append(job)
+            return None
+
+        with stage("page_open"):
+            page = run.pdf.pages[p_idx]
+        verdict = run.verdicts.get(job["pos"])
+        if verdict is not None and not verdict["tables"]:
+            self.triage_index.skipped += 1
+            return self._store(job, [], TRIAGED)
+        if self.deduplicator and "previous" in job:
+            # A duplicate would only bring back the same low-scoring result
+            job["signature"] = self.deduplicator.signature(page)
+        elif self.deduplicator:
+            tables, job["signature"] = self.deduplicator.lookup(page, self.scope, self.cache)
+            if tables is not None:
+                return self._store(job, tables, DEDUPLICATED)
+            leader = self.deduplicator.match(pending, *job["signature"])
+            if leader is not None:
+                followers[leader].append(job)
+                return None
+
+        try:
+            if self.log_callback:
+                self.log_callback(page.page_number)
+            opts = self.options
+            # Triage boxes stand in for region detection on scanned pages
+            regions = verdict_regions(page, verdict) if verdict is not None and opts.crop_tables else None
+            return {"inputs": prepare_page(page, opts.prompt, opts.crop_tables, opts.text_layer, opts.json_output,
+                                           opts.rasterizer, regions)}
+        except Exception as e:
+            return self._failed(job, e)
+
+    def _triage(self, run: "_DocumentRun"):
+        """
+        First pass over the scanned pages of a document that are not cached yet: their
+        thumbnails are sent TRIAGE_BATCH_PAGES at a time and the verdicts are kept by
+        page position (and in the triage index, by thumbnail). Runs when the document starts.
+        """
+        doc, batch = run.doc, []
+        for pos, p_idx in enumerate(doc["pages"]):
+            if self.cache.has(doc["page_keys"][pos]) or self._journal_skips(run, p_idx):
+                continue
+            with stage("page_open"):
+                page = run.pdf.pages[p_idx]
+            if not needs_triage(page):
+                continue
+            png = thumbnail(page, self.options.rasterizer)
+            key = thumbnail_key(png)
+            verdict = self.triage_index.get(key)
+            if verdict is not None:
+                run.verdicts[pos] = verdict
+            else:
+                batch.append((pos, png, key))
+        for start in range(0, len(batch), TRIAGE_BATCH_PAGES):
+            chunk = batch[start:start + TRIAGE_BATCH_PAGES]
+            self.triage_index.requests += 1
+            verdicts = request_triage(self.client, [png for _, png, _ in chunk], self.tracker)
+            for (pos, _, key), verdict in zip(chunk, verdicts):
+                if verdict is not None:
+                    run.verdicts[pos] = verdict
+                    self.triage_index.put(key, verdict)
+
+    def _journal_skips(self, run: "_DocumentRun", p_idx: int) -> Optional[str]:
+        """Journal status of a page this run leaves out (see request_pending / request_failed), or None."""
+        if not run.journal:
+            return None
+        status = run.journal.status(run.doc["path"], p_idx)
+        if (status == FAILED and not self.options.request_failed) or \
+                (status == PENDING and not self.options.request_pending):
+            return status
+        return None
+
+    def _request(self, inputs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Runs on a worker thread: model requests and parsing only."""
+        if not self.options.cascade:
+            return request_tables(self.client, inputs, self.tracker)
+        stats = new_cascade_stats(MODEL_CASCADE)
+        try:
+            return request_with_cascade(self.client, inputs, MODEL_CASCADE, self.tracker, stats)
+        finally:
+            with self._lock:
+                for key, counts in stats.items():
+                    self.cascade_stats[key] = [a + b for a, b in zip(self.cascade_stats[key], counts)]
+
+    def _store(self, job: Dict[str, Any], tables: List[Dict[str, Any]], status: str) -> Dict[str, Any]:
+        doc, p_idx, cache_key = job["run"].doc, job["p_idx"], job["cache_key"]
+        doc["changed"] = True
+        # Always save the cache entry (even if empty) to mark the page as analyzed
+        self.cache.put(cache_key, tables, {"doc": doc["name"], "doc_digest": doc["digest"], "page": p_idx,
+                                           "prompt": text_digest(self.options.prompt)})
+        if self.deduplicator and job["signature"] is not None:
+            self.deduplicator.remember(job["signature"], self.scope, cache_key)
+        if job["run"].journal: job["run"].journal.mark(doc["path"], p_idx, DONE)
+        return {"doc": doc["path"], "name": doc["name"], "page": p_idx, "status": status, "tables": tables, "error": None}
+
+    def _failed(self, job: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        doc, p_idx = job["run"].doc, job["p_idx"]
+        if job["run"].journal: job["run"].journal.mark(doc["path"], p_idx, FAILED, error=str(error))
+        doc["failed"] += 1
+        return {"doc": doc["path"], "name": doc["name"], "page": p_idx, "status": FAILED, "tables": [], "error": str(error)}
+
+    def _emit(self, run: "_DocumentRun") -> Iterator[Dict[str, Any]]:
+        """Passes the finished pages of a document to the sinks and the caller, in page order."""
+        while run.emitted in run.ready:
+            result = run.ready.pop(run.emitted)
+            run.emitted += 1
+            run.doc["results"].extend(result["tables"])
+            for sink in self.sinks: sink.add_page(result)
+            if run.emitted == len(run.doc["pages"]):
+                run.finish(self.sinks, complete=True)
+            yield result
+
+    def _finish(self):
+        try:
+            # Every sink gets closed even if another one fails
+            errors = []
+            for sink in self.sinks:
+                try:
+                    sink.close()
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+        finally:
+            if self.deduplicator: self.deduplicator.save()
+            if self.triage_index: self.triage_index.save()
+            # Pages were appended to the journal as they finished; it is compacted once per run
+            if self.journal: self.journal.save()
+            if hasattr(self.client, "save_usage"): self.client.save_usage()
+
+    def summary(self) -> List[str]:
+        """Run statistics worth reporting (duplicates, cascade tiers, hedging, key usage)."""
+        lines = []
+        if self.deduplicator and self.deduplicator.deduplicated:
+            lines.append(f"Deduplicated {self.deduplicator.deduplicated} page(s), saving the same number of model calls")
+        if self.triage_index and (self.triage_index.requests or self.triage_index.skipped):
+            lines.append(f"Triage: {self.triage_index.requests} thumbnail request(s), "
+                         f"{self.triage_index.skipped} page(s) without tables skipped")
+        if self.reextracted[0]:
+            lines.append(f"Re-extracted {self.reextracted[0]} page(s) scoring below {self.options.reextract_below}, "
+                         f"{self.reextracted[1]} improved")
+        if self.options.cascade:
+            lines += cascade_summary(self.cascade_stats, MODEL_CASCADE)
+        if default_hedger().hedges:
+            lines.append(f"Hedging: {default_hedger().summary()}")
+        pool = getattr(self.client, "client", self.client)  # Unwrapped from a limiter or recorder
+        if isinstance(pool, KeyPool) and len(pool.slots) > 1:
+            lines += pool.summary()
+        return lines
+
+class _DocumentRun:
+    """A document being scheduled: its open PDF, journal and the pages finished out of order."""
+    def __init__(self, source: PdfSource, doc: Dict[str, Any], journal: Optional[RunJournal]):
+        self.source = source
+        self.doc = doc
+        self.journal = journal
+        self.pdf = None
+        self.ready = {}     # Page position -> result waiting for the pages before it
+        self.verdicts = {}  # Page position -> triage verdict of a scanned page
+        self.emitted = 0    # Pages already passed to the sinks
+        self.started = False
+        self.failed = False
+        self.finished = False
+
+    def start(self, sinks: List[Sink]) -> Optional[Dict[str, Any]]:
+        """Opens the PDF when its first page is dispatched; returns a FAILED result if it cannot be read."""
+        import pdfplumber
+        self.started = True
+        doc = self.doc
+        try:
+            with stage("page_open"):
+                self.source.open()
+                self.pdf = pdfplumber.open(self.source.stream)
+        except Exception as e:
+            self.source.close()
+            self.failed = self.finished = True
+            return {"doc": doc["path"], "name": doc["name"], "page": None, "status": FAILED, "tables": [], "error": str(e)}
+        if self.journal: self.journal.start_file(doc["path"], doc["digest"], doc["pages"])
+        for sink in sinks: sink.begin_document(doc)
+        return None
+
+    def finish(self, sinks: List[Sink], complete: bool):
+        self.finished = True
+        self.doc["complete"] = self.doc["complete"] and complete
+        try:
+            close_document(self.pdf)
+            self.pdf.close()
+            self.source.close()
+        finally:
+            for sink in sinks: sink.end_document(self.doc)
+
+def _forget(pending: Dict[str, Any], cache_key: str):
+    """Removes an in-flight page from the pending dedup signatures."""
+    for kind in ("text", "pixels"):
+        pending[kind] = {sig: key for sig, key in pending[kind].items() if key != cache_key}
+    pending["image"] = [entry for entry in pending["image"] if entry[1] != cache_key]
+
+def extract(pdfs: List[PdfInput], options: Optional[ExtractOptions] = None, **components) -> Iterator[Dict[str, Any]]:
+    """
+    Library entry point: yields the per-page results of the given PDFs as they are extracted.
+    PDFs are paths ("-" for stdin), bytes, file-like objects or (name, data) tuples.
+    components are passed to Pipeline (client, cache, deduplicator, journal, limiter, sinks, log_callback).
+    """
+    return Pipeline(options, **components).run(pdfs)
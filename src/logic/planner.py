@@ -0,0 +1,158 @@
+import math
+from typing import List, Dict, Any, Optional
+
+from src.config import (AI_MODEL, MODEL_CASCADE, TRIAGE_MODEL, TRIAGE_BATCH_PAGES, TRIAGE_PROMPT, PAGE_RESOLUTION,
+                        TEXT_LAYER_PROMPT, JSON_OUTPUT_PROMPT, IMAGE_TILE_PX, IMAGE_SMALL_PX, IMAGE_TILE_TOKENS,
+                        CHARS_PER_TOKEN, PLAN_OUTPUT_TOKENS, PLAN_REQUEST_SECONDS, MODEL_PRICES,
+                        RATE_LIMIT_RPM, DAILY_REQUEST_LIMIT)
+from src.logic.keys import KeyPool
+from src.logic.pipeline import Pipeline, ExtractOptions, CACHED, EXTRACTED, DEDUPLICATED, SKIPPED, TRIAGED
+from src.logic.processor import base_prompt
+from src.logic.regions import find_table_regions, crop_region, region_resolution
+from src.logic.textlayer import serialize_words
+
+class _NoModels:
+    def generate_content(self, **kwargs):
+        raise RuntimeError("Planning sends no model requests")
+
+class NoRequests:
+    """Client of a planning pipeline: pages are only resolved locally, a model request would be a bug."""
+    def __init__(self):
+        self.models = _NoModels()
+
+def text_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def image_tokens(width_pt: float, height_pt: float, resolution: int) -> int:
+    """Input tokens of an image of an area of width x height points rendered at resolution dpi."""
+    width, height = width_pt * resolution / 72, height_pt * resolution / 72
+    if width <= IMAGE_SMALL_PX and height <= IMAGE_SMALL_PX:
+        return IMAGE_TILE_TOKENS
+    return math.ceil(width / IMAGE_TILE_PX) * math.ceil(height / IMAGE_TILE_PX) * IMAGE_TILE_TOKENS
+
+def output_tokens(tables: List[Dict[str, Any]]) -> int:
+    """Output tokens a page result took, from its markdown."""
+    return sum(text_tokens(table.get("md") or "") for table in tables)
+
+def page_requests(page: Any, prompt: str, crop_tables: bool = False, text_layer: bool = False,
+                  json_output: bool = False, regions: Optional[List[Any]] = None) -> List[int]:
+    """
+    Input tokens of each request prepare_page would send for a page, without rendering it:
+    the same choice of positional text, table regions or whole page as processor._page_inputs.
+    """
+    if regions is None:
+        regions = find_table_regions(page) if crop_tables else []
+    suffix = f"\n\n{JSON_OUTPUT_PROMPT}" if json_output else ""
+    prompt = base_prompt(prompt, json_output)
+    if text_layer:
+        texts = [serialize_words(page)]
+        if texts[0] and regions:
+            texts = [serialize_words(crop_region(page, region), min_words=1) for region in regions]
+        if all(texts):
+            base = text_tokens(f"{prompt}\n\n{TEXT_LAYER_PROMPT}{suffix}")
+            return [base + text_tokens(text) for text in texts]
+    base = text_tokens(prompt + suffix)
+    if regions:
+        return [base + image_tokens(x1 - x0, bottom - top, region_resolution((x0, top, x1, bottom)))
+                for x0, top, x1, bottom in regions]
+    return [base + image_tokens(page.width, page.height, PAGE_RESOLUTION)]
+
+def _price(model: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+    if model not in MODEL_PRICES:
+        return None
+    price_in, price_out = MODEL_PRICES[model]
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+def estimate(plan: Dict[str, Any], options: Optional[ExtractOptions] = None, keys: int = 1,
+             remaining: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Requests, tokens, cost and wall time of a plan (see Pipeline.plan) with the given
+    options and number of API keys. remaining is the daily quota left on the keys
+    (None for a fresh day). Cascade escalations are not included.
+    """
+    options = options or ExtractOptions()
+    model = MODEL_CASCADE[0] if options.cascade else AI_MODEL
+    counts = plan["counts"]
+
+    triage_requests, triage_tokens = 0, 0
+    for thumbnails in plan["triage"]:
+        for start in range(0, len(thumbnails), TRIAGE_BATCH_PAGES):
+            chunk = thumbnails[start:start + TRIAGE_BATCH_PAGES]
+            triage_requests += 1
+            labels = sum(text_tokens(f"Page {number}:") for number in range(1, len(chunk) + 1))
+            triage_tokens += text_tokens(TRIAGE_PROMPT) + labels + sum(chunk)
+
+    # Pages without tables answer with (almost) nothing, so the cached pages of the same inputs are a fair sample
+    samples = plan["outputs"]
+    per_page = sum(samples) / len(samples) if samples else PLAN_OUTPUT_TOKENS
+    input_tokens = sum(plan["requests"])
+    out_tokens = round(per_page * counts[EXTRACTED])
+    cost = _price(model, input_tokens, out_tokens)
+    if cost is not None and triage_requests:
+        triage_cost = _price(TRIAGE_MODEL, triage_tokens, 0)
+        cost = None if triage_cost is None else cost + triage_cost
+
+    total = len(plan["requests"]) + triage_requests
+    rpm = RATE_LIMIT_RPM * max(1, keys)
+    concurrency_s = math.ceil(total / max(1, options.concurrency)) * PLAN_REQUEST_SECONDS
+    rate_s = total / rpm * 60
+    daily = DAILY_REQUEST_LIMIT * max(1, keys) if DAILY_REQUEST_LIMIT else None
+    if remaining is None:
+        remaining = daily if daily is not None else float("inf")
+    days = None
+    if daily is not None and total > remaining:
+        days = 1 + math.ceil((total - remaining) / daily)
+    return {"model": model, "documents": plan["documents"], "counts": counts, "requests": len(plan["requests"]),
+            "triage_requests": triage_requests, "input_tokens": input_tokens + triage_tokens,
+            "output_tokens": out_tokens, "cost": cost, "seconds": max(concurrency_s, rate_s),
+            "bound": "rate limit" if rate_s > concurrency_s else "concurrency", "rpm": rpm, "keys": max(1, keys),
+            "concurrency": options.concurrency, "cascade": options.cascade, "remaining": remaining, "days": days}
+
+def _duration(seconds: float) -> str:
+    minutes = math.ceil(seconds / 60)
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes // 60} h {minutes % 60:02d} min"
+
+def plan_summary(est: Dict[str, Any]) -> List[str]:
+    """Report lines of an estimate (see estimate), shared by the CLI and the GUI."""
+    counts, documents = est["counts"], est["documents"]
+    lines = [f"Cannot read {doc['name']}: {doc['error']}" for doc in documents if doc["error"]]
+    parts = [f"{counts[EXTRACTED]} to extract"]
+    for status, label in [(CACHED, "cached"), (DEDUPLICATED, "duplicate(s)"), (TRIAGED, "without tables (triage)"),
+                          (SKIPPED, "left out by the journal")]:
+        if counts[status]:
+            parts.append(f"{counts[status]} {label}")
+    lines.append(f"Plan: {sum(counts.values())} page(s) in {len(documents)} document(s): {', '.join(parts)}")
+    requests = f"Requests: {est['requests']} extraction"
+    if est["triage_requests"]:
+        requests += f" + {est['triage_requests']} triage"
+    if est["cascade"]:
+        requests += " (more if pages escalate through the cascade)"
+    lines.append(requests)
+    lines.append(f"Tokens: ~{est['input_tokens']:,} input, ~{est['output_tokens']:,} output ({est['model']})")
+    if est["cost"] is None:
+        lines.append(f"Cost: unknown, no price for {est['model']} in MODEL_PRICES")
+    else:
+        cost = f"~${est['cost']:.2f}" if est["cost"] >= 0.01 else "under $0.01"
+        lines.append(f"Cost: {cost} at paid-tier prices")
+    lines.append(f"Time: ~{_duration(est['seconds'])} with {est['concurrency']} request(s) in flight and "
+                 f"{est['rpm']} request(s)/min over {est['keys']} key(s), {est['bound']} bound")
+    if est["days"] is not None:
+        lines.append(f"Daily quota: {est['requests'] + est['triage_requests']} request(s) exceed the {est['remaining']:.0f} "
+                     f"left today, the run spans about {est['days']} days")
+    return lines
+
+def plan_report(pdfs: List[Any], options: ExtractOptions, api_keys: List[str], usage_path: Optional[str] = None,
+                **components) -> List[str]:
+    """
+    Plans a run of the given PDFs (see Pipeline.plan; components as for Pipeline) and
+    returns its report. The API keys are never used, they only give the rate limits and,
+    with the usage file of the key pool, the quota left today.
+    """
+    pipeline = Pipeline(options, client=NoRequests(), **components)
+    remaining = None
+    if api_keys:
+        pool = KeyPool(api_keys, usage_path=usage_path)
+        remaining = sum(slot.remaining() for slot in pool.slots)
+    return plan_summary(estimate(pipeline.plan(pdfs), options, keys=len(api_keys), remaining=remaining))
@@ -1,14 +1,28 @@
 import os
-from src.config import AI_MODEL
+from src.config import (AI_MODEL, DEFAULT_PROMPT, DEFAULT_JSON_PROMPT, TEXT_LAYER_PROMPT, JSON_OUTPUT_PROMPT,
+                        PAGE_RESOLUTION, RASTERIZER)
 import time
 import re
-import pandas as pd
-from typing import List, Dict, Any, Optional
-from google import genai
-from PIL import Image
+import json
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
+from src.logic.regions import find_table_regions, render_region, crop_region
+from src.logic.textlayer import serialize_words
+from src.logic.validation import check_table, score_table, TRUNCATED_FACTOR
+from src.logic.errors import classify_error, FATAL_KINDS, AUTH, QUOTA, TRANSIENT, INVALID
+from src.logic.hedging import default_hedger
+from src.logic.ratelimit import reserve_request
+from src.logic.profiling import profiled
+from src.logic.rasterize import render_png
 
-def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
+# pandas and google-genai take most of the startup time, so they are imported on first use
+if TYPE_CHECKING:
+    import pandas as pd
+    from google import genai
+
+@profiled("normalize_df")
+def normalize_df(df: "pd.DataFrame") -> "pd.DataFrame":
     """Cleans and normalizes DataFrame content."""
+    import pandas as pd
     def clean_cell(val):
         if pd.isna(val) or val is None: return ""
         s = str(val).strip()
@@ -20,8 +34,10 @@ def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
             return s
     return df.apply(lambda col: col.map(clean_cell))
 
-def parse_md(md_text: str) -> pd.DataFrame:
+@profiled("parse_md")
+def parse_md(md_text: str) -> "pd.DataFrame":
     """Parses Markdown table text into a pandas DataFrame."""
+    import pandas as pd
     lines = md_text.strip().split('\n')
     data = []
     for line in lines:
@@ -40,6 +56,74 @@ def parse_md(md_text: str) -> pd.DataFrame:
     norm_data = [row + [''] * (max_cols - len(row)) for row in data]
     return pd.DataFrame(norm_data)
 
+def _salvage_json(json_text: str) -> Any:
+    """
+    Decodes what a cut-off JSON response received completely: the text is cut after the
+    last closing bracket that leaves valid JSON once the open ones are closed. None if nothing decodes.
+    """
+    closers, stack, in_string, escaped = [], [], False, False
+    for i, ch in enumerate(json_text):
+        if in_string:
+            if escaped: escaped = False
+            elif ch == '\\': escaped = True
+            elif ch == '"': in_string = False
+        elif ch == '"': in_string = True
+        elif ch in '[{': stack.append(']' if ch == '[' else '}')
+        elif ch in ']}' and stack:
+            stack.pop()
+            closers.append((i + 1, "".join(reversed(stack))))
+    for end, closing in reversed(closers):
+        try:
+            return json.loads(json_text[:end] + closing)
+        except ValueError:
+            continue
+    return None
+
+@profiled("parse_json")
+def parse_json_tables(json_text: str) -> Tuple[List[List[List[str]]], bool]:
+    """
+    Decodes a schema-constrained response ({"tables": [{"header", "rows"}]}) into the cell
+    rows of each table, header first and not padded, and whether the response decoded whole.
+    A truncated or malformed response keeps the tables and rows received complete.
+    """
+    try:
+        data, complete = json.loads(json_text), True
+    except ValueError:
+        data, complete = _salvage_json(json_text), False
+    tables = []
+    for table in (data.get("tables") or [] if isinstance(data, dict) else []):
+        if not isinstance(table, dict): continue
+        rows = [table.get("header") or []] + (table.get("rows") or [])
+        rows = [[str(c).strip() for c in row] for row in rows if isinstance(row, list)]
+        rows = [row for row in rows if any(row)]
+        if rows: tables.append(rows)
+    return tables, complete
+
+def table_frame(rows: List[List[str]]) -> "pd.DataFrame":
+    """DataFrame of cell rows, short rows padded with empty cells."""
+    import pandas as pd
+    max_cols = max(len(row) for row in rows)
+    return pd.DataFrame([row + [''] * (max_cols - len(row)) for row in rows])
+
+def to_markdown(rows: List[List[Any]]) -> str:
+    """
+    Markdown table of cell rows whose first row is the header. Rows are not padded,
+    so the structural check still sees a ragged table.
+    """
+    rows = [[str(c).replace('|', '\\|').replace('\n', ' ') for c in row] for row in rows]
+    if not rows: return ""
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + "---|" * len(rows[0])]
+    lines += ["| " + " | ".join(row) + " |" for row in rows[1:]]
+    return "\n".join(lines)
+
+def _tables_schema():
+    from google.genai import types
+    cells = types.Schema(type=types.Type.ARRAY, items=types.Schema(type=types.Type.STRING))
+    table = types.Schema(type=types.Type.OBJECT, required=["header", "rows"],
+                         properties={"header": cells, "rows": types.Schema(type=types.Type.ARRAY, items=cells)})
+    return types.Schema(type=types.Type.OBJECT, required=["tables"],
+                        properties={"tables": types.Schema(type=types.Type.ARRAY, items=table)})
+
 ORDINAL_MAP = {
     "primera": 1, "primero": 1, "first": 1,
     "segunda": 2, "segundo": 2, "second": 2,
@@ -136,62 +220,174 @@ def parse_page_query(prompt: str, total_pages: int, current_filename: str = None
     # Otherwise return all pages (global mode)
     return list(range(total_pages))
 
-def extract_from_page(client: genai.Client, page: Any, prompt: str, log_callback=None, error_tracker: Dict[str, bool] = None) -> List[Dict[str, Any]]:
-    """Extracts tables from a single PDF page."""
-    if log_callback:
-        log_callback(page.page_number)
-        
-    try:
-        img = page.to_image(resolution=300).original
-        
-        max_retries = 3
-        md_text = ""
-        for attempt in range(max_retries):
-            try:
-                response = client.models.generate_content(
-                    model=AI_MODEL,
-                    contents=[prompt, img]
-                )
-                if response and hasattr(response, 'text') and response.text:
-                    md_text = response.text
-                    if md_text.strip():
-                        break # Found something
-                
-                # If we get here with empty text, maybe retry
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                break
-            except Exception as e:
-                err_msg = str(e).lower()
-                is_transient = "503" in err_msg or "overloaded" in err_msg or "timeout" in err_msg or "500" in err_msg
-                is_quota = "429" in err_msg or "quota" in err_msg
-                
-                if is_transient or is_quota:
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 15 if is_quota else (attempt + 1) * 5
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        if error_tracker is not None: error_tracker["has_error"] = True
-                        raise e
-                elif "400" in err_msg or "403" in err_msg:
-                    if error_tracker is not None: error_tracker["has_error"] = True
-                    raise e
-                else:
-                    if attempt < max_retries - 1:
-                        time.sleep(2)
-                        continue
-                    raise e
-        
+def _image_part(png: bytes) -> Any:
+    """
+    Wraps a rendered page once, as the SDK would on every attempt, so retries
+    and hedged duplicates of a request reuse the same bytes.
+    """
+    from google.genai import types
+    return types.Part.from_bytes(data=png, mime_type="image/png")
+
+def _reserved(models: Any, request: Dict[str, Any]) -> Optional[Any]:
+    """The request ready to send as a hedge, or None when no key or token is free right now."""
+    send = reserve_request(models, block=False)
+    return (lambda: send(**request)) if send is not None else None
+
+def _request_text(client: "genai.Client", prompt: str, content: Any, error_tracker: Dict[str, bool] = None,
+                  model: str = AI_MODEL, json_output: bool = False, schema: Any = None) -> str:
+    """
+    Sends one image (or positional text, or a list of contents) to the model, retrying
+    transient failures, and returns the raw text.
+    With json_output the response is constrained to the tables schema (or the given one).
+    """
+    from google.genai import types
+    hedger = default_hedger()
+    # The SDK timeout bounds abandoned attempts; the hedger enforces the deadline itself
+    config = types.GenerateContentConfig(http_options=types.HttpOptions(timeout=int(hedger.timeout * 1000)))
+    if json_output:
+        config.response_mime_type = "application/json"
+        config.response_schema = schema if schema is not None else _tables_schema()
+    contents = [prompt] + (content if isinstance(content, list) else [content])
+    max_retries = 3
+    md_text = ""
+    for attempt in range(max_retries):
+        try:
+            # The key and rate limit token are taken before the hedger's clock starts, so queueing
+            # neither counts toward the deadline nor triggers hedges; a hedge needs a free token now
+            send = reserve_request(client.models)
+            request = {"model": model, "contents": contents, "config": config}
+            response = hedger.call(lambda: send(**request), lambda: _reserved(client.models, request))
+            if response and hasattr(response, 'text') and response.text:
+                md_text = response.text
+                if md_text.strip():
+                    break # Found something
+            
+            # If we get here with empty text, maybe retry
+            if attempt < max_retries - 1:
+                time.sleep(2)
+                continue
+            break
+        except Exception as e:
+            kind = classify_error(e)
+            if kind in FATAL_KINDS and (kind == AUTH or attempt == max_retries - 1):
+                if error_tracker is not None: error_tracker["has_error"] = True
+                raise e
+            if kind == INVALID or attempt == max_retries - 1:
+                raise e
+            wait_time = (attempt + 1) * 15 if kind == QUOTA else (attempt + 1) * 5 if kind == TRANSIENT else 2
+            time.sleep(wait_time)
+    return md_text
+
+def _page_inputs(page: Any, prompt: str, crop_tables: bool, text_layer: bool,
+                 rasterizer: str = RASTERIZER, regions: Optional[List[Any]] = None) -> Tuple[str, str, List[Any]]:
+    """
+    What to send for a page: positional text when text_layer is set and the page has
+    a text layer, images otherwise. Returns (kind, prompt, contents), one request per content.
+    Given regions replace the detected table regions (an empty list sends the whole page).
+    """
+    if regions is None:
+        regions = find_table_regions(page) if crop_tables else []
+    if text_layer:
+        # The word threshold applies to the whole page; a detected table region only needs one word
+        texts = [serialize_words(page)]
+        if texts[0] and regions:
+            texts = [serialize_words(crop_region(page, region), min_words=1) for region in regions]
+        if all(texts):
+            return "text", f"{prompt}\n\n{TEXT_LAYER_PROMPT}", texts
+    if regions:
+        images = [render_region(page, region, rasterizer) for region in regions]
+    else:
+        images = [render_png(page, PAGE_RESOLUTION, backend=rasterizer)]
+    return "image", prompt, [_image_part(png) for png in images]
+
+def base_prompt(prompt: str, json_output: bool) -> str:
+    """The prompt a request starts with: in JSON mode the default one is swapped for DEFAULT_JSON_PROMPT."""
+    return DEFAULT_JSON_PROMPT if json_output and prompt == DEFAULT_PROMPT else prompt
+
+def prepare_page(page: Any, prompt: str, crop_tables: bool = False, text_layer: bool = False,
+                 json_output: bool = False, rasterizer: str = RASTERIZER,
+                 regions: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Everything that needs the PDF page, done before any model request:
+    {"kind", "prompt", "contents", "json"}, one request per content.
+    With crop_tables, only the detected table regions are sent (one request each, in
+    reading order). With text_layer, the page words and their positions are sent instead
+    of an image whenever the page has a text layer. With json_output, tables come back
+    as schema-constrained JSON and their markdown is generated locally.
+    Pages are not thread-safe, so only the returned inputs are handed to other threads.
+    """
+    kind, prompt, contents = _page_inputs(page, base_prompt(prompt, json_output), crop_tables, text_layer,
+                                          rasterizer, regions)
+    if json_output:
+        prompt = f"{prompt}\n\n{JSON_OUTPUT_PROMPT}"
+    return {"kind": kind, "prompt": prompt, "contents": contents, "json": json_output}
+
+def request_tables(client: "genai.Client", inputs: Dict[str, Any], error_tracker: Dict[str, bool] = None,
+                   model: str = AI_MODEL) -> List[Dict[str, Any]]:
+    """
+    Sends prepared page inputs (see prepare_page) to the model and parses the tables.
+    Every table records its quality score (see validation.score_table) in "score"; the last
+    table of a cut-off JSON response also lists "problems" for the cascade to escalate.
+    """
+    kind, prompt = inputs["kind"], inputs["prompt"]
+    results = []
+    for content in inputs["contents"]:
+        if inputs["json"]:
+            json_text = _request_text(client, prompt, content, error_tracker, model, json_output=True)
+            json_text = (json_text or "").strip() or "{}"
+            tables, complete = parse_json_tables(json_text)
+            for rows in tables:
+                md = to_markdown(rows)
+                results.append({"df": table_frame(rows), "md": md, "input": kind, "score": score_table(md)})
+            if not complete:
+                # Cut off or malformed: what was received is kept, scored and flagged as truncated so the
+                # cascade escalates the page and REEXTRACT_BELOW requests it again. Without a single
+                # complete row the raw text is kept instead, as a markdown response that is not a table.
+                if not tables:
+                    results.append({"df": parse_md(json_text), "md": json_text, "input": kind, "score": 0.0})
+                results[-1]["score"] = round(results[-1]["score"] * TRUNCATED_FACTOR, 3)
+                results[-1]["problems"] = ["truncated response"]
+            continue
+
+        md_text = _request_text(client, prompt, content, error_tracker, model)
         if not md_text or not md_text.strip():
-            return []
+            continue
             
         clean_md = md_text.replace("```markdown", "").replace("```", "").strip()
         if clean_md:
             df = parse_md(clean_md)
             if not df.empty:
-                return [{"df": df, "md": clean_md}]
-    except Exception as e:
-        raise e
+                results.append({"df": df, "md": clean_md, "input": kind, "score": score_table(clean_md)})
+    return results
+
+def request_with_cascade(client: "genai.Client", inputs: Dict[str, Any], models: List[str],
+                         error_tracker: Dict[str, bool] = None,
+                         stats: Optional[Dict[str, List[int]]] = None) -> List[Dict[str, Any]]:
+    """
+    Requests prepared page inputs from the cheapest model first and escalates to the
+    next tier only when the result fails the structural check. Results record their tier.
+    stats (see new_cascade_stats) counts attempts and accepted results per tier.
+    """
+    for tier, model in enumerate(models):
+        results = request_tables(client, inputs, error_tracker, model=model)
+        problems = [p for res in results for p in res.get("problems", []) + check_table(res["md"])]
+        if stats is not None: stats["attempts"][tier] += 1
+        if not problems or tier == len(models) - 1:
+            if stats is not None: stats["accepted"][tier] += 1
+            for res in results:
+                res["tier"] = tier
+                res["model"] = model
+            return results
     return []
+
+def new_cascade_stats(models: List[str]) -> Dict[str, List[int]]:
+    return {"attempts": [0] * len(models), "accepted": [0] * len(models)}
+
+def cascade_summary(stats: Dict[str, List[int]], models: List[str]) -> List[str]:
+    """One line per tier with its share of accepted results."""
+    lines = []
+    for tier, model in enumerate(models):
+        attempts, accepted = stats["attempts"][tier], stats["accepted"][tier]
+        if attempts:
+            lines.append(f"Tier {tier + 1} {model}: {accepted}/{attempts} accepted ({accepted / attempts:.0%})")
+    return lines
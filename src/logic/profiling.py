@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from typing import List, Dict, Any
+
+from src.config import PROFILE_SAMPLE_EVERY, PROFILE_TOP_ALLOCATIONS
+
+# Stages of a run that can be profiled, in pipeline order
+STAGES = ("page_open", "to_image", "encode", "parse_md", "parse_json", "validate", "normalize_df", "concat", "excel_write")
+
+_active = None  # The running Profiler; None when profiling is off
+
+@contextmanager
+def stage(name: str):
+    """Marks a block as a profiling stage. Costs a single check when profiling is off."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+def profiled(name: str):
+    """Decorator form of stage() for functions that make up a whole stage."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class Profiler:
+    """
+    Profiles a run stage by stage while it is active (use it as a context manager).
+    Every stage call is timed. Profiled calls also run under the stage's cProfile
+    profiler and trace their allocations with tracemalloc, keeping the snapshot of
+    the call with the highest allocation peak. sample_every > 1 profiles only every
+    Nth call of each stage, which keeps the overhead low on long runs.
+    Stages are profiled on any thread (pages are parsed on the request workers), one
+    call at a time: calls starting while another one is profiled, nested ones included,
+    are timed only. Allocation peaks cover the whole process, so with concurrent
+    requests they can include what other threads allocated during the call.
+    """
+    def __init__(self, out_dir: str, sample_every: int = 1, top: int = PROFILE_TOP_ALLOCATIONS):
+        self.out_dir = out_dir
+        self.sample_every = max(1, sample_every)
+        self.top = top
+        self.stats = {}      # stage -> {"calls", "profiled", "seconds", "peak"}
+        self.profiles = {}   # stage -> cProfile.Profile, accumulated over the profiled calls
+        self.snapshots = {}  # stage -> tracemalloc.Snapshot of the call with the highest peak
+        self._busy = False   # A profiled stage is running (stages do not nest)
+        self._lock = threading.Lock()
+
+    def start(self):
+        global _active
+        _active = self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _claim(self, stats: Dict[str, Any]) -> bool:
+        """Whether this stage call gets profiled (no other profiled call running, sampled)."""
+        import tracemalloc
+        with self._lock:
+            if self._busy or tracemalloc.is_tracing():
+                return False
+            if (stats["calls"] - 1) % self.sample_every:
+                return False
+            self._busy = True
+            return True
+
+    @contextmanager
+    def stage(self, name: str):
+        import tracemalloc
+        with self._lock:
+            stats = self.stats.setdefault(name, {"calls": 0, "profiled": 0, "seconds": 0.0, "peak": 0})
+            stats["calls"] += 1
+        profile = None
+        claimed = self._claim(stats)
+        if claimed:
+            import cProfile
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already active (e.g. the run itself is under cProfile)
+                profile = None
+            tracemalloc.start(25)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if claimed:
+                if profile is not None:
+                    profile.disable()
+                # Tracing starts with the stage, so the peak and snapshot only cover its allocations
+                _, peak = tracemalloc.get_traced_memory()
+                if peak > stats["peak"] or name not in self.snapshots:
+                    self.snapshots[name] = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                stats["peak"] = max(stats["peak"], peak)
+                stats["profiled"] += 1
+                self._busy = False
+            with self._lock:
+                stats["seconds"] += elapsed
+
+    def summary(self) -> List[str]:
+        """One line per stage with its calls, time and largest allocation peak."""
+        lines = []
+        order = [s for s in STAGES if s in self.stats] + sorted(s for s in self.stats if s not in STAGES)
+        for name in order:
+            s = self.stats[name]
+            lines.append(f"{name}: {s['calls']} call(s), {s['seconds']:.3f} s total, "
+                         f"{s['seconds'] / s['calls'] * 1000:.1f} ms avg, peak {s['peak'] / 1024:.0f} KiB "
+                         f"({s['profiled']} profiled)")
+        return lines
+
+    def dump(self) -> str:
+        """
+        Writes summary.txt, and per stage <stage>.prof (pstats), <stage>.snapshot
+        (tracemalloc) and <stage>.alloc.txt (top allocation sites). Returns out_dir.
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(os.path.join(self.out_dir, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.summary()) + "\n")
+        for name, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(self.out_dir, f"{name}.prof"))
+        for name, snapshot in self.snapshots.items():
+            snapshot.dump(os.path.join(self.out_dir, f"{name}.snapshot"))
+            with open(os.path.join(self.out_dir, f"{name}.alloc.txt"), 'w', encoding='utf-8') as f:
+                for stat in snapshot.statistics('lineno')[:self.top]:
+                    f.write(f"{stat}\n")
+        return self.out_dir
+
+def new_profiler(cache_dir: str, sample: bool = False) -> Profiler:
+    """Profiler writing to a new timestamped folder under <cache_dir>/profile."""
+    out_dir = os.path.join(cache_dir, "profile", time.strftime("%Y%m%d-%H%M%S"))
+    return Profiler(out_dir, sample_every=PROFILE_SAMPLE_EVERY if sample else 1)
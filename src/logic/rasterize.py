@@ -0,0 +1,118 @@
+import io
+import os
+import zlib
+import hashlib
+import struct
+import weakref
+from typing import Any, Optional, Tuple
+
+from src.config import RASTERIZER, PNG_COMPRESS_LEVEL
+from src.logic.profiling import stage
+
+BBox = Tuple[float, float, float, float]
+
+# Page rendering backends for the images sent to the model
+PDFPLUMBER = "pdfplumber"      # page.to_image(): reopens the PDF with pypdfium2 per render, RGB PIL image
+PDFIUM_GRAY = "pdfium-gray"    # pypdfium2 directly, one open document per PDF, 8-bit grayscale PIL image
+PDFIUM_BYTES = "pdfium-bytes"  # As pdfium-gray, PNG encoded straight from the bitmap buffer without PIL
+
+RASTERIZERS = (PDFPLUMBER, PDFIUM_GRAY, PDFIUM_BYTES)
+
+# pdfium documents by pdfplumber PDF (see close_document), dropped when the PDF is garbage collected
+_documents = weakref.WeakKeyDictionary()
+
+def close_document(pdf: Any):
+    """Closes the pdfium document opened for a pdfplumber PDF, if any; call it before closing the PDF."""
+    doc = _documents.pop(pdf, None)
+    if doc is not None:
+        doc.close()
+
+def _pdfium_page(page: Any) -> Any:
+    """The pypdfium2 page of a pdfplumber page, opening its document once per PDF."""
+    import pypdfium2
+    pdf = page.pdf
+    doc = _documents.get(pdf)
+    if doc is None:
+        name = pdf.path or getattr(pdf.stream, "name", None)
+        if isinstance(name, (str, os.PathLike)) and os.path.isfile(name):
+            source = str(name)
+        else:
+            # pdfminer keeps reading the same stream, so pdfium gets its own copy of the bytes
+            position = pdf.stream.tell()
+            pdf.stream.seek(0)
+            source = pdf.stream.read()
+            pdf.stream.seek(position)
+        doc = pypdfium2.PdfDocument(source, password=pdf.password)
+        _documents[pdf] = doc
+    return doc[page.page_number - 1]
+
+def _render_gray(page: Any, resolution: int, region: Optional[BBox]) -> Any:
+    """Renders the page (or a region relative to it) with pypdfium2 to an 8-bit grayscale bitmap."""
+    pdfium_page = _pdfium_page(page)
+    # pdfium renders the crop box; a region is cut off from its sides (left, bottom, right, top)
+    crop = (0, 0, 0, 0)
+    if region is not None:
+        x0, top, x1, bottom = region
+        box, ox, oy = page.cropbox, page.bbox[0], page.bbox[1]
+        crop = (max(0, ox + x0 - box[0]), max(0, box[3] - (oy + bottom)),
+                max(0, box[2] - (ox + x1)), max(0, oy + top - box[1]))
+    # Same settings as pdfplumber's to_image (no anti-aliasing) so only the color mode differs
+    return pdfium_page.render(scale=resolution / 72, crop=crop, grayscale=True,
+                              no_smoothtext=True, no_smoothpath=True, no_smoothimage=True)
+
+def pixel_digest(page: Any, resolution: int) -> str:
+    """Hash of the grayscale pixels of the page rendered with pypdfium2: equal digests mean identical renders."""
+    with stage("to_image"):
+        bitmap = _render_gray(page, resolution, None)
+    view = memoryview(bitmap.buffer).cast("B")
+    digest = hashlib.sha256(struct.pack(">II", bitmap.width, bitmap.height))
+    for y in range(bitmap.height):
+        # Rows only: the padding up to the stride is not part of the image
+        digest.update(view[y * bitmap.stride:y * bitmap.stride + bitmap.width])
+    return digest.hexdigest()[:32]
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_gray_png(buffer: Any, width: int, height: int, stride: int, level: int = PNG_COMPRESS_LEVEL) -> bytes:
+    """
+    PNG of an 8-bit grayscale buffer (rows of stride bytes), without PIL.
+    Rows are stored unfiltered: rendered pages are mostly flat background, which zlib packs well.
+    """
+    view = memoryview(buffer).cast("B")
+    compressor = zlib.compressobj(level)
+    parts = []
+    for y in range(height):
+        parts.append(compressor.compress(b"\0"))
+        parts.append(compressor.compress(view[y * stride:y * stride + width]))
+    parts.append(compressor.flush())
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", b"".join(parts)) + _png_chunk(b"IEND", b""))
+
+def _pil_png(image: Any) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, "PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return buf.getvalue()
+
+def render_png(page: Any, resolution: int, region: Optional[BBox] = None, backend: str = RASTERIZER) -> bytes:
+    """
+    PNG bytes of the page, or of a region given relative to it, at the given resolution.
+    Every backend covers the same area (crops may differ by a pixel); the pdfium ones are grayscale.
+    """
+    if backend not in RASTERIZERS:
+        raise ValueError(f"Unknown rasterizer '{backend}', expected one of {', '.join(RASTERIZERS)}")
+    if backend == PDFPLUMBER:
+        from src.logic.regions import crop_region
+        with stage("to_image"):
+            target = crop_region(page, region) if region is not None else page
+            image = target.to_image(resolution=resolution).original
+        with stage("encode"):
+            return _pil_png(image)
+
+    with stage("to_image"):
+        bitmap = _render_gray(page, resolution, region)
+    with stage("encode"):
+        if backend == PDFIUM_GRAY:
+            return _pil_png(bitmap.to_pil())
+        return encode_gray_png(bitmap.buffer, bitmap.width, bitmap.height, bitmap.stride)
@@ -0,0 +1,74 @@
+import time
+import threading
+from typing import Any, Callable, Optional
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per `period` seconds."""
+    def __init__(self, rate: float, period: float = 60.0):
+        self.capacity = max(1.0, float(rate))
+        self.refill_per_s = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_s)
+        self.updated = now
+
+    def available(self) -> float:
+        with self.lock:
+            self._refill()
+            return self.tokens
+
+    def wait_time(self) -> float:
+        """Seconds until a request may be sent."""
+        with self.lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.refill_per_s
+
+    def try_acquire(self) -> bool:
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while not self.try_acquire():
+            time.sleep(min(self.wait_time(), 1.0) or 0.01)
+
+def reserve_request(models: Any, block: bool = True) -> Optional[Callable[..., Any]]:
+    """
+    Waits for what a model request needs (an API key, rate limit tokens) and returns a
+    function sending it right away, so callers can time the request alone. Without block,
+    returns None unless it can be sent now. Models without reserve() are sent as they are.
+    """
+    reserve = getattr(models, "reserve", None)
+    return reserve(block) if reserve is not None else models.generate_content
+
+class _LimitedModels:
+    def __init__(self, models, limiter: "RateLimiter"):
+        self.models = models
+        self.limiter = limiter
+
+    def reserve(self, block: bool = True) -> Optional[Callable[..., Any]]:
+        if block:
+            self.limiter.acquire()
+        elif not self.limiter.try_acquire():
+            return None
+        return reserve_request(self.models, block)
+
+    def generate_content(self, **kwargs):
+        return self.reserve()(**kwargs)
+
+class LimitedClient:
+    """Wraps a client (or key pool) so every model request first takes a token from a shared limiter."""
+    def __init__(self, client, limiter):
+        self.client = client
+        self.models = _LimitedModels(client.models, limiter)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
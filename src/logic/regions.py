@@ -0,0 +1,138 @@
+from typing import List, Tuple, Any
+
+from src.config import (REGION_ANALYSIS_RESOLUTION, REGION_OVERSAMPLE, REGION_PADDING, REGION_MAX_COVERAGE,
+                        CROP_RESOLUTION, CROP_MAX_PIXELS, RASTERIZER)
+
+BBox = Tuple[float, float, float, float]
+
+DARK_LEVEL = 160
+LINE_ROW_FILL = 0.45  # Share of dark pixels for a row to count as a ruling line
+LINE_COL_FILL = 0.35
+MAX_LINE_GAP = 0.12   # Max vertical gap (share of page height) between lines of the same table
+MIN_BAND_HEIGHT = 2   # Points; a band of lines closer than this is a lone (thick) rule, not a table
+
+def _merge_boxes(boxes: List[BBox]) -> List[BBox]:
+    """Merges overlapping boxes so no area is sent to the model twice."""
+    merged = list(boxes)
+    changed = True
+    while changed:
+        # A merged box can reach boxes that did not overlap its parts: repeat until stable
+        changed = False
+        result = []
+        for box in sorted(merged, key=lambda b: (b[1], b[0])):
+            for i, other in enumerate(result):
+                if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                    result[i] = (min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3]))
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return merged
+
+def _analysis_image(page: Any) -> Any:
+    """
+    Grayscale page at REGION_ANALYSIS_RESOLUTION where every pixel is the darkest of the
+    REGION_OVERSAMPLE x REGION_OVERSAMPLE pixels rendered under it, so thin rules of a
+    high resolution scan are not averaged away.
+    """
+    import numpy as np
+    from PIL import Image
+    factor = REGION_OVERSAMPLE
+    gray = np.asarray(page.to_image(resolution=REGION_ANALYSIS_RESOLUTION * factor).original.convert("L"))
+    height, width = gray.shape[0] // factor, gray.shape[1] // factor
+    blocks = gray[:height * factor, :width * factor].reshape(height, factor, width, factor)
+    return Image.fromarray(blocks.min(axis=(1, 3)))
+
+def _raster_regions(page: Any) -> List[BBox]:
+    """
+    Finds table bands on a scanned page from ruling lines. Without ruling lines the
+    page is trimmed to its content box (whitespace analysis) instead.
+    """
+    from PIL import Image
+    scale = 72 / REGION_ANALYSIS_RESOLUTION
+    gray = _analysis_image(page)
+    dark = gray.point(lambda v: 255 if v < DARK_LEVEL else 0)
+    width, height = dark.size
+
+    # Row/column projections: the box-filtered 1px wide image holds the dark share of each row
+    row_fill = [v / 255 for v in dark.resize((1, height), Image.Resampling.BOX).tobytes()]
+    line_rows = [y for y, fill in enumerate(row_fill) if fill >= LINE_ROW_FILL]
+
+    bands = []
+    for y in line_rows:
+        if bands and y - bands[-1][1] <= MAX_LINE_GAP * height:
+            bands[-1][1] = y
+        else:
+            bands.append([y, y])
+
+    boxes = []
+    for top, bottom in bands:
+        if (bottom - top) * scale < MIN_BAND_HEIGHT:
+            continue  # A lone rule (underline, separator) is not a table
+        band = dark.crop((0, top, width, bottom + 1))
+        col_fill = [v / 255 for v in band.resize((width, 1), Image.Resampling.BOX).tobytes()]
+        cols = [x for x, fill in enumerate(col_fill) if fill >= LINE_COL_FILL]
+        # The outer vertical rules and the dark pixels of the band (text or horizontal
+        # rules past the last vertical rule) together give the extent of the table
+        content = band.getbbox()
+        x0, x1 = content[0], content[2]
+        if cols:
+            x0, x1 = min(x0, cols[0]), max(x1, cols[-1] + 1)
+        boxes.append((x0 * scale, top * scale, x1 * scale, bottom * scale))
+
+    if not boxes:
+        content = dark.getbbox()
+        if content:
+            boxes.append(tuple(v * scale for v in content))
+    return boxes
+
+def find_table_regions(page: Any) -> List[BBox]:
+    """
+    Returns table bounding boxes (PDF points relative to the page, top-left origin)
+    in reading order, or an empty list when the whole page should be sent.
+    Digital pages use pdfplumber's table finder; scanned pages use raster analysis.
+    """
+    x_off, y_off = page.bbox[0], page.bbox[1]
+    if page.chars:
+        boxes = [(t.bbox[0] - x_off, t.bbox[1] - y_off, t.bbox[2] - x_off, t.bbox[3] - y_off) for t in page.find_tables()]
+    else:
+        boxes = _raster_regions(page)
+    return fit_regions(page, boxes)
+
+def fit_regions(page: Any, boxes: List[BBox], padding: float = REGION_PADDING) -> List[BBox]:
+    """
+    Pads and merges table boxes (relative to the page) into regions in reading order,
+    or returns an empty list when they cover almost the whole page.
+    """
+    if not boxes:
+        return []
+
+    padded = [
+        (max(0, b[0] - padding), max(0, b[1] - padding),
+         min(page.width, b[2] + padding), min(page.height, b[3] + padding))
+        for b in boxes
+    ]
+    regions = _merge_boxes(padded)
+    covered = sum((b[2] - b[0]) * (b[3] - b[1]) for b in regions)
+    if covered >= REGION_MAX_COVERAGE * page.width * page.height:
+        return []  # Cropping would save almost nothing
+    return sorted(regions, key=lambda b: (round(b[1]), b[0]))
+
+def crop_region(page: Any, region: BBox) -> Any:
+    """The page cropped to a region given relative to the page."""
+    x0, top, x1, bottom = region
+    return page.crop((page.bbox[0] + x0, page.bbox[1] + top, page.bbox[0] + x1, page.bbox[1] + bottom))
+
+def region_resolution(region: BBox) -> int:
+    """Rendering DPI of a region: CROP_RESOLUTION, raised for small crops within a pixel budget."""
+    x0, top, x1, bottom = region
+    area_in = ((x1 - x0) / 72) * ((bottom - top) / 72)
+    if area_in <= 0:
+        return CROP_RESOLUTION
+    return min(CROP_RESOLUTION * 2, max(CROP_RESOLUTION, int((CROP_MAX_PIXELS / area_in) ** 0.5)))
+
+def render_region(page: Any, region: BBox, backend: str = RASTERIZER) -> bytes:
+    """PNG of a region at high resolution (see region_resolution)."""
+    from src.logic.rasterize import render_png
+    return render_png(page, region_resolution(region), region, backend)
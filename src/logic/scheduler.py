@@ -0,0 +1,25 @@
+from typing import List, Tuple, Iterator
+
+# Order in which the pages of several documents are dispatched
+SJF = "sjf"                  # Shortest job first: documents with fewer selected pages go first
+FIFO = "fifo"                # Documents in input order
+ROUND_ROBIN = "round-robin"  # One page of every document in turn
+
+POLICIES = (SJF, FIFO, ROUND_ROBIN)
+
+def dispatch_order(page_counts: List[int], policy: str = SJF) -> Iterator[Tuple[int, int]]:
+    """
+    (document index, page position) pairs in dispatch order, given the number of
+    selected pages of each document. Pages of a document always keep their order.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown scheduling policy '{policy}', expected one of {', '.join(POLICIES)}")
+    docs = list(range(len(page_counts)))
+    if policy == ROUND_ROBIN:
+        order = [(d, pos) for pos in range(max(page_counts, default=0)) for d in docs if pos < page_counts[d]]
+    else:
+        if policy == SJF:
+            # Stable sort: documents of the same size keep their input order
+            docs.sort(key=lambda d: page_counts[d])
+        order = [(d, pos) for d in docs for pos in range(page_counts[d])]
+    return iter(order)
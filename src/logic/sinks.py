@@ -0,0 +1,333 @@
+import io
+import os
+import csv
+import json
+from typing import List, Dict, Any, Optional, Callable, BinaryIO, TYPE_CHECKING
+
+from src.logic.manifest import OutputManifest
+from src.logic.outputs import sheet_name_for, write_excel_sheets
+from src.logic.profiling import stage
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+class Sink:
+    """
+    Receives extraction results as the pipeline produces them. Every hook is optional.
+    `doc` holds path (the name for in-memory PDFs), name, index (input position),
+    in_memory, digest, pages, total_pages and page_keys; at end_document it also has results (all tables in
+    page order), changed, complete and failed.
+    """
+    def begin_document(self, doc: Dict[str, Any]):
+        pass
+
+    def add_page(self, result: Dict[str, Any]):
+        pass
+
+    def end_document(self, doc: Dict[str, Any]):
+        pass
+
+    def close(self):
+        pass
+
+OUTPUT_MESSAGES = {
+    "unchanged": "  = Unchanged, outputs are up to date",
+    "saved_md": "  + Saved MD: {}",
+    "saved_csv": "  + Saved CSV: {}",
+    "saved_excel": "  + Saved sheet {} in {}",
+}
+
+class PartialOutput:
+    """
+    A Markdown or CSV output written page by page to `<path>.partial` and renamed
+    over `path` once its document is complete. Every page is a checkpoint (flushed
+    and fsynced), so the partial file can be tailed during long runs. CSV rows are
+    as wide as their table; if widths differ they are padded with empty cells when
+    committing. Each table is written like its own to_csv: with clean, a whole number
+    stays "5" even where the padding of a narrower table would make pandas write "5.0"
+    for the combined table of the document.
+    """
+    def __init__(self, kind: str, path: str, doc: Dict[str, Any], clean: bool = False,
+                 table_separators: bool = False, md_headings: bool = False):
+        self.kind = kind
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.doc = doc
+        self.clean = clean
+        self.table_separators = table_separators
+        self.md_headings = md_headings
+        self.tables = 0
+        self.next_pos = 0     # Position in doc["pages"] of the next page to write
+        self.widths = set()   # CSV row widths written so far
+        self.done = False
+        self.file = open(self.partial_path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file, lineterminator=os.linesep) if kind == "csv" else None
+        if kind == "md" and md_headings:
+            self.file.write(f"# Extracted Tables for {doc['name']}\n\n")
+
+    def expects(self, result: Dict[str, Any]) -> bool:
+        pages = self.doc["pages"]
+        return result["doc"] == self.doc["path"] and self.next_pos < len(pages) and pages[self.next_pos] == result["page"]
+
+    def add_tables(self, tables: List[Dict[str, Any]]):
+        for res in tables:
+            if self.kind == "md":
+                self.file.write(f"## Table {self.tables+1}\n\n{res['md']}\n\n" if self.md_headings else res['md'] + "\n\n")
+            else:
+                self._write_rows(res["df"])
+            self.tables += 1
+
+    def _write_rows(self, df: "pd.DataFrame"):
+        import pandas as pd
+        from src.logic.processor import normalize_df
+        df = normalize_df(df) if self.clean else df
+        width = df.shape[1]
+        if self.tables and self.table_separators:
+            self.writer.writerow(["--- NEXT TABLE / PAGE ---"] + [""] * (width - 1))
+        # object keeps each column's own values (.values of an int and a float column upcasts both to float)
+        for row in df.astype(object).values.tolist():
+            self.writer.writerow(["" if pd.isna(c) else c for c in row])
+        self.widths.add(width)
+
+    def add_page(self, result: Dict[str, Any]):
+        self.add_tables(result["tables"])
+        self.next_pos += 1
+        self.checkpoint()
+
+    def checkpoint(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def commit(self):
+        self.checkpoint()
+        self.file.close()
+        if len(self.widths) > 1:
+            self._pad_rows(max(self.widths))
+        os.replace(self.partial_path, self.path)
+        self.done = True
+
+    def _pad_rows(self, width: int):
+        """Rewrites the partial CSV with every row padded to the widest table."""
+        tmp_path = f"{self.partial_path}.tmp"
+        with open(self.partial_path, 'r', encoding='utf-8', newline='') as src, \
+                open(tmp_path, 'w', encoding='utf-8', newline='') as dst:
+            writer = csv.writer(dst, lineterminator=os.linesep)
+            for row in csv.reader(src):
+                writer.writerow(row + [""] * (width - len(row)))
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.partial_path)
+
+    def discard(self):
+        """Drops an uncommitted output; the previous file, if any, is left alone."""
+        if self.done:
+            return
+        self.done = True
+        self.file.close()
+        try:
+            os.remove(self.partial_path)
+        except OSError:
+            pass
+
+class OutputFiles(Sink):
+    """
+    Writes the Excel sheet, Markdown and CSV files of every completed document.
+    Markdown and CSV files are streamed page by page to `.partial` files (see
+    PartialOutput) and renamed into place when the document completes; its
+    Excel sheet is written at the same time, so an interrupted run keeps the
+    outputs of every document it completed. Outputs whose manifest entry is
+    current are left alone. A document interrupted mid-way keeps its previous
+    outputs until it completes.
+    """
+    def __init__(self, manifest: OutputManifest, excel_path: Optional[str] = None,
+                 md_path: Optional[Callable[[str], str]] = None, csv_path: Optional[Callable[[str], str]] = None,
+                 clean: bool = False, table_separators: bool = False, md_headings: bool = False,
+                 summary_text: Optional[str] = None, log: Optional[Callable[[str], None]] = None,
+                 messages: Optional[Dict[str, str]] = None):
+        self.manifest = manifest
+        self.excel_path = excel_path
+        self.md_path = md_path        # Maps a PDF path to its Markdown file
+        self.csv_path = csv_path      # Maps a PDF path to its CSV file
+        self.clean = clean
+        self.table_separators = table_separators  # "--- NEXT TABLE / PAGE ---" rows between tables
+        self.md_headings = md_headings            # Document title and "## Table n" headings in Markdown
+        self.summary_text = summary_text
+        self.log = log or (lambda msg: None)
+        self.messages = dict(OUTPUT_MESSAGES, **(messages or {}))
+        # Sheet -> input position of the sheets written this run, which keep that order in the workbook
+        self.sheet_order = {}
+        self.partials = {}  # Output path -> PartialOutput of the document streaming to it
+
+    def targets(self, doc: Dict[str, Any]) -> Dict[str, tuple]:
+        """Maps each enabled output of a document to (output_id, file_path, fingerprint)."""
+        page_keys = doc["page_keys"]
+        targets = {}
+        if self.excel_path:
+            sheet = sheet_name_for(doc["path"])
+            targets["excel"] = (f"{os.path.abspath(self.excel_path)}#{sheet}", self.excel_path,
+                                OutputManifest.fingerprint(page_keys, clean=self.clean))
+        if self.md_path:
+            path = self.md_path(doc["path"])
+            targets["md"] = (path, path, OutputManifest.fingerprint(page_keys))
+        if self.csv_path:
+            path = self.csv_path(doc["path"])
+            targets["csv"] = (path, path, OutputManifest.fingerprint(page_keys, clean=self.clean))
+        return targets
+
+    def _combined(self, results: List[Dict[str, Any]]) -> "pd.DataFrame":
+        import pandas as pd
+        from src.logic.processor import normalize_df
+        frames = []
+        for res in results:
+            df = normalize_df(res["df"]) if self.clean else res["df"]
+            if frames and self.table_separators:
+                frames.append(pd.DataFrame([["--- NEXT TABLE / PAGE ---"] + [""] * (df.shape[1] - 1)]))
+            frames.append(df)
+        with stage("concat"):
+            return pd.concat(frames, ignore_index=True)
+
+    def _partial(self, kind: str, path: str, doc: Dict[str, Any]) -> PartialOutput:
+        return PartialOutput(kind, path, doc, clean=self.clean and kind == "csv",
+                             table_separators=self.table_separators, md_headings=self.md_headings)
+
+    def begin_document(self, doc: Dict[str, Any]):
+        for kind, (output_id, path, fingerprint) in self.targets(doc).items():
+            # Current outputs are most likely unchanged: they are only rewritten at the end if needed.
+            # A file given twice streams to its output once.
+            if kind == "excel" or path in self.partials or self.manifest.is_current(output_id, path, fingerprint):
+                continue
+            self.partials[path] = self._partial(kind, path, doc)
+
+    def add_page(self, result: Dict[str, Any]):
+        for partial in self.partials.values():
+            if partial.expects(result):
+                partial.add_page(result)
+
+    def end_document(self, doc: Dict[str, Any]):
+        partials = {}
+        for path, partial in list(self.partials.items()):
+            if partial.doc is doc:
+                partials[partial.kind] = self.partials.pop(path)
+        try:
+            self._write_document(doc, partials)
+        finally:
+            for partial in partials.values():
+                partial.discard()
+
+    def _write_document(self, doc: Dict[str, Any], partials: Dict[str, PartialOutput]):
+        if not doc["complete"]:
+            return
+        targets = self.targets(doc)
+        stale = [kind for kind in targets if doc["changed"] or not self.manifest.is_current(*targets[kind])]
+        if not targets:
+            return
+        if not stale:
+            self.log(self.messages["unchanged"].format(doc["name"]))
+            return
+        if not doc["results"]:
+            return
+
+        page_keys = doc["page_keys"]
+        for kind in ("md", "csv"):
+            if kind not in stale:
+                continue
+            output_id, path, fingerprint = targets[kind]
+            partial = partials.get(kind)
+            if partial is None:
+                if path in self.partials:
+                    continue  # Another copy of the same file is streaming the same output
+                # Not streamed (the output looked current when the document started)
+                partial = self._partial(kind, path, doc)
+                partial.add_tables(doc["results"])
+            partial.commit()
+            self.manifest.record(output_id, path, fingerprint, page_keys)
+            self.manifest.mark_written(path)
+            self.log(self.messages[f"saved_{kind}"].format(os.path.basename(path)))
+
+        if "excel" in stale:
+            output_id, path, fingerprint = targets["excel"]
+            sheet = sheet_name_for(doc["path"])
+            # Documents may finish in any order; a file given twice keeps the position of its first occurrence
+            self.sheet_order[sheet] = min(doc.get("index", 0), self.sheet_order.get(sheet, float("inf")))
+            write_excel_sheets(path, {sheet: self._combined(doc["results"])}, self.summary_text,
+                               order=sorted(self.sheet_order, key=self.sheet_order.get))
+            self.manifest.record(output_id, path, fingerprint, page_keys)
+            self.manifest.mark_written(path)
+            self.log(self.messages["saved_excel"].format(sheet, os.path.basename(path)))
+
+    def close(self):
+        for partial in self.partials.values():
+            partial.discard()
+        self.partials = {}
+        self.manifest.save()
+
+STREAM_FORMATS = ("csv", "jsonl", "arrow")
+
+class StreamSink(Sink):
+    """
+    Streams each table to a binary stream (e.g. stdout) as soon as its page is done:
+    CSV rows prefixed with document, page and table number, one JSON object per
+    table (JSONL), or Arrow IPC record batches (needs the optional pyarrow package).
+    """
+    def __init__(self, stream: BinaryIO, fmt: str = "csv", clean: bool = False):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unknown stream format '{fmt}', expected one of {', '.join(STREAM_FORMATS)}")
+        if fmt == "arrow":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Arrow output requires pyarrow (pip install pyarrow)")
+        self.stream = stream
+        self.fmt = fmt
+        self.clean = clean
+        self._arrow_writer = None
+
+    def _rows(self, res: Dict[str, Any]) -> List[List[Any]]:
+        from src.logic.processor import normalize_df
+        df = normalize_df(res["df"]) if self.clean else res["df"]
+        return df.astype(object).values.tolist()
+
+    def add_page(self, result: Dict[str, Any]):
+        if not result["tables"]:
+            return
+        page = result["page"] + 1
+        if self.fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for t_idx, res in enumerate(result["tables"], 1):
+                for row in self._rows(res):
+                    writer.writerow([result["name"], page, t_idx] + row)
+            self.stream.write(buf.getvalue().encode('utf-8'))
+        elif self.fmt == "jsonl":
+            for t_idx, res in enumerate(result["tables"], 1):
+                line = {"document": result["name"], "page": page, "table": t_idx, "rows": self._rows(res)}
+                self.stream.write((json.dumps(line, ensure_ascii=False, default=str) + "\n").encode('utf-8'))
+        else:
+            self._write_arrow(result["name"], page, result["tables"])
+        self.stream.flush()
+
+    def _arrow_schema(self):
+        import pyarrow as pa
+        return pa.schema([("document", pa.string()), ("page", pa.int32()), ("table", pa.int32()),
+                          ("row", pa.int32()), ("cells", pa.list_(pa.string()))])
+
+    def _write_arrow(self, name: str, page: int, tables: List[Dict[str, Any]]):
+        import pyarrow as pa
+        columns = {"document": [], "page": [], "table": [], "row": [], "cells": []}
+        for t_idx, res in enumerate(tables, 1):
+            for r_idx, row in enumerate(self._rows(res)):
+                for key, value in (("document", name), ("page", page), ("table", t_idx), ("row", r_idx)):
+                    columns[key].append(value)
+                columns["cells"].append([str(c) for c in row])
+        if self._arrow_writer is None:
+            self._arrow_writer = pa.ipc.new_stream(self.stream, self._arrow_schema())
+        self._arrow_writer.write_batch(pa.record_batch(columns, schema=self._arrow_schema()))
+
+    def close(self):
+        if self.fmt == "arrow":
+            import pyarrow as pa
+            # An empty run still produces a valid stream with the schema
+            if self._arrow_writer is None:
+                self._arrow_writer = pa.ipc.new_stream(self.stream, self._arrow_schema())
+            self._arrow_writer.close()
+        self.stream.flush()
@@ -0,0 +1,95 @@
+import io
+import os
+import sys
+import mmap
+import hashlib
+from typing import Any, Union, BinaryIO, Tuple
+
+# A PDF can be given as a path ("-" reads stdin), raw bytes, a binary file-like object,
+# or a (name, bytes | file-like) tuple to give in-memory documents a name
+PdfInput = Union[str, bytes, BinaryIO, Tuple[str, Any]]
+
+STDIN_NAME = "stdin.pdf"  # Name of the document read from stdin
+
+class _MappedFile(io.RawIOBase):
+    """Read-only file object over a memory map, so parsers read pages without copying the file."""
+    def __init__(self, mapped: mmap.mmap):
+        self.mapped = mapped
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.mapped[self.pos:self.pos + len(buffer)]
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: len(self.mapped)}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+class PdfSource:
+    """
+    Opens a PDF input for reading. Local files are memory-mapped; stdin, bytes and
+    file-like objects are read into memory once, never written to a temp file.
+    `path` is None for in-memory documents, which are named by `name`.
+    """
+    def __init__(self, pdf: PdfInput, index: int = 0):
+        self.pdf = pdf
+        self.path = None
+        self.name, data = None, pdf
+        if isinstance(pdf, tuple):
+            self.name, data = pdf
+        if isinstance(data, str) and data != "-":
+            self.path = data
+            self.name = self.name or os.path.basename(data)
+        elif isinstance(data, str):
+            self.name = self.name or STDIN_NAME
+        else:
+            self.name = self.name or getattr(data, "name", None) or f"document_{index + 1}.pdf"
+            self.name = os.path.basename(str(self.name))
+        self.data = data
+        self.digest = None
+        self.stream = None
+        self._handles = []
+
+    def open(self) -> "PdfSource":
+        if self.path is not None:
+            f = open(self.path, 'rb')
+            self._handles.append(f)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._handles.append(mapped)
+            # Same digest as cache.file_digest, hashed straight from the mapping
+            self.digest = hashlib.sha256(mapped).hexdigest()[:24]
+            self.stream = io.BufferedReader(_MappedFile(mapped))
+        else:
+            data = self.data
+            if isinstance(data, str):
+                data = sys.stdin.buffer.read()
+            elif not isinstance(data, (bytes, bytearray, memoryview)):
+                data = data.read()
+            # Kept so the source can be opened again (stdin can only be read once)
+            self.data = data
+            self.digest = hashlib.sha256(data).hexdigest()[:24]
+            self.stream = io.BytesIO(data)
+        return self
+
+    def close(self):
+        for handle in reversed(self._handles):
+            handle.close()
+        self._handles = []
+
+    def __enter__(self) -> "PdfSource":
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
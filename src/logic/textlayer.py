@@ -0,0 +1,43 @@
+from typing import List, Dict, Any, Optional
+
+from src.config import TEXT_LAYER_MIN_WORDS
+
+LINE_TOLERANCE = 3    # Words whose tops differ by less than this (points) share a line
+PHRASE_GAP = 1.5      # Gaps narrower than this many character widths join words into one phrase
+
+def _group_lines(words: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    lines = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and abs(word["top"] - lines[-1][0]["top"]) < LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w["x0"]) for line in lines]
+
+def _phrases(line: List[Dict[str, Any]]) -> List[List[Any]]:
+    """Joins neighbouring words into [x0, x1, text] phrases so each cell is sent once with its position."""
+    phrases = []
+    for word in line:
+        char_width = (word["x1"] - word["x0"]) / max(len(word["text"]), 1)
+        if phrases and word["x0"] - phrases[-1][1] < PHRASE_GAP * char_width:
+            phrases[-1][1] = word["x1"]
+            phrases[-1][2] += " " + word["text"]
+        else:
+            phrases.append([word["x0"], word["x1"], word["text"]])
+    return phrases
+
+def serialize_words(page: Any, min_words: int = TEXT_LAYER_MIN_WORDS) -> Optional[str]:
+    """
+    Positional text of a page (or cropped page): one row per text line as
+    `y | x:phrase x:phrase`, coordinates in points from the top-left corner.
+    Returns None when the page has no usable text layer (e.g. scanned pages).
+    """
+    words = page.extract_words(keep_blank_chars=False, use_text_flow=False)
+    if not words or len(words) < min_words:
+        return None
+    x_origin, y_origin = page.bbox[0], page.bbox[1]
+    rows = [f"[page {page.width:.0f}x{page.height:.0f} pt]"]
+    for line in _group_lines(words):
+        cells = " ".join(f"{x0 - x_origin:.0f}:{text}" for x0, _, text in _phrases(line))
+        rows.append(f"{line[0]['top'] - y_origin:.0f} | {cells}")
+    return "\n".join(rows)
@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+
+from src.config import (TRIAGE_MODEL, TRIAGE_PROMPT, TRIAGE_RESOLUTION, TRIAGE_REGION_PADDING, RASTERIZER)
+from src.logic.cache import atomic_write_json
+from src.logic.rasterize import render_png
+from src.logic.regions import fit_regions, BBox
+
+if TYPE_CHECKING:
+    from google import genai
+
+# A triage verdict: {"tables": bool, "boxes": [[x0, top, x1, bottom], ...]} with the
+# boxes as shares (0-1) of the page width and height, top-left origin.
+
+def needs_triage(page: Any) -> bool:
+    """Only scanned pages are triaged; digital pages have a text layer to go by."""
+    return not page.chars
+
+def thumbnail(page: Any, rasterizer: str = RASTERIZER) -> bytes:
+    """Low resolution PNG of the page sent in triage requests."""
+    return render_png(page, TRIAGE_RESOLUTION, backend=rasterizer)
+
+def thumbnail_key(png: bytes, model: str = TRIAGE_MODEL) -> str:
+    """Identifies a page by its thumbnail pixels, so the same scan in another file reuses its verdict."""
+    return hashlib.sha256(model.encode('utf-8') + b"\0" + png).hexdigest()[:32]
+
+def _triage_schema():
+    from google.genai import types
+    box = types.Schema(type=types.Type.ARRAY, items=types.Schema(type=types.Type.INTEGER))
+    page = types.Schema(type=types.Type.OBJECT, required=["page", "has_tables", "boxes"],
+                        properties={"page": types.Schema(type=types.Type.INTEGER),
+                                    "has_tables": types.Schema(type=types.Type.BOOLEAN),
+                                    "boxes": types.Schema(type=types.Type.ARRAY, items=box)})
+    return types.Schema(type=types.Type.OBJECT, required=["pages"],
+                        properties={"pages": types.Schema(type=types.Type.ARRAY, items=page)})
+
+def parse_verdicts(json_text: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Verdicts of a triage response for count pages, in request order. Pages the
+    response leaves out, or an unreadable response, give None (the page is extracted as usual).
+    """
+    verdicts = [None] * count
+    try:
+        pages = json.loads(json_text).get("pages") or []
+    except (ValueError, AttributeError):
+        return verdicts
+    for entry in pages:
+        try:
+            number = int(entry.get("page"))
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if not 1 <= number <= count:
+            continue
+        boxes = []
+        for box in entry.get("boxes") or []:
+            try:
+                ymin, xmin, ymax, xmax = [min(1000, max(0, float(v))) / 1000 for v in box]
+            except (TypeError, ValueError):
+                continue
+            if xmax > xmin and ymax > ymin:
+                boxes.append([xmin, ymin, xmax, ymax])
+        verdicts[number - 1] = {"tables": bool(entry.get("has_tables")) or bool(boxes), "boxes": boxes}
+    return verdicts
+
+def request_triage(client: "genai.Client", thumbnails: List[bytes], error_tracker: Dict[str, bool] = None,
+                   model: str = TRIAGE_MODEL) -> List[Optional[Dict[str, Any]]]:
+    """Sends the thumbnails of several pages in one request and returns their verdicts (see parse_verdicts)."""
+    from src.logic.processor import _request_text, _image_part
+    contents = []
+    for number, png in enumerate(thumbnails, 1):
+        contents += [f"Page {number}:", _image_part(png)]
+    json_text = _request_text(client, TRIAGE_PROMPT, contents, error_tracker, model, json_output=True,
+                              schema=_triage_schema())
+    return parse_verdicts(json_text or "{}", len(thumbnails))
+
+def verdict_regions(page: Any, verdict: Dict[str, Any]) -> List[BBox]:
+    """
+    Page regions (points relative to the page) of the tables in a verdict, padded
+    generously as thumbnail boxes are rough; empty when the whole page should be sent.
+    """
+    boxes = [(x0 * page.width, top * page.height, x1 * page.width, bottom * page.height)
+             for x0, top, x1, bottom in verdict["boxes"]]
+    return fit_regions(page, boxes, padding=TRIAGE_REGION_PADDING)
+
+class TriageIndex:
+    """Triage verdicts by thumbnail key (see thumbnail_key), persisted next to the page cache."""
+    def __init__(self, index_path: Optional[str]):
+        self.index_path = index_path  # None keeps the verdicts in memory only
+        self.index = {}
+        self.requests = 0  # Triage requests sent in this run
+        self.skipped = 0   # Pages left out because their verdict found no tables
+        if index_path and os.path.exists(index_path):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.index.get(key)
+
+    def put(self, key: str, verdict: Dict[str, Any]):
+        self.index[key] = verdict
+
+    def save(self):
+        if self.index_path:
+            atomic_write_json(self.index_path, self.index)
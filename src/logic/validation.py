@@ -0,0 +1,116 @@
+import re
+from typing import List, Dict, Any, Optional
+
+from src.config import CASCADE_MIN_NUMERIC_DENSITY
+from src.logic.profiling import profiled
+
+MIN_ROWS_FOR_DENSITY = 3
+
+# Table score factors (see score_table)
+MAX_EMPTY_SHARE = 0.6       # Empty body cells tolerated before the score drops (sparse statements are common)
+NUMERIC_COLUMN_SHARE = 0.6  # Share of number cells that makes a column numeric
+TRUNCATED_FACTOR = 0.5      # Response cut off mid-table
+PROSE_FACTOR = 0.7          # Text outside the tables
+PLACEHOLDERS = {"-", "–", "—", "n/a", "na", "n.a.", "nd", "s/d", "--"}
+NUMBER = re.compile(r"^[(+\-−]?\s*[$€£¥]?\s*(\d{1,3}([,.\s]\d{3})+|\d+)([.,]\d+)?\s*[%$€£¥]?\)?$")
+
+def _split_row(line: str) -> List[str]:
+    cells = [c.strip() for c in line.strip().split('|')]
+    if cells and cells[0] == '': cells = cells[1:]
+    if cells and cells[-1] == '': cells = cells[:-1]
+    return cells
+
+def _is_separator(cells: List[str]) -> bool:
+    return bool(cells) and all(set(c) <= {'-', ':', ' '} and '-' in c for c in cells)
+
+def _table_blocks(md_text: str) -> List[List[str]]:
+    """Splits a response into consecutive runs of table lines."""
+    blocks, current = [], []
+    for line in md_text.strip().split('\n'):
+        if '|' in line:
+            current.append(line)
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+def check_table(md_text: str) -> List[str]:
+    """
+    Structural check of a Markdown response. Returns the problems found
+    (consistent column counts, parseable header, no prose, numeric density);
+    an empty list means the result is acceptable.
+    """
+    problems = []
+    prose = [l for l in md_text.strip().split('\n') if l.strip() and '|' not in l]
+    if prose:
+        problems.append("prose outside tables")
+
+    for block in _table_blocks(md_text):
+        rows = [_split_row(l) for l in block]
+        if len(rows) < 2 or not _is_separator(rows[1]):
+            problems.append("missing header separator")
+        body = [r for r in rows[2:] if not _is_separator(r)] if len(rows) >= 2 and _is_separator(rows[1]) else rows
+        widths = {len(r) for r in rows if not _is_separator(r)}
+        if len(widths) > 1:
+            problems.append("inconsistent column count")
+        cells = [c for r in body for c in r if c]
+        if CASCADE_MIN_NUMERIC_DENSITY > 0 and len(body) >= MIN_ROWS_FOR_DENSITY and cells:
+            density = sum(1 for c in cells if re.search(r"\d", c)) / len(cells)
+            if density < CASCADE_MIN_NUMERIC_DENSITY:
+                problems.append("low numeric density")
+    return problems
+
+def _looks_numeric(cell: str) -> bool:
+    return bool(NUMBER.match(cell))
+
+@profiled("validate")
+def score_table(md_text: str) -> float:
+    """
+    Quality score (0-1) of a Markdown response, the lowest over its tables. Each table
+    multiplies: share of rows with the header's column count, share of number cells in
+    numeric columns, a penalty past MAX_EMPTY_SHARE empty cells and one for a response
+    cut off mid-table. Text outside the tables costs PROSE_FACTOR; no table at all (or only
+    separator lines) scores 0.
+    """
+    lines = [l for l in md_text.strip().split('\n') if l.strip()]
+    blocks = _table_blocks(md_text)
+    scores = []
+    for i, block in enumerate(blocks):
+        rows = [r for r in (_split_row(l) for l in block) if not _is_separator(r)]
+        if not rows:
+            continue  # Separator lines only, nothing to score
+        width = len(rows[0])
+        score = sum(1 for r in rows if len(r) == width) / len(rows)
+
+        # Truncation: the last line of the response stops mid-row, or the last row is short
+        if i == len(blocks) - 1 and (not lines[-1].rstrip().endswith('|') or len(rows[-1]) < width):
+            score *= TRUNCATED_FACTOR
+
+        body = rows[1:]
+        cells = [c for r in body for c in r]
+        if cells:
+            empty = sum(1 for c in cells if not c or c.lower() in PLACEHOLDERS) / len(cells)
+            if empty > MAX_EMPTY_SHARE:
+                score *= (1 - empty) / (1 - MAX_EMPTY_SHARE)
+
+        # Numeric plausibility: stray text in a column of numbers is usually a misread cell
+        if len(body) >= MIN_ROWS_FOR_DENSITY:
+            for col in range(width):
+                values = [r[col] for r in body if col < len(r) and r[col] and r[col].lower() not in PLACEHOLDERS]
+                numeric = sum(1 for v in values if _looks_numeric(v))
+                if values and numeric / len(values) >= NUMERIC_COLUMN_SHARE:
+                    score *= numeric / len(values)
+        scores.append(score)
+
+    if not scores:
+        return 0.0
+    if any('|' not in l for l in lines):
+        scores = [s * PROSE_FACTOR for s in scores]
+    return round(min(scores), 3)
+
+def page_score(tables: List[Dict[str, Any]]) -> Optional[float]:
+    """Lowest table score of a page result (scored now if it was cached before scores existed), None without tables."""
+    scores = [t["score"] if t.get("score") is not None else score_table(t.get("md") or "") for t in tables]
+    return min(scores) if scores else None
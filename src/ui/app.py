@@ -2,23 +2,36 @@ import os
 import sys
 import time
 import logging
+import queue
+import importlib
 import threading
 import webbrowser
 import tkinter as tk
+from contextlib import nullcontext
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 from typing import List, Optional
-import pdfplumber
-import pandas as pd
-from google import genai
-from dotenv import load_dotenv, set_key
+from dotenv import load_dotenv, set_key, unset_key, dotenv_values
 from PIL import Image, ImageTk
-import json
-import hashlib
 
 # Modular imports
 from src import config
-from src.config import VERSION, DEFAULT_PROMPT, TEXTS, AI_MODEL
-from src.logic.processor import normalize_df, parse_md, extract_from_page, parse_page_query
+from src.config import VERSION, DEFAULT_PROMPT, TEXTS, AI_MODEL, LOG_MAX_LINES
+from src.config import USE_MODEL_CASCADE, MODEL_CASCADE
+from src.logic.manifest import OutputManifest
+from src.logic.errors import classify_error, error_code, QUOTA, AUTH
+from src.logic.journal import FAILED
+from src.logic.keys import KeyPool, parse_api_keys
+from src.logic.pipeline import Pipeline, ExtractOptions, select_pages, CACHED, DEDUPLICATED
+from src.logic.planner import plan_report
+from src.logic.sinks import Sink, OutputFiles
+from src.logic.profiling import new_profiler
+
+# Imported in the background once the window is visible (see _warm_imports)
+HEAVY_MODULES = ("pandas", "pdfplumber", "google.genai")
+
+# The worker thread never touches Tk: it queues events that the main loop drains in batches
+EVENT_PUMP_INTERVAL_MS = 100
+EVENT_PUMP_BATCH = 500
 
 class PDFToXLSXGUI:
     def __init__(self, root):
@@ -50,12 +63,14 @@ class PDFToXLSXGUI:
         self.save_md = tk.BooleanVar(value=False)
         self.save_csv = tk.BooleanVar(value=False)
         self.clean_data = tk.BooleanVar(value=True)
+        self.profile_run = tk.BooleanVar(value=False)
         self._has_error = False
         
         # State Variables
         self.lang = "EN" 
         self.current_prompt = DEFAULT_PROMPT
         self.ui_elements = {}
+        self._events = queue.Queue()
 
         # Load Icons
         self.icons = {}
@@ -63,6 +78,16 @@ class PDFToXLSXGUI:
 
         self._setup_ui()
         self._load_existing_api_key()
+        self.root.after(EVENT_PUMP_INTERVAL_MS, self._pump_events)
+        self.root.after(200, lambda: threading.Thread(target=self._warm_imports, daemon=True).start())
+
+    def _warm_imports(self):
+        """Pre-loads the heavy dependencies so the first extraction does not wait for them."""
+        for name in HEAVY_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass # Reported properly when the extraction actually needs it
 
     def _configure_styles(self):
         self.style.configure(".", background="#FFFFFF", foreground="#333333", font=("Segoe UI", 10))
@@ -195,7 +220,7 @@ class PDFToXLSXGUI:
         opt_frame.pack(fill="x", pady=2)
         self.ui_elements["options_section"] = opt_frame
         
-        for k, v in [("opt_excel", self.save_excel), ("opt_md", self.save_md), ("opt_csv", self.save_csv), ("opt_normalize", self.clean_data)]:
+        for k, v in [("opt_excel", self.save_excel), ("opt_md", self.save_md), ("opt_csv", self.save_csv), ("opt_normalize", self.clean_data), ("opt_profile", self.profile_run)]:
             self.ui_elements[k] = ttk.Checkbutton(opt_frame, text=TEXTS[self.lang][k], variable=v)
             self.ui_elements[k].pack(side="left", padx=10)
 
@@ -206,6 +231,10 @@ class PDFToXLSXGUI:
         self.start_btn = ttk.Button(action_frame, text=TEXTS[self.lang]["start_btn"], style="Action.TButton", command=self._start_processing)
         self.ui_elements["start_btn"] = self.start_btn
         self.start_btn.pack(side="top", fill="x", pady=2)
+
+        self.plan_btn = ttk.Button(action_frame, text=TEXTS[self.lang]["plan_btn"], command=self._start_planning)
+        self.ui_elements["plan_btn"] = self.plan_btn
+        self.plan_btn.pack(side="top", fill="x", pady=2)
         
         self.progress = ttk.Progressbar(action_frame, orient="horizontal", mode="determinate")
         self.progress.pack(fill="x", pady=5)
@@ -263,7 +292,9 @@ class PDFToXLSXGUI:
             "opt_md": "opt_md",
             "opt_csv": "opt_csv",
             "opt_normalize": "opt_normalize",
+            "opt_profile": "opt_profile",
             "start_btn": "start_btn",
+            "plan_btn": "plan_btn",
             "status_log": "status_log"
         }
 
@@ -310,20 +341,66 @@ class PDFToXLSXGUI:
         ttk.Button(btn_f, text=TEXTS[self.lang]["reset"], command=reset_prompt).pack(side="left", padx=5)
 
     def _log(self, message):
-        self.log_area.config(state="normal")
-        self.log_area.insert(tk.END, f"[{time.strftime('%H:%M:%S')}] {message}\n")
-        self.log_area.see(tk.END)
-        self.log_area.config(state="disabled")
-        self.root.update_idletasks()
+        """Queues a log line; safe to call from any thread."""
+        self._events.put(("log", f"[{time.strftime('%H:%M:%S')}] {message}\n"))
+
+    def _post(self, callback):
+        """Runs a callback on the Tk main loop; used by the worker for dialogs and widget state."""
+        self._events.put(("call", callback))
+
+    def _pump_events(self):
+        """Applies queued events, then reschedules itself even if applying them failed."""
+        try:
+            self._drain_events()
+        finally:
+            self.root.after(EVENT_PUMP_INTERVAL_MS, self._pump_events)
+
+    def _drain_events(self):
+        """Drains queued events in one batch: a single log insert and one progress update."""
+        lines, progress_value, progress_max, calls = [], None, None, []
+        try:
+            for _ in range(EVENT_PUMP_BATCH):
+                kind, payload = self._events.get_nowait()
+                if kind == "log":
+                    lines.append(payload)
+                elif kind == "progress_max":
+                    progress_max, progress_value = payload, 0
+                elif kind == "progress_step":
+                    progress_value = (progress_value if progress_value is not None else float(self.progress["value"])) + payload
+                elif kind == "progress":
+                    progress_value = payload
+                elif kind == "call":
+                    calls.append(payload)
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.log_area.config(state="normal")
+            self.log_area.insert(tk.END, "".join(lines))
+            excess = int(self.log_area.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excess > 0:
+                self.log_area.delete("1.0", f"{excess + 1}.0")
+            self.log_area.see(tk.END)
+            self.log_area.config(state="disabled")
+        if progress_max is not None:
+            self.progress["maximum"] = max(progress_max, 1)
+        if progress_value is not None:
+            self.progress["value"] = progress_value
+        for callback in calls:
+            try:
+                callback()
+            except Exception:
+                # One failing callback must not drop the rest of the batch or stop the pump
+                logging.getLogger(__name__).exception("GUI callback failed")
 
     def _load_existing_api_key(self):
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # points to src/
         env_path = os.path.join(base_dir, "api_key.env")
         if os.path.exists(env_path):
             load_dotenv(env_path)
-            key = os.getenv("API_KEY")
-            if key:
-                self.api_key.set(key)
+            keys = parse_api_keys(os.getenv("API_KEY"), os.getenv("API_KEYS"))
+            if keys:
+                self.api_key.set(",".join(keys))
                 msg = "Ready: API key loaded." if self.lang == "EN" else "Listo: Clave API cargada."
                 self._log(msg)
 
@@ -339,6 +416,9 @@ class PDFToXLSXGUI:
             with open(env_path, "w") as f: f.write(f"API_KEY={key}\n")
         else:
             set_key(env_path, "API_KEY", key)
+            # Several keys are kept comma-separated in API_KEY, replacing any older API_KEYS list
+            if dotenv_values(env_path).get("API_KEYS") is not None:
+                unset_key(env_path, "API_KEYS")
         
         if not silent:
             messagebox.showinfo(TEXTS[self.lang]["success"], TEXTS[self.lang]["key_saved"])
@@ -371,7 +451,7 @@ class PDFToXLSXGUI:
         if not key:
             messagebox.showerror(TEXTS[self.lang]["error"], TEXTS[self.lang]["no_key"])
             return
-        if len(key) != 39:
+        if any(len(k) != 39 for k in parse_api_keys(key)):
             messagebox.showwarning(TEXTS[self.lang]["error"], TEXTS[self.lang]["key_length"])
             return
         if not self.pdf_files:
@@ -386,175 +466,169 @@ class PDFToXLSXGUI:
                 messagebox.showerror("Error", f"Could not create output directory: {e}")
                 return
 
+        # Tk variables are only read here, on the main loop; the worker gets plain values
+        settings = {
+            "keys": parse_api_keys(key), "out_dir": out_dir, "pdf_files": list(self.pdf_files),
+            "excel_name": self.excel_name.get().strip(), "md_name": self.md_name.get().strip(),
+            "csv_name": self.csv_name.get().strip(), "save_excel": self.save_excel.get(),
+            "save_md": self.save_md.get(), "save_csv": self.save_csv.get(),
+            "clean": self.clean_data.get(), "profile": self.profile_run.get(),
+            "prompt": self.current_prompt,
+        }
         self.start_btn.config(state="disabled")
+        self.plan_btn.config(state="disabled")
         self.progress["value"] = 0
-        self.progress["maximum"] = len(self.pdf_files)
-        threading.Thread(target=self._process_logic, daemon=True).start()
-
-    def _get_cache_path(self, pdf_path, page_idx):
-        out_dir = self.output_dir.get().strip()
-        cache_dir = os.path.join(out_dir, ".cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        
-        file_hash = hashlib.md5(os.path.basename(pdf_path).encode()).hexdigest()[:8]
-        prompt_hash = hashlib.md5(self.current_prompt.encode()).hexdigest()[:8]
-        cache_filename = f"{file_hash}_p{page_idx}_{prompt_hash}.json"
-        return os.path.join(cache_dir, cache_filename)
+        threading.Thread(target=self._process_logic, args=(settings,), daemon=True).start()
 
-    def _process_logic(self):
-        key = self.api_key.get().strip()
-        out_dir = self.output_dir.get().strip()
+    def _start_planning(self):
+        if not self.pdf_files:
+            messagebox.showerror(TEXTS[self.lang]["error"], TEXTS[self.lang]["no_files"])
+            return
+        self.start_btn.config(state="disabled")
+        self.plan_btn.config(state="disabled")
+        cache_dir = os.path.join(self.output_dir.get().strip(), ".cache")
+        keys = parse_api_keys(self.api_key.get())
+        threading.Thread(target=self._plan_logic, args=(list(self.pdf_files), cache_dir, keys),
+                         daemon=True).start()
+
+    def _plan_logic(self, pdf_files, cache_dir, keys):
+        """Previews the run: pages, requests, tokens, cost and time, without any model request."""
+        texts = TEXTS[self.lang]
+        self._log(texts["planning"])
+        try:
+            options = ExtractOptions(prompt=self.current_prompt, cache_dir=cache_dir)
+            lines = plan_report(pdf_files, options, keys,
+                                usage_path=os.path.join(cache_dir, "key_usage.json"))
+            for line in lines:
+                self._log(line)
+            self._post(lambda: messagebox.showinfo(texts["plan_title"], "\n".join(lines)))
+        except Exception as e:
+            self._log(f"ERROR: {e}")
+        finally:
+            self._post(lambda: (self.start_btn.config(state="normal"), self.plan_btn.config(state="normal")))
+
+    @staticmethod
+    def _output_path(pdf_path, file_name, ext, settings):
+        """Markdown/CSV file of a PDF; with several PDFs the file name is prefixed with the PDF name."""
+        if not file_name.endswith(ext): file_name += ext
+        if len(settings["pdf_files"]) > 1:
+            file_name = f"{os.path.splitext(os.path.basename(pdf_path))[0]}_{file_name}"
+        return os.path.join(settings["out_dir"], file_name)
+
+    def _process_logic(self, settings):
+        """Runs the extraction on a worker thread; `settings` is the snapshot taken by `_start_processing`."""
+        keys, out_dir = settings["keys"], settings["out_dir"]
         self._has_error = False
         
         try:
-            client = genai.Client(api_key=key)
-            self._log(f"Using Model: {AI_MODEL}")
+            # The pool stands in for the client and spreads requests over all entered keys
+            client = KeyPool(keys, usage_path=os.path.join(out_dir, ".cache", "key_usage.json"))
+            if len(keys) > 1:
+                self._log(f"Using {len(keys)} API keys")
+            self._log(f"Using Model: {' -> '.join(MODEL_CASCADE) if USE_MODEL_CASCADE else AI_MODEL}")
             for logger_name in ["google", "google.genai", "urllib3"]:
                 logging.getLogger(logger_name).setLevel(logging.WARNING)
         except Exception as e:
             self._log(f"FAIL: Gemini initialization failed: {e}")
-            self.root.after(0, lambda: self.start_btn.config(state="normal"))
+            self._post(lambda: (self.start_btn.config(state="normal"), self.plan_btn.config(state="normal")))
             return
 
+        pipeline = profiler = None
         try:
-            excel_filename = self.excel_name.get().strip()
+            excel_filename = settings["excel_name"]
             if not excel_filename.endswith('.xlsx'): excel_filename += '.xlsx'
             excel_path = os.path.join(out_dir, excel_filename)
-            
-            tracker = {"has_error": False}
-            for i, pdf_path in enumerate(self.pdf_files):
-                file_name = os.path.basename(pdf_path)
-                self._log(TEXTS[self.lang]["working_on"].format(file_name))
-                
-                all_results = []
-                try:
-                    with pdfplumber.open(pdf_path) as pdf:
-                        total_pages = len(pdf.pages)
-                        all_basenames = [os.path.basename(f) for f in self.pdf_files]
-                        pages_to_process = parse_page_query(self.current_prompt, total_pages, file_name, all_basenames)
-                        
-                        if len(pages_to_process) < total_pages:
-                            self._log(f"Selective Mode: Processing {len(pages_to_process)} specific pages.")
-
-                        for p_idx in pages_to_process:
-                            cache_file = self._get_cache_path(pdf_path, p_idx)
-                            
-                            # Try to load from cache
-                            if os.path.exists(cache_file):
-                                try:
-                                    with open(cache_file, 'r', encoding='utf-8') as f:
-                                        cached_data = json.load(f)
-                                        # cached_data is a list of results
-                                        for res in cached_data:
-                                            # If it was empty, it might be an empty list or have no 'df'
-                                            if 'df' in res and res['df'] is not None:
-                                                res['df'] = pd.DataFrame(res['df'])
-                                        
-                                        if cached_data:
-                                            all_results.extend(cached_data)
-                                            self._log(f"Restored page {p_idx+1} from cache.")
-                                        else:
-                                            self._log(f"Page {p_idx+1} has no tables (cached).")
-                                        continue
-                                except Exception as e:
-                                    self._log(f"Cache error for p{p_idx+1}: {e}. Re-analyzing...")
-
-                            page = pdf.pages[p_idx]
-                            page_res = extract_from_page(client, page, self.current_prompt, 
-                                                       lambda p: self._log(TEXTS[self.lang]["analyzing_page"].format(p)),
-                                                       tracker)
-                            
-                            # Save to cache (even if empty to avoid re-analyzing)
-                            cache_to_save = []
-                            if page_res:
-                                for res in page_res:
-                                    cache_to_save.append({
-                                        'df': res['df'].to_dict(orient='records'),
-                                        'md': res['md']
-                                    })
-                                all_results.extend(page_res)
-                            else:
-                                self._log(f"No tables found on page {p_idx+1}.")
-                            
-                            # Always save cache file to mark as 'analyzed'
-                            with open(cache_file, 'w', encoding='utf-8') as f:
-                                json.dump(cache_to_save, f, ensure_ascii=False, indent=2)
-                    
-                    if all_results:
-                        processed_dfs = []
-                        for res in all_results:
-                            df = res['df']
-                            if self.clean_data.get(): df = normalize_df(df)
-                            
-                            # Add a separator row if this is not the first table
-                            if processed_dfs:
-                                # Create a separator row with the same number of columns
-                                separator = pd.DataFrame([["--- NEXT TABLE / PAGE ---"] + [""] * (df.shape[1] - 1)])
-                                processed_dfs.append(separator)
-                                
-                            processed_dfs.append(df)
-                        
-                        combined_df = pd.concat(processed_dfs, ignore_index=True)
-                        short_name = os.path.splitext(file_name)[0]
-                        
-                        # Save per PDF to ensure progress is recorded
-                        if self.save_excel.get():
-                            try:
-                                # Open and close writer per PDF to ensure save
-                                if os.path.exists(excel_path):
-                                    with pd.ExcelWriter(excel_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                                        combined_df.to_excel(writer, sheet_name=short_name[:31].strip(), index=False, header=False)
-                                else:
-                                    with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-                                        pd.DataFrame([["Tables extracted from GUI Application"]]).to_excel(writer, sheet_name="Summary", index=False, header=False)
-                                        combined_df.to_excel(writer, sheet_name=short_name[:31].strip(), index=False, header=False)
-                            except PermissionError:
-                                self._log(f"ERROR: Permission denied for {excel_filename}. Progress for {file_name} might not be saved.")
-
-                        if self.save_md.get():
-                            md_filename = self.md_name.get().strip()
-                            if not md_filename.endswith('.md'): md_filename += '.md'
-                            md_base = f"{short_name}_{md_filename}" if len(self.pdf_files) > 1 else md_filename
-                            with open(os.path.join(out_dir, md_base), 'w', encoding='utf-8') as f:
-                                f.write(f"# Extracted Tables for {file_name}\n\n")
-                                for idx, p in enumerate(processed): f.write(f"## Table {idx+1}\n\n{p['md']}\n\n")
-                            self._log(TEXTS[self.lang]["saved_md"].format(md_base))
-                        
-                        if self.save_csv.get():
-                            csv_filename = self.csv_name.get().strip()
-                            if not csv_filename.endswith('.csv'): csv_filename += '.csv'
-                            csv_base = f"{short_name}_{csv_filename}" if len(self.pdf_files) > 1 else csv_filename
-                            combined_df.to_csv(os.path.join(out_dir, csv_base), index=False, header=False)
-                            self._log(TEXTS[self.lang]["saved_csv"].format(csv_base))
-                            
-                        self._log(TEXTS[self.lang]["done"].format(file_name))
-                    else:
-                        self._log(TEXTS[self.lang]["skip"].format(file_name))
-                
-                except Exception as e:
-                    self._log(f"ERROR: {file_name} -> {e}")
-                    if tracker["has_error"]: raise e
-                
-                self.root.after(0, lambda v=i+1: self.progress.config(value=v))
-
-            if not tracker["has_error"]:
-                self._log(TEXTS[self.lang]["all_tasks_done"])
-                if self.save_excel.get(): self._log(f"Results consolidated in EXCEL: {excel_filename}")
-                self.root.after(0, lambda: messagebox.showinfo(TEXTS[self.lang]["process_finished"], TEXTS[self.lang]["process_success"]))
-            else:
-                self._log(TEXTS[self.lang]["process_error"])
+
+            cache_dir = os.path.join(out_dir, ".cache")
+            texts = TEXTS[self.lang]
+            outputs = OutputFiles(
+                OutputManifest(os.path.join(cache_dir, "manifest.json")),
+                excel_path=excel_path if settings["save_excel"] else None,
+                md_path=(lambda pdf: self._output_path(pdf, settings["md_name"], '.md', settings)) if settings["save_md"] else None,
+                csv_path=(lambda pdf: self._output_path(pdf, settings["csv_name"], '.csv', settings)) if settings["save_csv"] else None,
+                clean=settings["clean"], table_separators=True, md_headings=True,
+                summary_text="Tables extracted from GUI Application", log=self._log,
+                messages={k: texts[k] for k in ("unchanged", "saved_md", "saved_csv")})
+            options = ExtractOptions(prompt=settings["prompt"], cache_dir=cache_dir)
+            pipeline = Pipeline(options, client=client, sinks=[outputs, _GuiProgressLog(self)],
+                                log_callback=lambda p: self._log(texts["analyzing_page"].format(p)))
+
+            page_counts = dict(zip(settings["pdf_files"], self._count_pages(settings["pdf_files"], settings["prompt"])))
+            self._events.put(("progress_max", sum(page_counts.values())))
+            profiler = new_profiler(cache_dir) if settings["profile"] else None
+            with profiler or nullcontext():
+                for result in pipeline.run(settings["pdf_files"]):
+                    page = result["page"]
+                    if page is None:
+                        self._log(f"ERROR: {result['name']} -> {result['error']}")
+                        self._events.put(("progress_step", page_counts[result["doc"]]))
+                        continue
+                    if result["status"] == CACHED:
+                        self._log(f"Restored page {page+1} from cache." if result["tables"] else f"Page {page+1} has no tables (cached).")
+                    elif result["status"] == DEDUPLICATED:
+                        self._log(f"Page {page+1} duplicates an extracted page, reusing its result.")
+                    elif result["status"] == FAILED:
+                        self._log(f"ERROR: page {page+1} -> {result['error']}")
+                    elif not result["tables"]:
+                        self._log(f"No tables found on page {page+1}.")
+                    elif result["tables"][0].get("tier", 0) > 0:
+                        self._log(f"Page {page+1} escalated to {result['tables'][0]['model']}.")
+                    self._events.put(("progress_step", 1))
+
+            for line in pipeline.summary():
+                self._log(line)
+            self._log(texts["all_tasks_done"])
+            if settings["save_excel"]: self._log(f"Results consolidated in EXCEL: {excel_filename}")
+            self._post(lambda: messagebox.showinfo(texts["process_finished"], texts["process_success"]))
             
         except PermissionError:
             self._log(f"ERROR: Permission denied. The file might be open.")
-            messagebox.showerror(TEXTS[self.lang]["error"], TEXTS[self.lang]["file_open_error"])
+            self._post(lambda: messagebox.showerror(TEXTS[self.lang]["error"], TEXTS[self.lang]["file_open_error"]))
 
         except Exception as e:
             self._log(f"CRITICAL ERROR: {e}")
-            err_type = "api_error" if "400" in str(e) else "quota_error" if "429" in str(e) else "api_leaked" if "403" in str(e) else "unknown_error"
-            if err_type:
-                messagebox.showerror(TEXTS[self.lang]["error"], TEXTS[self.lang][err_type])
+            if pipeline is not None and pipeline.tracker["has_error"]:
+                self._log(TEXTS[self.lang]["process_error"])
+            kind, code = classify_error(e), error_code(e)
+            err_type = "quota_error" if kind == QUOTA else "api_leaked" if code == 403 else "api_error" if kind == AUTH else "unknown_error"
+            if err_type in TEXTS[self.lang]:
+                self._post(lambda: messagebox.showerror(TEXTS[self.lang]["error"], TEXTS[self.lang][err_type]))
             else:
-                messagebox.showerror(TEXTS[self.lang]["error"], f"{TEXTS[self.lang]['fatal_error']}: {e}")
+                self._post(lambda msg=f"{TEXTS[self.lang]['fatal_error']}: {e}": messagebox.showerror(TEXTS[self.lang]["error"], msg))
         
         finally:
-            self.root.after(0, lambda: self.start_btn.config(state="normal"))
+            if profiler is not None:
+                for line in profiler.summary():
+                    self._log(line)
+                self._log(f"Profile written to {profiler.dump()}")
+            self._post(lambda: (self.start_btn.config(state="normal"), self.plan_btn.config(state="normal")))
+
+    @staticmethod
+    def _count_pages(pdf_files, prompt):
+        """Number of selected pages per PDF, so progress can be tracked per page."""
+        import pdfplumber
+        all_basenames = [os.path.basename(f) for f in pdf_files]
+        counts = []
+        for pdf_path in pdf_files:
+            try:
+                with pdfplumber.open(pdf_path) as pdf:
+                    counts.append(len(select_pages(prompt, pdf_path, len(pdf.pages), all_basenames)))
+            except Exception:
+                counts.append(1) # Unreadable files are reported when processed
+        return counts
+
+class _GuiProgressLog(Sink):
+    """Logs document boundaries in the GUI language."""
+    def __init__(self, app):
+        self.app = app
+
+    def begin_document(self, doc):
+        texts = TEXTS[self.app.lang]
+        self.app._log(texts["working_on"].format(doc["name"]))
+        if len(doc["pages"]) < doc["total_pages"]:
+            self.app._log(f"Selective Mode: Processing {len(doc['pages'])} specific pages.")
+
+    def end_document(self, doc):
+        texts = TEXTS[self.app.lang]
+        if doc["complete"]:
+            self.app._log(texts["done"].format(doc["name"]) if doc["results"] else texts["skip"].format(doc["name"]))
@@ -0,0 +1,90 @@
+import sys
+import os
+import json
+import zipfile
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from src.logic.cache import PageCache, text_digest
+from src.logic.bundle import export_bundle, import_bundle
+
+TABLE = {"df": pd.DataFrame([["Item", "Qty"], ["Apple", "3"]]), "md": "| Item | Qty |\n|---|---|\n| Apple | 3 |", "score": 1.0}
+
+def fill(cache):
+    """Two documents: a page with a table and two pages without tables (same content)."""
+    keys = []
+    for doc, page, tables in [("a.pdf", 0, [TABLE]), ("a.pdf", 1, []), ("b.pdf", 0, [])]:
+        key = cache.key(f"digest-{doc}", page, "prompt")
+        cache.put(key, tables, {"doc": doc, "doc_digest": f"digest-{doc}", "page": page, "prompt": text_digest("prompt")})
+        keys.append(key)
+    return keys
+
+def test_export_and_import():
+    with tempfile.TemporaryDirectory() as tmp:
+        source, target = PageCache(os.path.join(tmp, "src")), PageCache(os.path.join(tmp, "dst"))
+        keys = fill(source)
+        stats = export_bundle(source.cache_dir, tmp)
+        # Named after its content; both pages without tables share one object
+        assert os.path.basename(stats["path"]).startswith("cache-") and stats["entries"] == 3 and stats["objects"] == 2
+
+        assert import_bundle(stats["path"], target.cache_dir) == {"added": 3, "replaced": 0, "present": 0, "corrupt": 0}
+        assert target.get(keys[0])[0]["df"].values.tolist() == [["Item", "Qty"], ["Apple", "3"]]
+        with open(target.path(keys[2]), 'r', encoding='utf-8') as f:
+            assert json.load(f)["meta"]["doc"] == "b.pdf"
+        # Importing again changes nothing
+        assert import_bundle(stats["path"], target.cache_dir)["present"] == 3
+
+def test_filters():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(os.path.join(tmp, "src"))
+        fill(cache)
+        bundle = os.path.join(tmp, "b.zip")
+        assert export_bundle(cache.cache_dir, bundle, docs=["b.pdf"])["entries"] == 1
+        assert export_bundle(cache.cache_dir, bundle, prompt="other prompt")["entries"] == 0
+        assert export_bundle(cache.cache_dir, bundle, prompt="prompt", since="2000-01-01")["entries"] == 3
+        assert export_bundle(cache.cache_dir, bundle, until="2000-01-01")["entries"] == 0
+
+def test_rejects_tampered_entries():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(os.path.join(tmp, "src"))
+        keys = fill(cache)
+        bundle = export_bundle(cache.cache_dir, os.path.join(tmp, "b.zip"))["path"]
+        with zipfile.ZipFile(bundle) as z:
+            header = json.loads(z.read("index.json"))
+            members = {name: z.read(name) for name in z.namelist()}
+        victim = f"objects/{header['entries'][keys[0]]['object']}.json"
+        members[victim] = members[victim].replace(b"Apple", b"Pear!")
+        header["entries"]["../escape"] = header["entries"][keys[1]]
+        members["index.json"] = json.dumps(header).encode()
+        with zipfile.ZipFile(bundle, 'w') as z:
+            for name, data in members.items():
+                z.writestr(name, data)
+
+        target = os.path.join(tmp, "dst")
+        counts = import_bundle(bundle, target)
+        assert counts["added"] == 2 and counts["corrupt"] == 2
+        assert not os.path.exists(os.path.join(tmp, "escape.json"))
+        try:
+            import_bundle(os.path.join(cache.cache_dir, f"{keys[0]}.json"), target)
+            assert False, "a cache entry was accepted as a bundle"
+        except ValueError:
+            pass
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_export_and_import, test_filters, test_rejects_tampered_entries]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll cache bundle tests passed!")
+    else:
+        print("\nSome cache bundle tests failed.")
+        sys.exit(1)
@@ -0,0 +1,83 @@
+import sys
+import os
+import tempfile
+import types
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+from src.logic.cassette import Cassette, RecordingClient, ReplayClient, request_fingerprint
+from src.logic.errors import classify_error, INVALID, QUOTA
+
+class FakeModels:
+    def __init__(self):
+        self.calls = 0
+        self.models = self
+
+    def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        if contents[0] == "quota":
+            raise genai_errors.ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED"}})
+        return types.SimpleNamespace(text=f"| {contents[0]} | {self.calls} |")
+
+def image_part(data):
+    return genai_types.Part.from_bytes(data=data, mime_type="image/png")
+
+def test_fingerprint_covers_model_contents_and_format():
+    json_config = genai_types.GenerateContentConfig(response_mime_type="application/json")
+    fp = request_fingerprint("m", ["prompt", image_part(b"png")])
+    assert fp == request_fingerprint("m", ["prompt", image_part(b"png")])
+    assert fp != request_fingerprint("m", ["prompt", image_part(b"other")])
+    assert fp != request_fingerprint("other", ["prompt", image_part(b"png")])
+    assert fp != request_fingerprint("m", ["prompt", image_part(b"png")], json_config)
+
+def test_record_and_replay():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.jsonl")
+        recorder = RecordingClient(FakeModels(), Cassette(path))
+        first = recorder.models.generate_content(model="m", contents=["a"]).text
+        second = recorder.models.generate_content(model="m", contents=["a"]).text
+        try:
+            recorder.models.generate_content(model="m", contents=["quota"])
+        except genai_errors.ClientError:
+            pass
+
+        replay = ReplayClient(Cassette(path).load())
+        # Repeated requests come back in recording order, the last one is reused
+        assert [replay.models.generate_content(model="m", contents=["a"]).text for _ in range(3)] == [first, second, second]
+        try:
+            replay.models.generate_content(model="m", contents=["quota"])
+            assert False, "recorded error was not replayed"
+        except genai_errors.ClientError as e:
+            assert classify_error(e) == QUOTA
+        try:
+            replay.models.generate_content(model="m", contents=["never recorded"])
+            assert False, "missing request was served"
+        except genai_errors.ClientError as e:
+            assert classify_error(e) == INVALID and replay.misses == 1
+
+def test_interrupted_recording_loads():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.jsonl")
+        RecordingClient(FakeModels(), Cassette(path)).models.generate_content(model="m", contents=["a"])
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"fp": "cut sho')
+        assert len(Cassette(path).load()) == 1
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_fingerprint_covers_model_contents_and_format, test_record_and_replay, test_interrupted_recording_loads]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll cassette tests passed!")
+    else:
+        print("\nSome cassette tests failed.")
+        sys.exit(1)
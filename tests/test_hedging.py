@@ -0,0 +1,75 @@
+import sys
+import os
+import time
+import threading
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import errors as genai_errors
+from src.logic.hedging import Hedger
+from src.logic.errors import classify_error, QUOTA, AUTH, TRANSIENT, INVALID
+
+def test_slow_request_is_hedged():
+    hedger = Hedger(timeout=5, max_ratio=1.0)
+    for _ in range(20): hedger.latency.record(0.01)
+    calls = []
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        time.sleep(2 if first else 0.01)
+        return "slow" if first else "fast"
+
+    start = time.monotonic()
+    assert hedger.call(request) == "fast"
+    assert time.monotonic() - start < 1
+    assert hedger.hedges == 1 and hedger.hedge_wins == 1
+
+def test_hedges_are_capped():
+    hedger = Hedger(timeout=5, max_ratio=0.0)
+    for _ in range(20): hedger.latency.record(0.01)
+    assert hedger.call(lambda: time.sleep(0.2) or "done") == "done"
+    assert hedger.hedges == 0
+
+def test_no_hedge_without_capacity():
+    hedger = Hedger(timeout=5, max_ratio=1.0)
+    for _ in range(20): hedger.latency.record(0.01)
+    # The duplicate cannot be sent right away (no free key or token), so none is sent
+    assert hedger.call(lambda: time.sleep(0.2) or "done", lambda: None) == "done"
+    assert hedger.hedges == 0
+
+def test_deadline():
+    hedger = Hedger(timeout=0.2, enabled=False)
+    try:
+        hedger.call(lambda: time.sleep(1))
+        assert False, "deadline not enforced"
+    except TimeoutError:
+        pass
+
+def test_error_classification():
+    assert classify_error(genai_errors.ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED"}})) == QUOTA
+    assert classify_error(genai_errors.ClientError(403, {"error": {"status": "PERMISSION_DENIED"}})) == AUTH
+    assert classify_error(genai_errors.ClientError(400, {"error": {"details": [{"reason": "API_KEY_INVALID"}]}})) == AUTH
+    assert classify_error(genai_errors.ClientError(400, {"error": {"status": "INVALID_ARGUMENT"}})) == INVALID
+    assert classify_error(genai_errors.ServerError(503, {"error": {"status": "UNAVAILABLE"}})) == TRANSIENT
+    assert classify_error(TimeoutError()) == TRANSIENT
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_slow_request_is_hedged, test_hedges_are_capped, test_no_hedge_without_capacity, test_deadline,
+                 test_error_classification]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll hedging tests passed!")
+    else:
+        print("\nSome hedging tests failed.")
+        sys.exit(1)
@@ -0,0 +1,149 @@
+import sys
+import os
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from src.logic.cache import PageCache
+from src.logic.manifest import OutputManifest
+from src.logic.sinks import OutputFiles
+from src.logic.processor import normalize_df
+
+def test_cache_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(tmp)
+        key = cache.key("digest", 0, "prompt")
+        assert not cache.has(key)
+        cache.put(key, [{"df": pd.DataFrame([["a", "1"], ["b", "2"]]), "md": "| a | 1 |"}])
+        restored = cache.get(key)
+        assert restored[0]["df"].values.tolist() == [["a", "1"], ["b", "2"]]
+        assert restored[0]["md"] == "| a | 1 |"
+        # Prompt and document changes must produce different keys
+        assert key != cache.key("digest", 0, "other prompt")
+        assert key != cache.key("other digest", 0, "prompt")
+
+def test_manifest_detects_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "doc.csv")
+        manifest_path = os.path.join(tmp, "manifest.json")
+        manifest = OutputManifest(manifest_path)
+        fp = OutputManifest.fingerprint(["k1", "k2"], clean=True)
+        assert not manifest.is_current(out_path, out_path, fp)
+
+        with open(out_path, "w") as f: f.write("a,1\n")
+        manifest.record(out_path, out_path, fp, ["k1", "k2"])
+        manifest.mark_written(out_path)
+        manifest.save()
+
+        reloaded = OutputManifest(manifest_path)
+        assert reloaded.is_current(out_path, out_path, fp)
+        # Changed normalization setting or inputs make the output stale
+        assert not reloaded.is_current(out_path, out_path, OutputManifest.fingerprint(["k1", "k2"], clean=False))
+        assert not reloaded.is_current(out_path, out_path, OutputManifest.fingerprint(["k1", "k3"], clean=True))
+        # An externally edited file is rewritten too
+        with open(out_path, "a") as f: f.write("b,2\n")
+        assert not reloaded.is_current(out_path, out_path, fp)
+
+def stream_document(sink, doc, pages, complete=True):
+    """Feeds pages ({page: tables}) to the sink like the pipeline does and returns the partial file snapshots."""
+    sink.begin_document(doc)
+    snapshots = []
+    for page, tables in pages.items():
+        doc["results"].extend(tables)
+        doc["changed"] = True
+        sink.add_page({"doc": doc["path"], "name": doc["name"], "page": page, "status": "extracted",
+                       "tables": tables, "error": None})
+        with open(os.path.join(os.path.dirname(doc["path"]), "doc.csv.partial")) as f:
+            snapshots.append(f.read())
+    doc["complete"] = complete
+    sink.end_document(doc)
+    return snapshots
+
+def new_doc(tmp):
+    return {"path": os.path.join(tmp, "doc.pdf"), "name": "doc.pdf", "index": 0, "pages": [0, 1],
+            "page_keys": ["k0", "k1"], "total_pages": 2, "results": [], "changed": False, "complete": True, "failed": 0}
+
+def test_csv_streams_pages():
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = OutputFiles(OutputManifest(os.path.join(tmp, "manifest.json")),
+                           csv_path=lambda pdf: os.path.join(tmp, "doc.csv"), table_separators=True)
+        wide = {"df": pd.DataFrame([["A", "B", "C"], ["1", "2", "3"]]), "md": ""}
+        narrow = {"df": pd.DataFrame([["Item", "Qty"], ["Apple", "3"]]), "md": ""}
+        snapshots = stream_document(sink, new_doc(tmp), {0: [narrow], 1: [wide]})
+        # Each page is visible in the partial file as soon as it is done
+        assert snapshots[0].splitlines() == ["Item,Qty", "Apple,3"]
+        assert not os.path.exists(os.path.join(tmp, "doc.csv.partial"))
+        with open(os.path.join(tmp, "doc.csv")) as f:
+            # Rows are padded to the widest table when the document completes
+            assert f.read().splitlines() == ["Item,Qty,", "Apple,3,", "--- NEXT TABLE / PAGE ---,,", "A,B,C", "1,2,3"]
+
+def test_csv_cells_keep_their_table_format():
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = OutputFiles(OutputManifest(os.path.join(tmp, "manifest.json")),
+                           csv_path=lambda pdf: os.path.join(tmp, "doc.csv"), clean=True)
+        wide = {"df": pd.DataFrame([["1", "2"], ["3", "4.50"]]), "md": ""}
+        counts = {"df": pd.DataFrame([["Units", "5"], ["Boxes", "6"]]), "md": ""}
+        narrow = {"df": pd.DataFrame([["$1,200"]]), "md": ""}
+        stream_document(sink, new_doc(tmp), {0: [wide, counts], 1: [narrow]})
+        with open(os.path.join(tmp, "doc.csv")) as f:
+            # Each table is written like its own to_csv, then padded with empty cells
+            assert f.read().splitlines() == ["1,2.0", "3,4.5", "Units,5", "Boxes,6", "1200,"]
+        # Not like the combined DataFrame, where the padding turns the ints of the last column into floats
+        combined = pd.concat([normalize_df(t["df"]) for t in (wide, counts, narrow)], ignore_index=True)
+        assert combined.to_csv(index=False, header=False).splitlines()[2] == "Units,5.0"
+
+def test_interrupted_document_keeps_previous_output():
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "doc.csv"), "w") as f: f.write("old\n")
+        sink = OutputFiles(OutputManifest(os.path.join(tmp, "manifest.json")),
+                           csv_path=lambda pdf: os.path.join(tmp, "doc.csv"))
+        table = {"df": pd.DataFrame([["Item", "Qty"]]), "md": ""}
+        stream_document(sink, new_doc(tmp), {0: [table]}, complete=False)
+        sink.close()
+        assert sorted(os.listdir(tmp)) == ["doc.csv", "manifest.json"]
+        with open(os.path.join(tmp, "doc.csv")) as f:
+            assert f.read() == "old\n"
+
+def test_excel_sheet_written_when_document_completes():
+    with tempfile.TemporaryDirectory() as tmp:
+        excel_path = os.path.join(tmp, "tables.xlsx")
+        sink = OutputFiles(OutputManifest(os.path.join(tmp, "manifest.json")), excel_path=excel_path,
+                           summary_text="Summary text")
+        docs = []
+        for index, name in enumerate(["first", "second"]):
+            doc = new_doc(tmp)
+            doc.update(path=os.path.join(tmp, f"{name}.pdf"), name=f"{name}.pdf", index=index, changed=True,
+                       results=[{"df": pd.DataFrame([[name, str(index)]]), "md": ""}])
+            docs.append(doc)
+        # The second document finishes first; its sheet is saved before the run ends
+        sink.begin_document(docs[1])
+        sink.end_document(docs[1])
+        with pd.ExcelFile(excel_path) as xls:
+            assert xls.sheet_names == ["Summary", "second"]
+        sink.begin_document(docs[0])
+        sink.end_document(docs[0])
+        with pd.ExcelFile(excel_path) as xls:
+            # Sheets follow the input order, whatever order the documents finished in
+            assert xls.sheet_names == ["Summary", "first", "second"]
+            assert pd.read_excel(xls, "first", header=None).values.tolist() == [["first", 0]]
+        sink.close()
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_cache_roundtrip, test_manifest_detects_changes, test_csv_streams_pages,
+                 test_csv_cells_keep_their_table_format, test_interrupted_document_keeps_previous_output,
+                 test_excel_sheet_written_when_document_completes]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll incremental export tests passed!")
+    else:
+        print("\nSome incremental export tests failed.")
+        sys.exit(1)
@@ -0,0 +1,105 @@
+import sys
+import os
+import types
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import DEFAULT_PROMPT, DEFAULT_JSON_PROMPT, JSON_OUTPUT_PROMPT
+from src.logic.processor import (parse_json_tables, table_frame, to_markdown, base_prompt, request_tables,
+                                 request_with_cascade)
+from src.logic.validation import check_table
+from src.logic.profiling import Profiler
+
+RESPONSE = """{"tables": [
+  {"header": ["Item", "Qty", "Price"], "rows": [["Apple", "3", "1.50"], ["Pear", "5", "0.75"]]},
+  {"header": [], "rows": []},
+  {"header": ["Total"], "rows": [["6.75"]]}
+]}"""
+
+RAGGED = '{"tables": [{"header": ["Item", "Qty", "Price"], "rows": [["Apple", "3", "1.50"], ["Pear", "5"]]}]}'
+
+class FakeClient:
+    """Answers each model with its own response."""
+    def __init__(self, responses):
+        self.responses = responses
+        self.models = self
+
+    def generate_content(self, model, contents, config):
+        return types.SimpleNamespace(text=self.responses[model])
+
+INPUTS = {"kind": "image", "prompt": "", "contents": [b""], "json": True}
+
+def test_decodes_tables():
+    tables, complete = parse_json_tables(RESPONSE)
+    assert complete and len(tables) == 2  # Empty tables are dropped
+    assert tables[1] == [["Total"], ["6.75"]]
+    # Short rows are only padded in the DataFrame
+    tables, _ = parse_json_tables(RAGGED)
+    assert tables[0][-1] == ["Pear", "5"]
+    assert table_frame(tables[0]).values.tolist() == [["Item", "Qty", "Price"], ["Apple", "3", "1.50"], ["Pear", "5", ""]]
+
+def test_no_tables():
+    assert parse_json_tables('{"tables": []}') == ([], True)
+    assert parse_json_tables("{}") == ([], True)
+
+def test_local_markdown_is_valid():
+    md = to_markdown(parse_json_tables(RESPONSE)[0][0])
+    assert md.splitlines()[0] == "| Item | Qty | Price |"
+    assert md.splitlines()[1] == "|---|---|---|"
+    assert check_table(md) == []
+    # A ragged table is not hidden by the padding
+    assert "inconsistent column count" in check_table(to_markdown(parse_json_tables(RAGGED)[0][0]))
+
+def test_truncated_response():
+    cut = RESPONSE[:RESPONSE.index('"0.75"') + 3]
+    tables, complete = parse_json_tables(cut)
+    assert not complete
+    assert tables == [[["Item", "Qty", "Price"], ["Apple", "3", "1.50"]]]
+    # Escaped quotes and brackets inside cells do not confuse the cut
+    tables, _ = parse_json_tables('{"tables": [{"header": ["a \\" ]", "b"], "rows": [["1", "2"], ["3"')
+    assert tables == [[['a " ]', "b"], ["1", "2"]]]
+    assert parse_json_tables("Sorry, no JSON here") == ([], False)
+
+def test_malformed_response_is_flagged():
+    cut = RESPONSE[:RESPONSE.index('"0.75"') + 3]
+    results = request_tables(FakeClient({"small": cut}), INPUTS, model="small")
+    assert len(results) == 1 and results[0]["problems"] == ["truncated response"] and results[0]["score"] == 0.5
+    # Nothing decodable: the text is kept rather than failing the page
+    results = request_tables(FakeClient({"small": "Sorry, no JSON here"}), INPUTS, model="small")
+    assert results[0]["md"] == "Sorry, no JSON here" and results[0]["score"] == 0.0
+    # The cascade escalates cut-off and ragged results
+    for bad in (cut, RAGGED):
+        results = request_with_cascade(FakeClient({"small": bad, "large": RESPONSE}), INPUTS, ["small", "large"])
+        assert results[0]["model"] == "large" and len(results) == 2
+
+def test_json_prompt():
+    assert "Markdown" in DEFAULT_PROMPT and "Markdown" not in DEFAULT_JSON_PROMPT
+    assert base_prompt(DEFAULT_PROMPT, json_output=True) == DEFAULT_JSON_PROMPT
+    assert base_prompt(DEFAULT_PROMPT, json_output=False) == DEFAULT_PROMPT
+    assert base_prompt("Only the totals table", json_output=True) == "Only the totals table"
+    assert "Markdown" not in JSON_OUTPUT_PROMPT
+
+def test_profiled_as_its_own_stage():
+    with tempfile.TemporaryDirectory() as tmp:
+        with Profiler(tmp) as profiler:
+            parse_json_tables(RESPONSE)
+        assert profiler.stats["parse_json"]["calls"] == 1 and "parse_md" not in profiler.stats
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_decodes_tables, test_no_tables, test_local_markdown_is_valid, test_truncated_response,
+                 test_malformed_response_is_flagged, test_json_prompt, test_profiled_as_its_own_stage]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll JSON output tests passed!")
+    else:
+        print("\nSome JSON output tests failed.")
+        sys.exit(1)
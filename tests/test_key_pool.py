@@ -0,0 +1,128 @@
+import sys
+import os
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import errors as genai_errors
+from src.logic.keys import KeyPool, parse_api_keys
+from src.logic.ratelimit import RateLimiter, reserve_request
+from src.logic.hedging import Hedger
+
+DAILY_429 = genai_errors.ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED", "details": [
+    {"violations": [{"quotaId": "GenerateRequestsPerDayPerProjectPerModel-FreeTier"}]}]}})
+MINUTE_429 = genai_errors.ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED", "details": [
+    {"violations": [{"quotaId": "GenerateRequestsPerMinutePerProjectPerModel-FreeTier"}]}]}})
+LEAKED_403 = genai_errors.ClientError(403, {"error": {"status": "PERMISSION_DENIED"}})
+
+class FakeModels:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return "ok"
+
+class FakeClient:
+    def __init__(self, error=None):
+        self.models = FakeModels(error)
+
+def make_pool(errors, **kwargs):
+    pool = KeyPool([f"key{i}" for i in range(len(errors))], rpm=1000, **kwargs)
+    for slot, error in zip(pool.slots, errors):
+        slot._client = FakeClient(error)
+    return pool
+
+def test_parse_api_keys():
+    assert parse_api_keys("a, b", None, "b,c,") == ["a", "b", "c"]
+    assert parse_api_keys("") == []
+
+def test_spreads_by_headroom():
+    pool = make_pool([None, None], daily_limit=10)
+    for _ in range(6):
+        assert pool.models.generate_content(model="m", contents=[]) == "ok"
+    assert [s.requests for s in pool.slots] == [3, 3]
+
+def test_daily_quota_and_403_leave_rotation():
+    pool = make_pool([DAILY_429, LEAKED_403, None])
+    for _ in range(3):
+        assert pool.models.generate_content(model="m", contents=[]) == "ok"
+    assert pool.slots[0].disabled == "daily quota"
+    assert pool.slots[1].disabled == "rejected"
+    assert pool.active_keys() == 1
+    assert pool.slots[0].client.models.calls == 1 and pool.slots[1].client.models.calls == 1
+
+def test_error_raised_once_all_keys_exhausted():
+    pool = make_pool([DAILY_429, LEAKED_403])
+    try:
+        pool.models.generate_content(model="m", contents=[])
+        assert False, "exhausted pool did not raise"
+    except genai_errors.ClientError as e:
+        assert e.code in (429, 403)
+    assert pool.active_keys() == 0
+
+def test_minute_quota_cools_down_key():
+    pool = make_pool([MINUTE_429, None], cooldown=60)
+    assert pool.models.generate_content(model="m", contents=[]) == "ok"
+    assert pool.slots[0].disabled is None and pool.slots[0].cooldown_until > 0
+    # Only the healthy key is used while the other one cools down
+    pool.models.generate_content(model="m", contents=[])
+    assert pool.slots[0].client.models.calls == 1
+
+def test_usage_persists_for_the_day():
+    with tempfile.TemporaryDirectory() as tmp:
+        usage_path = os.path.join(tmp, "key_usage.json")
+        pool = make_pool([None], daily_limit=2, usage_path=usage_path)
+        pool.models.generate_content(model="m", contents=[])
+        pool.save_usage()
+        pool = make_pool([None], daily_limit=2, usage_path=usage_path)
+        assert pool.slots[0].used_today == 1
+        pool.models.generate_content(model="m", contents=[])
+        assert pool.active_keys() == 0
+
+def test_rate_limiter():
+    limiter = RateLimiter(2, period=60)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.wait_time() > 0
+
+def test_rate_limit_waits_are_not_timed():
+    pool = make_pool([None, None])
+    for slot in pool.slots:
+        slot.limiter = RateLimiter(60)
+        slot.limiter.tokens = 0  # Next token in about a second
+    hedger = Hedger(timeout=0.5)
+    for _ in range(20): hedger.latency.record(0.001)
+    # Nothing free right now: no request can be reserved (and no token is taken)
+    assert reserve_request(pool.models, block=False) is None
+    send = reserve_request(pool.models)
+    # The wait for the token was not part of the request: no timeout, no hedge
+    assert hedger.call(lambda: send(model="m", contents=[])) == "ok"
+    assert hedger.hedges == 0 and hedger.latency.samples[-1] < 0.25
+    # Without blocking, a single key gives its token
+    for slot in pool.slots:
+        slot.limiter = RateLimiter(1)
+    assert reserve_request(pool.models, block=False) is not None
+    assert sorted(round(slot.limiter.tokens) for slot in pool.slots) == [0, 1]
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_parse_api_keys, test_spreads_by_headroom, test_daily_quota_and_403_leave_rotation,
+                 test_error_raised_once_all_keys_exhausted, test_minute_quota_cools_down_key,
+                 test_usage_persists_for_the_day, test_rate_limiter, test_rate_limit_waits_are_not_timed]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll key pool tests passed!")
+    else:
+        print("\nSome key pool tests failed.")
+        sys.exit(1)
@@ -0,0 +1,104 @@
+import sys
+import os
+import random
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+from src.logic.dedup import PageDeduplicator, hamming
+from src.logic.rasterize import close_document
+from tests.pdf_helpers import write_pdf
+
+class FakePage:
+    def __init__(self, text):
+        self.text = text
+        self.images, self.rects, self.lines, self.curves = [], [], [], []
+
+    def extract_text(self):
+        return self.text
+
+def test_text_layer_duplicates():
+    with tempfile.TemporaryDirectory() as tmp:
+        dedup = PageDeduplicator(os.path.join(tmp, "index.json"))
+        cover = FakePage("Monthly report   cover sheet\nCompany XYZ, all rights reserved")
+        kind, sig = dedup.signature(cover)
+        assert kind == "text"
+        dedup.remember((kind, sig), "scope", "key-1")
+        # Whitespace differences still match, other prompts/settings do not
+        assert dedup.find("scope", *dedup.signature(FakePage("Monthly report cover sheet Company XYZ, all rights reserved"))) == "key-1"
+        assert dedup.find("other-scope", kind, sig) is None
+        assert dedup.find("scope", *dedup.signature(FakePage("Monthly report cover sheet Company ABC, all rights reserved"))) is None
+
+def test_image_hash_threshold():
+    with tempfile.TemporaryDirectory() as tmp:
+        dedup = PageDeduplicator(os.path.join(tmp, "index.json"), threshold=3)
+        base = "f" * 64
+        dedup.remember(("image", base), "scope", "key-1")
+        near = "e" + "f" * 63  # 1 bit away
+        far = "0" * 8 + "f" * 56  # 32 bits away
+        assert hamming(base, near) == 1
+        assert dedup.find("scope", "image", near) == "key-1"
+        assert dedup.find("scope", "image", far) is None
+
+HEADER = b"BT /F1 12 Tf 72 700 Td (Quarterly revenue by region, all figures in USD) Tj ET\n"
+
+def pasted_image(pixels):
+    """A 2x2 gray inline image, like a table screenshot pasted under the same header."""
+    return b"q 100 0 0 100 72 400 cm BI /W 2 /H 2 /CS /G /BPC 8 ID\n" + pixels + b"\nEI Q\n"
+
+def test_same_text_different_graphics():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "digital.pdf")
+        write_pdf(pdf_path, streams=[HEADER + pasted_image(b"\x00\xff\xff\x00"), HEADER + pasted_image(b"\xff\x00\x00\xff"),
+                                     HEADER + pasted_image(b"\x00\xff\xff\x00"), HEADER + b"72 300 200 50 re S\n",
+                                     HEADER + b"72 320 200 50 re S\n"])
+        dedup = PageDeduplicator(None)
+        with pdfplumber.open(pdf_path) as pdf:
+            signatures = [dedup.signature(page) for page in pdf.pages]
+        assert all(kind == "text" for kind, _ in signatures)
+        # Only the page with the same text and the same image is a duplicate
+        assert signatures[2] == signatures[0]
+        assert len({signatures[i] for i in (0, 1, 3, 4)}) == 4
+
+def ruled_page(seed):
+    """Scanned-like page: the same ruled grid on every page, with bars of varying width as figures."""
+    rnd = random.Random(seed)
+    ops = [f"60 {700 - r * 30} m 560 {700 - r * 30} l S" for r in range(11)]
+    ops += [f"{60 + c * 100} 700 m {60 + c * 100} 400 l S" for c in range(6)]
+    ops += [f"{100 + c * 100} {672 - r * 30} {rnd.randint(8, 50)} 8 re f" for r in range(10) for c in range(1, 5)]
+    return "\n".join(ops).encode()
+
+def test_same_layout_different_figures():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.pdf")
+        # Ten pages of one statement layout, then page 0 again
+        write_pdf(path, streams=[ruled_page(i) for i in range(10)] + [ruled_page(0)])
+        for near_images in (False, True):
+            dedup = PageDeduplicator(None, near_images=near_images)
+            with pdfplumber.open(path) as pdf:
+                for index, page in enumerate(pdf.pages):
+                    signature = dedup.signature(page)
+                    match = dedup.find("scope", *signature)
+                    # Only the repeated page is a duplicate, never a page with other figures
+                    assert match == ("key-0" if index == 10 else None), (near_images, index, match)
+                    dedup.remember(signature, "scope", f"key-{index}")
+                close_document(pdf)
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_text_layer_duplicates, test_image_hash_threshold, test_same_text_different_graphics,
+                 test_same_layout_different_figures]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll page deduplication tests passed!")
+    else:
+        print("\nSome page deduplication tests failed.")
+        sys.exit(1)
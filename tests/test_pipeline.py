@@ -0,0 +1,235 @@
+import sys
+import os
+import time
+import json
+import tempfile
+import threading
+import types
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import errors as genai_errors
+from src.logic.cache import MemoryCache
+from src.logic.pipeline import Pipeline, ExtractOptions, extract, CACHED, EXTRACTED, TRIAGED, DEDUPLICATED
+from src.logic.planner import NoRequests, estimate, image_tokens, text_tokens
+from src.config import DEFAULT_PROMPT, PLAN_OUTPUT_TOKENS
+from src.logic.scheduler import dispatch_order, SJF, FIFO, ROUND_ROBIN
+from src.logic.sinks import Sink
+from src.logic.profiling import Profiler
+from tests.pdf_helpers import write_pdf
+
+TABLE = "| Item | Qty |\n|---|---|\n| Apple | 3 |"
+
+class FakeClient:
+    def __init__(self, fail_after=None, delay=0.0, empty_pages=()):
+        self.calls = 0
+        self.triage_calls = 0
+        self.empty_pages = empty_pages  # Pages (numbered in the triage request) reported without tables
+        self.text = f"```markdown\n{TABLE}\n```"
+        self.fail_after = fail_after
+        self.delay = delay  # Each request takes longer than the previous one
+        self.lock = threading.Lock()
+        self.models = self
+
+    def generate_content(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay * call)
+        if self.fail_after is not None and call > self.fail_after:
+            raise genai_errors.ClientError(401, {"error": {"status": "UNAUTHENTICATED"}})
+        labels = [c for c in kwargs["contents"] if isinstance(c, str) and c.startswith("Page ")]
+        if labels:
+            self.triage_calls += 1
+            pages = [{"page": n, "has_tables": n not in self.empty_pages, "boxes": []} for n in range(1, len(labels) + 1)]
+            return types.SimpleNamespace(text=json.dumps({"pages": pages}))
+        return types.SimpleNamespace(text=self.text)
+
+class RecordingSink(Sink):
+    def __init__(self):
+        self.events = []
+
+    def begin_document(self, doc):
+        self.events.append(("begin", doc["name"]))
+
+    def add_page(self, result):
+        self.events.append(("page", result["page"]))
+
+    def end_document(self, doc):
+        self.events.append(("end", doc["name"], doc["complete"], len(doc["results"])))
+
+def test_yields_pages_and_reuses_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        write_pdf(pdf_path, ["Quarterly revenue by region", "Operating expenses by month"])
+        client, cache, sink = FakeClient(), MemoryCache(), RecordingSink()
+        options = ExtractOptions(dedup=False)
+
+        results = list(extract([pdf_path], options, client=client, cache=cache, sinks=[sink]))
+        assert [(r["page"], r["status"]) for r in results] == [(0, EXTRACTED), (1, EXTRACTED)]
+        assert results[0]["tables"][0]["df"].values.tolist() == [["Item", "Qty"], ["Apple", "3"]]
+        assert sink.events == [("begin", "report.pdf"), ("page", 0), ("page", 1), ("end", "report.pdf", True, 2)]
+
+        results = list(extract([pdf_path], options, client=client, cache=cache))
+        assert [r["status"] for r in results] == [CACHED, CACHED]
+        assert client.calls == 2
+
+def test_unreadable_document():
+    with tempfile.TemporaryDirectory() as tmp:
+        results = list(extract([os.path.join(tmp, "missing.pdf")], ExtractOptions(dedup=False), client=FakeClient()))
+        assert len(results) == 1 and results[0]["page"] is None and results[0]["error"]
+
+def test_fatal_error_stops_run():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        write_pdf(pdf_path, ["First page text here", "Second page text here"])
+        sink = RecordingSink()
+        # One request at a time, so the first page is the one that succeeds
+        pipeline = Pipeline(ExtractOptions(dedup=False, concurrency=1), client=FakeClient(fail_after=1), sinks=[sink])
+        seen = []
+        try:
+            for result in pipeline.run([pdf_path]):
+                seen.append(result["page"])
+            assert False, "fatal error was not raised"
+        except genai_errors.ClientError:
+            pass
+        assert seen == [0] and pipeline.tracker["has_error"]
+        # The interrupted document is reported as incomplete so sinks keep previous outputs
+        assert sink.events[-1] == ("end", "report.pdf", False, 1)
+
+def test_dispatch_order():
+    assert list(dispatch_order([3, 1], FIFO)) == [(0, 0), (0, 1), (0, 2), (1, 0)]
+    assert list(dispatch_order([3, 1, 1], SJF)) == [(1, 0), (2, 0), (0, 0), (0, 1), (0, 2)]
+    assert list(dispatch_order([3, 1], ROUND_ROBIN)) == [(0, 0), (1, 0), (0, 1), (0, 2)]
+
+def test_schedules_documents_concurrently():
+    with tempfile.TemporaryDirectory() as tmp:
+        big, small = os.path.join(tmp, "big.pdf"), os.path.join(tmp, "small.pdf")
+        write_pdf(big, [f"Annual report page number {i}" for i in range(6)])
+        write_pdf(small, ["Invoice number 1001 total due"])
+        client, sink = FakeClient(delay=0.005), RecordingSink()
+        options = ExtractOptions(dedup=False, concurrency=3)
+
+        results = list(extract([big, small, big], options, client=client, sinks=[sink]))
+        # The small document is done first and each document keeps its page order
+        ends = [e for e in sink.events if e[0] == "end"]
+        assert ends == [("end", "small.pdf", True, 1), ("end", "big.pdf", True, 6), ("end", "big.pdf", True, 6)]
+        assert [r["page"] for r in results if r["doc"] == big and r["status"] == EXTRACTED] == list(range(6))
+        # The file given twice is only extracted once
+        assert [r["page"] for r in results if r["doc"] == big and r["status"] == CACHED] == list(range(6))
+        assert client.calls == 7
+
+def test_caps_open_documents():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(6):
+            paths.append(os.path.join(tmp, f"doc{i}.pdf"))
+            write_pdf(paths[-1], [f"Shipment {i} first page", f"Shipment {i} second page"])
+        sink = RecordingSink()
+        options = ExtractOptions(dedup=False, concurrency=2, policy=ROUND_ROBIN)
+
+        results = list(extract(paths, options, client=FakeClient(), sinks=[sink]))
+        assert len(results) == 12 and all(r["status"] == EXTRACTED for r in results)
+        # Round robin would open every document at once; only two are open at a time
+        open_docs = peak = 0
+        for event in sink.events:
+            open_docs += {"begin": 1, "end": -1}.get(event[0], 0)
+            peak = max(peak, open_docs)
+        assert peak == 2
+        assert [e for e in sink.events if e[0] == "end"] == [("end", f"doc{i}.pdf", True, 2) for i in range(6)]
+
+def test_triage_skips_scanned_pages_without_tables():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "scan.pdf")
+        # Pages without a text layer, like scans
+        write_pdf(pdf_path, [], streams=[f"{72 + 40 * i} 400 200 100 re f".encode() for i in range(3)])
+        client = FakeClient(empty_pages=(2,))
+        options = ExtractOptions(dedup=False, triage=True, cache_dir=tmp)
+
+        results = list(extract([pdf_path], options, client=client))
+        assert [r["status"] for r in results] == [EXTRACTED, TRIAGED, EXTRACTED]
+        # One request for the thumbnails of all pages, then only the pages with tables
+        assert client.triage_calls == 1 and client.calls == 3
+
+        # Verdicts are kept by thumbnail: another prompt extracts again without a new triage request
+        options = ExtractOptions(prompt="Extract every table", dedup=False, triage=True, cache_dir=tmp)
+        results = list(extract([pdf_path], options, client=client))
+        assert [r["status"] for r in results] == [EXTRACTED, TRIAGED, EXTRACTED]
+        assert client.triage_calls == 1 and client.calls == 5
+
+def test_reextracts_low_scoring_pages():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        write_pdf(pdf_path, ["Quarterly revenue by region", "Operating expenses by month"])
+        client, cache = FakeClient(), MemoryCache()
+        client.text = "| Item | Qty |\n|---|---|\n| Apple |"  # Cut off mid-row
+        results = list(extract([pdf_path], ExtractOptions(dedup=False), client=client, cache=cache))
+        assert [r["tables"][0]["score"] for r in results] == [0.25, 0.25]
+
+        # A worse answer does not replace the cached result
+        client.text = "Sorry, I cannot read this page."
+        pipeline = Pipeline(ExtractOptions(dedup=False, reextract_below=0.9), client=client, cache=cache)
+        results = list(pipeline.run([pdf_path]))
+        assert [r["status"] for r in results] == [CACHED, CACHED] and results[0]["tables"][0]["score"] == 0.25
+        assert pipeline.reextracted == [2, 0] and client.calls == 4
+
+        client.text = f"```markdown\n{TABLE}\n```"
+        results = list(extract([pdf_path], ExtractOptions(dedup=False, reextract_below=0.9), client=client, cache=cache))
+        assert [r["status"] for r in results] == [EXTRACTED, EXTRACTED] and client.calls == 6
+        # Pages scoring above the threshold come from the cache
+        results = list(extract([pdf_path], ExtractOptions(dedup=False, reextract_below=0.9), client=client, cache=cache))
+        assert [r["status"] for r in results] == [CACHED, CACHED] and client.calls == 6
+
+def test_plan_without_requests():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        write_pdf(pdf_path, ["Quarterly revenue by region", "Operating expenses by month", "Quarterly revenue by region"])
+        cache = MemoryCache()
+        plan = Pipeline(ExtractOptions(), client=NoRequests(), cache=cache).plan([pdf_path])
+        assert plan["counts"][EXTRACTED] == 2 and plan["counts"][DEDUPLICATED] == 1
+        # A Letter page at 300 dpi is 2550x3300 pixels: 4x5 tiles
+        assert image_tokens(612, 792, 300) == 20 * 258 and image_tokens(612, 792, 36) == 258
+        assert plan["requests"] == [text_tokens(DEFAULT_PROMPT) + 20 * 258] * 2
+
+        est = estimate(plan, ExtractOptions(concurrency=1), keys=1, remaining=1)
+        assert est["requests"] == 2 and est["output_tokens"] == 2 * PLAN_OUTPUT_TOKENS and est["cost"] > 0
+        assert est["bound"] == "concurrency" and est["days"] == 2
+
+        client = FakeClient()
+        list(extract([pdf_path], ExtractOptions(), client=client, cache=cache))
+        plan = Pipeline(ExtractOptions(), client=NoRequests(), cache=cache).plan([pdf_path])
+        assert plan["counts"][CACHED] == 3 and plan["requests"] == [] and client.calls == 2
+        # Output tokens are now estimated from the cached results
+        assert plan["outputs"] == [text_tokens(TABLE)] * 3
+
+def test_profiles_stages_on_request_workers():
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        write_pdf(pdf_path, ["Quarterly revenue by region", "Operating expenses by month"])
+        with Profiler(os.path.join(tmp, "profile")) as profiler:
+            list(extract([pdf_path], ExtractOptions(dedup=False, concurrency=2), client=FakeClient()))
+        # Parsing and scoring run on the worker threads and are profiled there too
+        for name in ("parse_md", "validate"):
+            assert profiler.stats[name]["calls"] == 2 and profiler.stats[name]["profiled"] >= 1
+        profiler.dump()
+        assert os.path.exists(os.path.join(tmp, "profile", "parse_md.prof"))
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_yields_pages_and_reuses_cache, test_unreadable_document, test_fatal_error_stops_run,
+                 test_dispatch_order, test_schedules_documents_concurrently, test_caps_open_documents,
+                 test_triage_skips_scanned_pages_without_tables, test_reextracts_low_scoring_pages,
+                 test_plan_without_requests, test_profiles_stages_on_request_workers]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll pipeline tests passed!")
+    else:
+        print("\nSome pipeline tests failed.")
+        sys.exit(1)
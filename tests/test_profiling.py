@@ -0,0 +1,62 @@
+import sys
+import os
+import pstats
+import tempfile
+import tracemalloc
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logic.profiling import Profiler, stage, profiled
+
+@profiled("parse_md")
+def build_rows(n):
+    return [[str(i)] * 10 for i in range(n)]
+
+def test_stages_are_noops_when_off():
+    with stage("to_image"):
+        rows = build_rows(10)
+    assert len(rows) == 10 and not tracemalloc.is_tracing()
+
+def test_profiles_and_dumps_stages():
+    with tempfile.TemporaryDirectory() as tmp:
+        with Profiler(tmp) as profiler:
+            build_rows(5000)
+            with stage("concat"):
+                # Nested stages are timed but not profiled
+                build_rows(10)
+        assert not tracemalloc.is_tracing()
+        assert profiler.stats["parse_md"]["calls"] == 2 and profiler.stats["parse_md"]["profiled"] == 1
+        assert profiler.stats["concat"]["profiled"] == 1
+        assert profiler.stats["parse_md"]["peak"] > 100_000
+
+        profiler.dump()
+        files = set(os.listdir(tmp))
+        assert {"summary.txt", "parse_md.prof", "parse_md.snapshot", "parse_md.alloc.txt"} <= files
+        assert any("build_rows" in func[2] for func in pstats.Stats(os.path.join(tmp, "parse_md.prof")).stats)
+        # Stages run after the profiler stopped are not recorded
+        build_rows(10)
+        assert profiler.stats["parse_md"]["calls"] == 2
+
+def test_sampling_profiles_every_nth_call():
+    with tempfile.TemporaryDirectory() as tmp:
+        with Profiler(tmp, sample_every=3) as profiler:
+            for _ in range(7):
+                build_rows(10)
+        assert profiler.stats["parse_md"]["calls"] == 7 and profiler.stats["parse_md"]["profiled"] == 3
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_stages_are_noops_when_off, test_profiles_and_dumps_stages, test_sampling_profiles_every_nth_call]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll profiling tests passed!")
+    else:
+        print("\nSome profiling tests failed.")
+        sys.exit(1)
@@ -0,0 +1,64 @@
+import sys
+import os
+import types
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdfplumber
+from PIL import Image, ImageDraw
+from src.logic.regions import _merge_boxes, _raster_regions, fit_regions
+
+def write_scan(path, x0, top, x1, bottom, rule_px=2, ink=0):
+    """300 dpi Letter scan (an image-only PDF) of a ruled 7x5 table, edges in points."""
+    px = lambda pt: round(pt * 300 / 72)
+    image = Image.new("L", (2550, 3300), 255)
+    draw = ImageDraw.Draw(image)
+    for r in range(8):
+        y = px(top + r * (bottom - top) / 7)
+        draw.rectangle([px(x0), y, px(x1), y + rule_px - 1], fill=ink)
+    for c in range(6):
+        x = px(x0 + c * (x1 - x0) / 5)
+        draw.rectangle([x, px(top), x + rule_px - 1, px(bottom)], fill=ink)
+    image.save(path, resolution=300)
+
+def test_merge_boxes_chained_overlaps():
+    # c joins a and b, which do not overlap each other
+    a, b, c = (0, 0, 10, 10), (20, 5, 30, 15), (8, 8, 22, 12)
+    assert _merge_boxes([a, b, c]) == [(0, 0, 30, 15)]
+    assert sorted(_merge_boxes([a, b])) == [a, b]
+
+def test_fit_regions():
+    page = types.SimpleNamespace(width=600, height=800)
+    # Padded, clipped to the page and in reading order
+    assert fit_regions(page, [(100, 500, 300, 600), (5, 100, 200, 200)], padding=10) == \
+        [(0, 90, 210, 210), (90, 490, 310, 610)]
+    # Regions covering almost the whole page are not worth cropping
+    assert fit_regions(page, [(0, 0, 600, 780)]) == []
+
+def test_raster_regions_keep_thin_rules():
+    with tempfile.TemporaryDirectory() as tmp:
+        for rule_px, ink in [(1, 0), (2, 0), (3, 0), (2, 120)]:
+            path = os.path.join(tmp, "scan.pdf")
+            write_scan(path, 72, 200, 559.3, 420, rule_px, ink)
+            with pdfplumber.open(path) as pdf:
+                (x0, top, x1, bottom), = _raster_regions(pdf.pages[0])
+            # The last column is part of the region
+            assert abs(x0 - 72) < 2 and abs(top - 200) < 2 and x1 >= 559 and abs(bottom - 420) < 2, (rule_px, ink, x1)
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_merge_boxes_chained_overlaps, test_fit_regions, test_raster_regions_keep_thin_rules]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll region detection tests passed!")
+    else:
+        print("\nSome region detection tests failed.")
+        sys.exit(1)
@@ -0,0 +1,93 @@
+import sys
+import os
+import json
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logic.journal import RunJournal, PENDING, DONE, FAILED
+
+def test_journal_resume_state():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.json")
+        journal = RunJournal(path)
+        journal.reset(["docA.pdf", "docB.pdf"])
+        journal.start_file("docA.pdf", "digest-a", [0, 1, 2])
+        journal.mark("docA.pdf", 0, DONE)
+        journal.mark("docA.pdf", 1, FAILED, error="500 INTERNAL")
+
+        resumed = RunJournal(path)
+        assert resumed.load()
+        assert resumed.files() == [os.path.abspath("docA.pdf"), os.path.abspath("docB.pdf")]
+        assert [resumed.status("docA.pdf", p) for p in range(3)] == [DONE, FAILED, PENDING]
+        assert resumed.summary() == {PENDING: 1, DONE: 1, FAILED: 1}
+
+        # Registering the same file again keeps its progress, a changed file starts over
+        resumed.start_file("docA.pdf", "digest-a", [0, 1, 2])
+        assert resumed.status("docA.pdf", 0) == DONE
+        resumed.start_file("docA.pdf", "digest-a2", [0, 1, 2])
+        assert resumed.status("docA.pdf", 0) == PENDING
+
+def test_pages_are_appended_and_compacted():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.json")
+        journal = RunJournal(path)
+        journal.reset(["docA.pdf"])
+        journal.start_file("docA.pdf", "digest-a", list(range(100)))
+        state = open(path).readline()
+        for p_idx in range(100):
+            journal.mark("docA.pdf", p_idx, DONE if p_idx % 10 else FAILED, error=None if p_idx % 10 else "timeout")
+        # Each page adds one line; the state line is not rewritten
+        lines = open(path).readlines()
+        assert len(lines) == 102 and lines[0] == state
+        resumed = RunJournal(path)
+        assert resumed.load() and resumed.summary() == {PENDING: 0, DONE: 90, FAILED: 10}
+
+        journal.save()
+        lines = open(path).readlines()
+        assert len(lines) == 1 and json.loads(lines[0]) == resumed.data
+
+def test_interrupted_and_old_journals():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.json")
+        journal = RunJournal(path)
+        journal.reset(["docA.pdf"])
+        journal.start_file("docA.pdf", "digest-a", [0, 1, 2])
+        journal.mark("docA.pdf", 0, DONE)
+        # A record cut short by a crash is dropped, and the next one does not join it
+        with open(path, "a") as f: f.write('{"file": "')
+        resumed = RunJournal(path)
+        assert resumed.load() and resumed.status("docA.pdf", 0) == DONE
+        resumed.mark("docA.pdf", 1, DONE)
+        again = RunJournal(path)
+        assert again.load() and [again.status("docA.pdf", p) for p in range(3)] == [DONE, DONE, PENDING]
+
+        # A journal written as a single JSON object still loads and takes records
+        with open(path, "w") as f: json.dump(again.data, f)
+        old = RunJournal(path)
+        assert old.load() and old.status("docA.pdf", 1) == DONE
+        old.mark("docA.pdf", 2, FAILED, error="500 INTERNAL")
+        reloaded = RunJournal(path)
+        assert reloaded.load() and reloaded.summary() == {PENDING: 0, DONE: 2, FAILED: 1}
+
+def test_missing_journal():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert not RunJournal(os.path.join(tmp, "none.json")).load()
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_journal_resume_state, test_pages_are_appended_and_compacted, test_interrupted_and_old_journals,
+                 test_missing_journal]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll run journal tests passed!")
+    else:
+        print("\nSome run journal tests failed.")
+        sys.exit(1)
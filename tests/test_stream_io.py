@@ -0,0 +1,94 @@
+import sys
+import os
+import io
+import json
+import tempfile
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from src.logic.cache import file_digest
+from src.logic.sources import PdfSource
+from src.logic.sinks import StreamSink
+
+def test_sources_share_digest_and_names():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.pdf")
+        data = b"%PDF-1.4 not really a pdf, but enough to hash"
+        with open(path, "wb") as f:
+            f.write(data)
+
+        with PdfSource(path) as source:
+            assert source.name == "report.pdf" and source.path == path
+            assert source.digest == file_digest(path)
+            assert source.stream.read(8) == b"%PDF-1.4"
+            source.stream.seek(-4, io.SEEK_END)
+            assert source.stream.read() == b"hash"
+
+        with PdfSource(data, index=1) as source:
+            assert source.name == "document_2.pdf" and source.path is None
+            assert source.digest == file_digest(path)
+        with PdfSource(("upload.pdf", io.BytesIO(data))) as source:
+            assert source.name == "upload.pdf" and source.stream.read() == data
+
+def page_result():
+    df = pd.DataFrame([["Item", "Qty"], ["Apple", "3"]])
+    return {"doc": "report.pdf", "name": "report.pdf", "page": 0, "status": "extracted",
+            "tables": [{"df": df, "md": ""}], "error": None}
+
+def test_csv_stream():
+    out = io.BytesIO()
+    sink = StreamSink(out, "csv")
+    sink.add_page(page_result())
+    sink.add_page(dict(page_result(), page=1, tables=[]))
+    sink.close()
+    assert out.getvalue().decode().splitlines() == ["report.pdf,1,1,Item,Qty", "report.pdf,1,1,Apple,3"]
+
+def test_clean_stream_keeps_column_types():
+    out = io.BytesIO()
+    sink = StreamSink(out, "csv", clean=True)
+    df = pd.DataFrame([["1", "2.50"], ["3", "4"]])
+    sink.add_page(dict(page_result(), tables=[{"df": df, "md": ""}]))
+    # Integers stay integers next to a float column, as in to_csv
+    assert out.getvalue().decode().splitlines() == ["report.pdf,1,1,1,2.5", "report.pdf,1,1,3,4.0"]
+
+def test_jsonl_stream():
+    out = io.BytesIO()
+    sink = StreamSink(out, "jsonl")
+    sink.add_page(page_result())
+    line = json.loads(out.getvalue().decode().splitlines()[0])
+    assert line == {"document": "report.pdf", "page": 1, "table": 1, "rows": [["Item", "Qty"], ["Apple", "3"]]}
+
+def test_arrow_stream():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        try:
+            StreamSink(io.BytesIO(), "arrow")
+            assert False, "missing pyarrow not reported"
+        except RuntimeError:
+            return
+    out = io.BytesIO()
+    sink = StreamSink(out, "arrow")
+    sink.add_page(page_result())
+    sink.close()
+    table = pa.ipc.open_stream(out.getvalue()).read_all()
+    assert table.column("cells").to_pylist() == [["Item", "Qty"], ["Apple", "3"]]
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_sources_share_digest_and_names, test_csv_stream, test_clean_stream_keeps_column_types,
+                 test_jsonl_stream, test_arrow_stream]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll stream I/O tests passed!")
+    else:
+        print("\nSome stream I/O tests failed.")
+        sys.exit(1)
@@ -0,0 +1,55 @@
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logic.validation import check_table, score_table, page_score
+
+def test_valid_tables():
+    assert check_table("| Item | Qty |\n|---|---|\n| Apple | 3 |") == []
+    # Several tables in one response are checked separately
+    assert check_table("| a | b |\n|---|---|\n| 1 | 2 |\n\n| x |\n|---|\n| y |") == []
+
+def test_structural_problems():
+    assert "prose outside tables" in check_table("Here are the tables:\n| a | b |\n|---|---|\n| 1 | 2 |")
+    assert "inconsistent column count" in check_table("| a | b |\n|---|---|\n| 1 |")
+    assert "missing header separator" in check_table("| a | b |\n| 1 | 2 |")
+
+def test_table_scores():
+    assert score_table("| Item | Qty |\n|---|---|\n| Apple | 3 |") == 1.0
+    # Numbers with currency, thousands separators, parentheses and placeholders are plausible
+    assert score_table("| Year | Revenue |\n|---|---|\n| 2021 | $1,000 |\n| 2022 | (250) |\n| 2023 | - |") == 1.0
+    # A misread cell in a numeric column
+    assert score_table("| Item | Qty |\n|---|---|\n| A | 3 |\n| B | 12 |\n| C | 4 |\n| D | l2 |") == 0.75
+    # Ragged and cut off
+    assert score_table("| a | b |\n|---|---|\n| 1 |") == 0.25
+    assert score_table("Here are the tables:\n| a | b |\n|---|---|\n| 1 | 2 |") == 0.7
+    assert score_table("I could not find any tables.") == 0.0
+    # Blocks of separator lines alone have no rows to score
+    assert score_table("|---|---|") == 0.0
+    assert score_table("No tables here.\n|---|") == 0.0
+    assert score_table("| Item | Qty |\n|---|---|\n| Apple | 3 |\n\n|---|---|") == 1.0
+    assert page_score([{"md": "|---|---|"}]) == 0.0
+    assert score_table("| a | b | c |\n|---|---|---|\n| x | | |\n| | | |") < 0.5
+
+def test_page_score():
+    assert page_score([]) is None
+    # Results cached before scores existed are scored from their markdown
+    assert page_score([{"md": "| a | b |\n|---|---|\n| 1 |"}, {"md": "| a |\n|---|\n| 1 |", "score": 1.0}]) == 0.25
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_valid_tables, test_structural_problems, test_table_scores, test_page_score]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll table validation tests passed!")
+    else:
+        print("\nSome table validation tests failed.")
+        sys.exit(1)
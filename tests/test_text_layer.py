@@ -0,0 +1,53 @@
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logic.textlayer import serialize_words
+
+class FakePage:
+    def __init__(self, words):
+        self.words = words
+        self.bbox = (0, 0, 612, 792)
+        self.width, self.height = 612, 792
+
+    def extract_words(self, **kwargs):
+        return self.words
+
+def word(text, x0, top, char_width=5):
+    return {"text": text, "x0": x0, "x1": x0 + char_width * len(text), "top": top, "bottom": top + 10}
+
+def test_rows_and_columns():
+    page = FakePage([
+        word("Item", 50, 100), word("Unit", 200, 100.8), word("price", 222, 101),
+        word("Apples", 50, 120), word("1.20", 200, 120),
+        word("Pears", 50, 140), word("0.95", 200, 140.5),
+    ])
+    text = serialize_words(page, min_words=1)
+    lines = text.split("\n")
+    assert lines[0] == "[page 612x792 pt]"
+    # Words of a line share a row and nearby words form one phrase
+    assert lines[1] == "100 | 50:Item 200:Unit price"
+    assert lines[2] == "120 | 50:Apples 200:1.20"
+    assert len(lines) == 4
+
+def test_no_text_layer():
+    assert serialize_words(FakePage([])) is None
+    assert serialize_words(FakePage([word("Scan", 10, 10)]), min_words=10) is None
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_rows_and_columns, test_no_text_layer]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll text layer tests passed!")
+    else:
+        print("\nSome text layer tests failed.")
+        sys.exit(1)
@@ -0,0 +1,45 @@
+import sys
+import os
+import json
+import types
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logic.triage import parse_verdicts, verdict_regions
+
+def test_parse_verdicts():
+    text = json.dumps({"pages": [
+        {"page": 1, "has_tables": True, "boxes": [[100, 50, 400, 950], [500, 0, 400, 10], ["x", 1, 2, 3]]},
+        {"page": 3, "has_tables": False, "boxes": []},
+        {"page": 9, "has_tables": True, "boxes": []},
+    ]})
+    verdicts = parse_verdicts(text, 3)
+    # Boxes come back as [ymin, xmin, ymax, xmax] out of 1000; empty or malformed ones are dropped
+    assert verdicts[0] == {"tables": True, "boxes": [[0.05, 0.1, 0.95, 0.4]]}
+    assert verdicts[1] is None  # Left out of the response: extracted as usual
+    assert verdicts[2] == {"tables": False, "boxes": []}
+    assert parse_verdicts("not json", 2) == [None, None]
+
+def test_verdict_regions():
+    page = types.SimpleNamespace(width=600, height=800)
+    regions = verdict_regions(page, {"tables": True, "boxes": [[0.1, 0.1, 0.5, 0.3]]})
+    assert regions == [(36, 56, 324, 264)]
+    # A table covering the page is sent whole
+    assert verdict_regions(page, {"tables": True, "boxes": [[0, 0, 1, 1]]}) == []
+
+if __name__ == "__main__":
+    all_pass = True
+    for test in [test_parse_verdicts, test_verdict_regions]:
+        try:
+            test()
+            print(f"{test.__name__}: PASS")
+        except AssertionError:
+            print(f"{test.__name__}: FAIL")
+            all_pass = False
+
+    if all_pass:
+        print("\nAll triage tests passed!")
+    else:
+        print("\nSome triage tests failed.")
+        sys.exit(1)